@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from consts import ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+
+class AbbreviationIndex(object):
+    """A set of abbreviations (e.g. "Fig.", "al.") shared by the tokenizer, which
+       keeps their periods attached, and the sentence segmenter, which does not
+       start a sentence at a number that follows one. Lookups by text or by
+       lexeme orth id are hash lookups, so they cost the same however many
+       abbreviations are added.
+    """
+    def __init__(self, abbreviations=()):
+        """@param abbreviations: an iterable of abbreviations to start with
+        """
+        self.abbreviations = frozenset(abbreviations)
+        # incremented on every update, so derived data can tell it is stale
+        self.version = 0
+        self._orths = None
+        self._orths_version = None
+
+    def __contains__(self, text):
+        return text in self.abbreviations
+
+    def __iter__(self):
+        return iter(sorted(self.abbreviations))
+
+    def __len__(self):
+        return len(self.abbreviations)
+
+    def copy(self):
+        """Returns a new index with the same abbreviations, which can be
+           updated without changing this one.
+        """
+        return AbbreviationIndex(self.abbreviations)
+
+    def update(self, abbreviations):
+        """Adds abbreviations to the index. Returns the ones that were new.
+
+        @param abbreviations: an iterable of abbreviations
+        """
+        added = frozenset(abbreviations) - self.abbreviations
+        if added:
+            self.abbreviations = self.abbreviations | added
+            self.version += 1
+        return added
+
+    def orths(self, strings):
+        """Returns the set of orth ids of the abbreviations. Orth ids are hashes
+           of the text, so the set is the same for every vocab.
+
+        @param strings: a spaCy StringStore to hash the abbreviations with
+        """
+        if self._orths_version != self.version:
+            self._orths = frozenset(strings[abbreviation] for abbreviation in self.abbreviations)
+            self._orths_version = self.version
+        return self._orths
+
+def read_abbreviations(path):
+    """Reads a domain abbreviation file with one abbreviation per line, such as
+       "approx.", "resp.", "cf." or "ca.". Blank lines and lines starting with #
+       are skipped.
+
+    @param path: the abbreviation file
+    """
+    with open(path, encoding="utf-8") as abbreviation_file:
+        return [line.strip() for line in abbreviation_file
+                if line.strip() and not line.lstrip().startswith("#")]
+
+# the abbreviations the tokenizer and segmenter start with. Pipelines use their
+# own copy, so that adding abbreviations to one does not change the others
+DEFAULT_ABBREVIATIONS = AbbreviationIndex(ABBREVIATIONS)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# bump this whenever the layout of a saved cache changes
+CACHE_FORMAT_VERSION = 1
+
+class AnnotationCache(object):
+    """A bounded LRU cache of the annotations of texts, keyed by a hash of their
+       contents, so that duplicated text such as license statements, funding
+       acknowledgements or an abstract under several ids is only cleaned,
+       tokenized and segmented once. See `corpus_annotation.annotate_texts`.
+
+       Annotations are kept serialized as JSON, which takes a fraction of the
+       memory of the lists they are made of, and a cache can be saved to disk
+       and loaded to be reused by later runs.
+
+       The cached annotations are only valid for the pipeline that produced
+       them. Caches of different pipelines should use different namespaces, and
+       a saved cache should be discarded when the tokenizer or segmentation
+       rules change.
+    """
+    def __init__(self, max_entries=100000, namespace=""):
+        """@param max_entries: the number of annotations to keep, after which
+                               the least recently used ones are evicted
+           @param namespace: a name for the pipeline the annotations are of,
+                             which is part of every key
+        """
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, text):
+        digest = hashlib.blake2b(self.namespace.encode("utf-8"), digest_size=16)
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def get(self, text):
+        """Returns the cached annotation of a text, without an id, or None."""
+        key = self.key(text)
+        serialized = self.entries.get(key)
+        if serialized is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(serialized)
+
+    def put(self, text, annotation):
+        """Caches the annotation of a text. Its id is not cached, as the same
+           text can appear under several ids.
+        """
+        annotation = {name: value for name, value in annotation.items() if name != "id"}
+        self.store(self.key(text), json.dumps(annotation, ensure_ascii=False, separators=(",", ":")))
+
+    def store(self, key, serialized):
+        self.entries[key] = serialized
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Returns the numbers of hits, misses, evictions and cached annotations."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def save(self, path):
+        """Saves the cached annotations to a file, least recently used first."""
+        with open(path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(json.dumps({"version": CACHE_FORMAT_VERSION, "namespace": self.namespace}))
+            cache_file.write("\n")
+            for key, serialized in self.entries.items():
+                cache_file.write(key.hex())
+                cache_file.write("\t")
+                cache_file.write(serialized)
+                cache_file.write("\n")
+
+    @classmethod
+    def load(cls, path, max_entries=100000, namespace=""):
+        """Creates a cache with the annotations saved to a file with `save`,
+           which is empty if the file does not exist. Saved annotations of
+           another namespace are not loaded.
+        """
+        cache = cls(max_entries, namespace)
+        if not os.path.exists(path):
+            return cache
+        with open(path, encoding="utf-8") as cache_file:
+            header = json.loads(cache_file.readline())
+            if header["version"] != CACHE_FORMAT_VERSION:
+                raise ValueError("The cache at {} has format version {}, but version {} is required".format(
+                    path, header["version"], CACHE_FORMAT_VERSION))
+            if header["namespace"] != namespace:
+                return cache
+            for line in cache_file:
+                key, serialized = line.rstrip("\n").split("\t", 1)
+                cache.store(bytes.fromhex(key), serialized)
+        return cache
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from corpus_annotation import annotate_texts # pylint: disable-msg=E0611,E0401
+
+class ServerOverloaded(Exception):
+    """Raised when the request queue of a `MicroBatcher` has no room left."""
+
+class RequestTooLarge(Exception):
+    """Raised when a request has more texts than the queue of a `MicroBatcher`
+       can hold, so that it would never be accepted.
+    """
+
+class MicroBatcher(object):
+    """Coalesces concurrent annotation requests into batches for `nlp.pipe`.
+       A batch is annotated once it holds `max_batch_size` texts, or
+       `max_latency` seconds after its first text arrived. At most
+       `max_queue_size` texts wait to be annotated, and new requests are
+       rejected with `ServerOverloaded` while the queue is full, or with
+       `RequestTooLarge` if they have more texts than that.
+
+       A text that fails to be annotated only fails its own request: when a
+       batch fails, its texts are annotated again one at a time.
+
+       The pipeline runs on a single worker thread, so the event loop keeps
+       accepting requests while a batch is annotated.
+    """
+    def __init__(self, nlp, max_batch_size=64, max_latency=0.005, max_queue_size=1024):
+        """@param nlp: the pipeline to annotate with
+           @param max_batch_size: the maximum number of texts in a batch
+           @param max_latency: the maximum number of seconds a text waits for
+                               other texts to join its batch
+           @param max_queue_size: the maximum number of texts waiting to be annotated
+        """
+        self.nlp = nlp
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.max_queue_size = max_queue_size
+        # the pipeline is not thread safe, so batches are annotated one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.task = None
+        self.n_requests = 0
+        self.n_texts = 0
+        self.n_rejected = 0
+        self.n_batches = 0
+        # seconds spent in each stage, summed over all texts
+        self.stage_seconds = OrderedDict([("queue", 0.0), ("annotate", 0.0), ("respond", 0.0)])
+
+    async def start(self):
+        """Starts batching on the running event loop."""
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown()
+
+    async def annotate(self, texts):
+        """Annotates texts as part of the next batches, and returns their
+           annotations, see `corpus_annotation.annotate_texts`.
+
+        @param texts: a list of raw texts
+        """
+        if len(texts) > self.max_queue_size:
+            raise RequestTooLarge("At most {} texts can be annotated at a time, but {} were sent".format(
+                self.max_queue_size, len(texts)))
+        if self.max_queue_size - self.queue.qsize() < len(texts):
+            self.n_rejected += 1
+            raise ServerOverloaded("{} texts are waiting to be annotated".format(self.queue.qsize()))
+        self.n_requests += 1
+        self.n_texts += len(texts)
+        loop = asyncio.get_event_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future, time.perf_counter()))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    def annotate_texts(self, texts):
+        annotations = list(annotate_texts(self.nlp, list(enumerate(texts)), batch_size=len(texts)))
+        for annotation in annotations:
+            # the ids are positions in the batch, which mean nothing to the client
+            del annotation["id"]
+        return annotations
+
+    def annotate_batch(self, texts):
+        """Returns the annotation of each text, or the exception raised
+           annotating it.
+        """
+        start = time.perf_counter()
+        try:
+            annotations = self.annotate_texts(texts)
+        except Exception as error: # pylint: disable=broad-except
+            if len(texts) == 1:
+                annotations = [error]
+            else:
+                # find the texts that fail, so the others are still annotated
+                annotations = []
+                for text in texts:
+                    try:
+                        annotations.extend(self.annotate_texts([text]))
+                    except Exception as text_error: # pylint: disable=broad-except
+                        annotations.append(text_error)
+        self.stage_seconds["annotate"] += (time.perf_counter() - start) * len(texts)
+        return annotations
+
+    async def next_batch(self):
+        loop = asyncio.get_event_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self.next_batch()
+            batch_start = time.perf_counter()
+            self.stage_seconds["queue"] += sum(batch_start - enqueued for _, _, enqueued in batch)
+            self.n_batches += 1
+            try:
+                annotations = await loop.run_in_executor(self.executor, self.annotate_batch,
+                                                         [text for text, _, _ in batch])
+            except Exception as error: # pylint: disable=broad-except
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future, _), annotation in zip(batch, annotations):
+                # the client may have gone away in the meantime
+                if future.done():
+                    continue
+                if isinstance(annotation, Exception):
+                    future.set_exception(annotation)
+                else:
+                    future.set_result(annotation)
+
+    def stats(self):
+        """Returns the queue depth, request and batch counts and the mean
+           milliseconds a text spends in each stage.
+        """
+        return OrderedDict([("queue_depth", self.queue.qsize() if self.queue is not None else 0),
+                            ("max_queue_size", self.max_queue_size),
+                            ("requests", self.n_requests),
+                            ("texts", self.n_texts),
+                            ("rejected_requests", self.n_rejected),
+                            ("batches", self.n_batches),
+                            ("mean_batch_size", self.n_texts / self.n_batches if self.n_batches else 0.0),
+                            ("mean_stage_ms", OrderedDict(
+                                (stage, seconds * 1000 / self.n_texts if self.n_texts else 0.0)
+                                for stage, seconds in self.stage_seconds.items()))])
+
+class AnnotationServer(object):
+    """A minimal HTTP/1.1 server on top of asyncio streams, with the endpoints
+
+       POST /annotate  {"text": "..."} or {"texts": ["...", ...]}, responds with
+                       the annotation of the text, or a list of annotations
+       GET /stats      the statistics of the `MicroBatcher`
+       GET /health     {"status": "ok"}
+
+       Requests are rejected with 503 while the batcher's queue is full, and
+       with 413 if they have more texts than it holds or a body of more than
+       max_body_bytes. A text that fails to be annotated fails its request
+       with 500.
+    """
+    def __init__(self, batcher, max_body_bytes=10 * 1024 * 1024):
+        """@param batcher: the `MicroBatcher` to annotate texts with
+           @param max_body_bytes: the maximum Content-Length of a request, larger
+                                  requests are rejected before reading their body
+        """
+        self.batcher = batcher
+        self.max_body_bytes = max_body_bytes
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        """Starts the batcher and listens on host and port. Port 0 picks a
+           free port, which is returned.
+        """
+        await self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle_request(self, method, path, body):
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        if path == "/stats" and method == "GET":
+            return HTTPStatus.OK, self.batcher.stats()
+        if path != "/annotate":
+            return HTTPStatus.NOT_FOUND, {"error": "Unknown path: {}".format(path)}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST to annotate"}
+        try:
+            request = json.loads(body.decode("utf-8"))
+            texts = [request["text"]] if "text" in request else request["texts"]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be a list of strings")
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return HTTPStatus.BAD_REQUEST, {
+                "error": "Expected {{\"text\": ...}} or {{\"texts\": [...]}}: {}".format(error)}
+        try:
+            annotations = await self.batcher.annotate(texts)
+        except ServerOverloaded as error:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(error)}
+        except RequestTooLarge as error:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(error)}
+        return HTTPStatus.OK, annotations[0] if "text" in request else annotations
+
+    def check_content_length(self, headers):
+        """Returns the length of the body of a request, or the status and
+           payload to reject the request with if its Content-Length header is
+           not a number of bytes or exceeds max_body_bytes.
+        """
+        content_length = headers.get("content-length", "0")
+        if not re.fullmatch(r"[0-9]+", content_length):
+            return None, HTTPStatus.BAD_REQUEST, {"error": "Malformed Content-Length: {}".format(content_length)}
+        if int(content_length) > self.max_body_bytes:
+            error = "The body has {} bytes, at most {} are accepted".format(content_length, self.max_body_bytes)
+            return None, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": error}
+        return int(content_length), None, None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    path = None
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}
+                    keep_alive = False
+                else:
+                    method, path, version = parts
+                    content_length, status, payload = self.check_content_length(headers)
+                    # the body of a rejected request is not read, so the connection can not be reused
+                    keep_alive = False
+                    if content_length is not None:
+                        body = await reader.readexactly(content_length)
+                        try:
+                            status, payload = await self.handle_request(method, path, body)
+                        except asyncio.CancelledError:
+                            raise
+                        except Exception as error: # pylint: disable=broad-except
+                            status = HTTPStatus.INTERNAL_SERVER_ERROR
+                            payload = {"error": "{}: {}".format(type(error).__name__, error)}
+                        connection = headers.get("connection", "").lower()
+                        keep_alive = (connection == "keep-alive" or
+                                      (version == "HTTP/1.1" and connection != "close"))
+                start = time.perf_counter()
+                self.write_response(writer, status, payload, keep_alive)
+                if path == "/annotate" and status == HTTPStatus.OK:
+                    n_texts = len(payload) if isinstance(payload, list) else 1
+                    self.batcher.stage_seconds["respond"] += (time.perf_counter() - start) * n_texts
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = ["HTTP/1.1 {} {}".format(status.value, status.phrase),
+                   "Content-Type: application/json; charset=utf-8",
+                   "Content-Length: {}".format(len(body)),
+                   "Connection: {}".format("keep-alive" if keep_alive else "close")]
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+
+def serve(nlp, host="127.0.0.1", port=8000, max_batch_size=64, max_latency=0.005, max_queue_size=1024,
+          max_body_bytes=10 * 1024 * 1024):
+    """Serves annotations with the pipeline until interrupted.
+
+    @param nlp: the pipeline, e.g. from `corpus_annotation.load_model`
+    @param host: the host to listen on
+    @param port: the port to listen on
+    @param max_batch_size: see `MicroBatcher`
+    @param max_latency: see `MicroBatcher`
+    @param max_queue_size: see `MicroBatcher`
+    @param max_body_bytes: see `AnnotationServer`
+    """
+    loop = asyncio.get_event_loop()
+    server = AnnotationServer(MicroBatcher(nlp, max_batch_size, max_latency, max_queue_size), max_body_bytes)
+    port = loop.run_until_complete(server.start(host, port))
+    print("serving annotations on http://{}:{}".format(host, port), file=sys.stderr)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
@@ -0,0 +1,181 @@
+from array import array
+from itertools import repeat
+
+import numpy
+from spacy.attrs import ORTH, LENGTH, SPACY # pylint: disable-msg=E0611,E0401
+
+# whether each code point up to the last whitespace character, U+3000, is
+# whitespace by str.isspace, which the spaCy tokenizer splits texts with. The
+# last entry stands for all code points after it.
+IS_SPACE = numpy.zeros(0x3002, dtype=bool)
+IS_SPACE[[code for code in range(0x3001) if chr(code).isspace()]] = True
+
+def chunk_offsets(codes, text_starts):
+    """Returns the [start, end) offsets of the chunks the spaCy tokenizer
+       tokenizes on their own, like `pipeline_profiler.tokenizer_chunks`, and
+       whether they are whitespace.
+
+    @param codes: the code points of the texts, one after the other
+    @param text_starts: the offsets of the non empty texts in codes
+    """
+    space = IS_SPACE[numpy.minimum(codes, len(IS_SPACE) - 1)]
+    # chunks are runs of whitespace or non whitespace within a text
+    is_text_start = numpy.zeros(len(codes), dtype=bool)
+    is_text_start[text_starts] = True
+    is_run_start = is_text_start.copy()
+    is_run_start[1:] |= space[1:] != space[:-1]
+    starts = numpy.flatnonzero(is_run_start)
+    ends = numpy.append(starts[1:], len(codes))
+    space = space[starts]
+    # except for the single space after a token, which is left out
+    starts = starts + (space & (codes[starts] == ord(" ")) & ~is_text_start[starts])
+    keep = starts < ends
+    return starts[keep], ends[keep], space[keep]
+
+class BatchTokenizer(object):
+    """Tokenizes batches of texts with a spaCy tokenizer, such as the combined
+       rule tokenizer, into flat arrays of token offsets, without creating a
+       Doc per text.
+
+       The spaCy tokenizer tokenizes each whitespace delimited chunk of a text
+       on its own. This tokenizer keeps the tokenization of every chunk it has
+       seen as offsets relative to the chunk, so a batch is tokenized by
+       finding the chunks of its texts with NumPy, looking them up, and
+       gathering their tokens. Only unseen chunks are passed to the spaCy
+       tokenizer, joined into a single text.
+
+       The tokenizer's rules must not change while it is used, e.g. with
+       `util.add_abbreviations`, unless `clear` is called afterwards.
+
+       >>> starts, ends, orths, text_starts = BatchTokenizer(nlp.tokenizer)(texts)
+       >>> first = slice(text_starts[0], text_starts[1])
+       >>> tokens = [texts[0][start:end] for start, end in zip(starts[first], ends[first])]
+    """
+    def __init__(self, tokenizer, max_chunks=1000000):
+        """@param tokenizer: the spaCy tokenizer, e.g. `combined_rule_tokenizer(nlp)`
+           @param max_chunks: the number of chunks to keep the tokenization
+                              of, after which they are all forgotten
+        """
+        self.tokenizer = tokenizer
+        self.max_chunks = max_chunks
+        self.clear()
+
+    def clear(self):
+        """Forgets the tokenization of all chunks."""
+        self.chunk_ids = {}
+        # the tokens of chunk i are [chunk_token_starts[i], chunk_token_starts[i + 1])
+        self.chunk_token_starts = array("q", [0])
+        # the offsets of the tokens relative to their chunk, and their ORTH ids
+        self.token_starts = array("q")
+        self.token_ends = array("q")
+        self.token_orths = array("Q")
+
+    def add_tokens(self, doc, skip=0):
+        """Adds the ORTH ids of the tokens of a Doc to the token table, after
+           skipping some, and returns their offsets and lengths.
+        """
+        columns = doc.to_array([ORTH, LENGTH, SPACY])
+        lengths = columns[:, 1].astype(numpy.int64)
+        starts = numpy.zeros(len(doc), dtype=numpy.int64)
+        numpy.cumsum(lengths[:-1] + columns[:-1, 2].astype(numpy.int64), out=starts[1:])
+        self.token_orths.frombytes(columns[skip:, 0].astype(numpy.uint64).tobytes())
+        return starts[skip:], lengths[skip:]
+
+    def add_chunks(self, chunks):
+        """Tokenizes chunks that have not been seen, and adds them."""
+        chunk_ids = self.chunk_ids
+        words = [chunk for chunk in chunks if not chunk[0].isspace()]
+        if words:
+            # words separated by single spaces are tokenized on their own
+            starts, lengths = self.add_tokens(self.tokenizer(" ".join(words)))
+            word_starts = numpy.zeros(len(words), dtype=numpy.int64)
+            numpy.cumsum([len(word) + 1 for word in words[:-1]], out=word_starts[1:])
+            token_words = numpy.searchsorted(word_starts, starts, side="right") - 1
+            relative_starts = starts - word_starts[token_words]
+            self.token_starts.frombytes(relative_starts.tobytes())
+            self.token_ends.frombytes((relative_starts + lengths).tobytes())
+            n_tokens = numpy.bincount(token_words, minlength=len(words))
+            first_token = self.chunk_token_starts[-1]
+            self.chunk_token_starts.frombytes((first_token + numpy.cumsum(n_tokens)).tobytes())
+            for word in words:
+                chunk_ids[word] = len(chunk_ids)
+        for chunk in chunks:
+            if chunk[0].isspace():
+                # after a word and the single space the tokenizer leaves out,
+                # a whitespace chunk is tokenized as it is, even if it starts
+                # with a space
+                starts, lengths = self.add_tokens(self.tokenizer("x " + chunk), skip=1)
+                self.token_starts.frombytes((starts - 2).tobytes())
+                self.token_ends.frombytes((starts - 2 + lengths).tobytes())
+                self.chunk_token_starts.append(self.chunk_token_starts[-1] + len(starts))
+                chunk_ids[chunk] = len(chunk_ids)
+
+    def chunk_ids_of(self, chunks):
+        """Returns the ids of chunks, adding those that have not been seen.
+           All chunks are forgotten first if adding the unseen ones would
+           exceed max_chunks.
+        """
+        ids = numpy.fromiter(map(self.chunk_ids.get, chunks, repeat(-1)), dtype=numpy.int64, count=len(chunks))
+        if (ids < 0).any():
+            unseen = list(dict.fromkeys(chunk for chunk, chunk_id in zip(chunks, ids.tolist()) if chunk_id < 0))
+            if len(self.chunk_ids) + len(unseen) > self.max_chunks:
+                self.clear()
+                unseen = list(dict.fromkeys(chunks))
+            self.add_chunks(unseen)
+            ids = numpy.fromiter(map(self.chunk_ids.__getitem__, chunks), dtype=numpy.int64, count=len(chunks))
+        return ids
+
+    def __call__(self, texts):
+        """Tokenizes texts and returns the [start, end) character offsets of
+           their tokens as two int32 arrays, the ORTH ids of the tokens as a
+           uint64 array, and an int64 array with the index of the first token
+           of each text, followed by the number of tokens, so that the tokens
+           of the i-th text are [text_starts[i], text_starts[i + 1]). The
+           tokens and offsets are those of `[tokenizer(text) for text in texts]`.
+
+        @param texts: a list of texts
+        """
+        text_lengths = numpy.fromiter(map(len, texts), dtype=numpy.int64, count=len(texts))
+        text_offsets = numpy.zeros(len(texts) + 1, dtype=numpy.int64)
+        numpy.cumsum(text_lengths, out=text_offsets[1:])
+        text_starts = numpy.zeros(len(texts) + 1, dtype=numpy.int64)
+        if not text_offsets[-1]:
+            return (numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int32),
+                    numpy.zeros(0, dtype=numpy.uint64), text_starts)
+        joined = "".join(texts)
+        codes = numpy.frombuffer(joined.encode("utf-32-le"), dtype=numpy.uint32)
+        starts, ends, space = chunk_offsets(codes, text_offsets[:-1][text_lengths > 0])
+
+        # the non whitespace chunks are what str.split returns, and the others
+        # are mostly new lines
+        words = []
+        for text in texts:
+            words.extend(text.split())
+        space_indices = numpy.flatnonzero(space)
+        spaces = [joined[start:end] for start, end in zip(starts[space_indices].tolist(),
+                                                          ends[space_indices].tolist())]
+        # looked up together, so that forgetting the chunks for the ones of
+        # this batch does not invalidate ids already looked up
+        word_and_space_ids = self.chunk_ids_of(words + spaces)
+        ids = numpy.empty(len(starts), dtype=numpy.int64)
+        ids[~space] = word_and_space_ids[:len(words)]
+        ids[space_indices] = word_and_space_ids[len(words):]
+
+        chunk_token_starts = numpy.frombuffer(self.chunk_token_starts, dtype=numpy.int64)
+        first_tokens = chunk_token_starts[ids]
+        counts = chunk_token_starts[ids + 1] - first_tokens
+        token_chunks = numpy.repeat(numpy.arange(len(ids)), counts)
+        # the index of each token in the token table
+        chunk_first_tokens = numpy.cumsum(counts) - counts
+        table_tokens = (first_tokens[token_chunks] + numpy.arange(len(token_chunks)) -
+                        chunk_first_tokens[token_chunks])
+
+        # empty texts start where the next text does, and own no chunks
+        chunk_texts = numpy.searchsorted(text_offsets, starts, side="right") - 1
+        token_bases = (starts - text_offsets[chunk_texts])[token_chunks]
+        token_starts = token_bases + numpy.frombuffer(self.token_starts, dtype=numpy.int64)[table_tokens]
+        token_ends = token_bases + numpy.frombuffer(self.token_ends, dtype=numpy.int64)[table_tokens]
+        orths = numpy.frombuffer(self.token_orths, dtype=numpy.uint64)[table_tokens]
+        numpy.cumsum(numpy.bincount(chunk_texts, weights=counts, minlength=len(texts)).astype(numpy.int64),
+                     out=text_starts[1:])
+        return token_starts.astype(numpy.int32), token_ends.astype(numpy.int32), orths, text_starts
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# the file in a model directory that maps its files to blobs in a blob store
+MANIFEST_FILE_NAME = "blobs.json"
+
+# the file in a directory blobs were resolved into that records the blob each
+# file was recreated from
+RESOLVED_FILE_NAME = "blobs.resolved.json"
+
+# the files that stay in the model directory, as spaCy reads them to package
+# or find the model before any blobs are resolved
+KEPT_FILE_NAMES = {"meta.json", MANIFEST_FILE_NAME}
+
+COMPRESSIONS = ["gzip", "lz4", "zstd"]
+
+def get_codec(compression):
+    """Returns the (file extension, compress, decompress) functions of a
+       compression. lz4 and zstd need the lz4 and zstandard packages.
+
+    @param compression: None or one of `COMPRESSIONS`
+    """
+    if compression is None:
+        return "", None, None
+    if compression == "gzip":
+        return ".gz", lambda data: gzip.compress(data, compresslevel=6), gzip.decompress
+    if compression == "lz4":
+        try:
+            import lz4.frame # pylint: disable-msg=E0611,E0401
+        except ImportError:
+            raise ImportError("lz4 compression requires the lz4 package: pip install lz4")
+        return ".lz4", lz4.frame.compress, lz4.frame.decompress
+    if compression == "zstd":
+        try:
+            import zstandard # pylint: disable-msg=E0611,E0401
+        except ImportError:
+            raise ImportError("zstd compression requires the zstandard package: pip install zstandard")
+        return ".zst", zstandard.ZstdCompressor(level=10).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError("Unknown compression {!r}, expected one of {}".format(compression, COMPRESSIONS))
+
+def write_atomically(path, data):
+    # several processes may store or resolve the same blob at once
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, "wb") as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+
+def store_blobs(model_path, store_path, compression=None):
+    """Moves the files of a model saved with `nlp.to_disk` into a content
+       addressed blob store, and writes a manifest in the model directory that
+       maps each file to its blob. Files with the same contents, such as the
+       vocab and vectors of two variants of a model, are only stored once in a
+       store, and are optionally compressed. Returns the manifest.
+
+    @param model_path: the model directory
+    @param store_path: the blob store directory, which can be shared by models
+                       and is referred to relative to the model directory, so
+                       the two can be moved together. A store inside the model
+                       directory keeps the model self contained for packaging.
+    @param compression: None or one of `COMPRESSIONS`
+    """
+    model_path, store_path = str(model_path), str(store_path)
+    extension, compress, _ = get_codec(compression)
+    os.makedirs(store_path, exist_ok=True)
+    store_path = os.path.realpath(store_path)
+
+    files = {}
+    for directory, directories, file_names in os.walk(model_path):
+        if os.path.realpath(directory) == store_path:
+            directories[:] = []
+            continue
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            relative_path = os.path.relpath(path, model_path).replace(os.sep, "/")
+            if relative_path in KEPT_FILE_NAMES:
+                continue
+            if relative_path == RESOLVED_FILE_NAME:
+                # the files it records are moved to the store
+                os.remove(path)
+                continue
+            with open(path, "rb") as model_file:
+                data = model_file.read()
+            blob = hashlib.sha256(data).hexdigest() + extension
+            blob_path = os.path.join(store_path, blob)
+            if not os.path.exists(blob_path):
+                write_atomically(blob_path, compress(data) if compress else data)
+            files[relative_path] = {"blob": blob, "compression": compression, "bytes": len(data)}
+            os.remove(path)
+
+    # the directories are kept, as spaCy checks for them before reading their files
+    manifest = {"store": os.path.relpath(store_path, os.path.realpath(model_path)).replace(os.sep, "/"),
+                "files": files}
+    with open(os.path.join(model_path, MANIFEST_FILE_NAME), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(model_path):
+    """Returns the manifest of a model directory saved with `store_blobs`, or
+       None if its files are not in a blob store.
+    """
+    manifest_path = os.path.join(str(model_path), MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+def resolve_blobs(model_path, target_path=None):
+    """Recreates the files of a model directory saved with `store_blobs`, so
+       spaCy can load it from the returned directory as usual. Uncompressed
+       blobs are hard linked where possible, so they take no further disk space
+       and models that share them share their pages in memory. Files that were
+       already recreated from the same blob, as recorded in the
+       `RESOLVED_FILE_NAME` of the target directory, are left alone, which
+       makes loading the model again as fast as loading a plain model
+       directory. Files of another blob, e.g. from an earlier build of the
+       model with weights of the same size, are replaced.
+
+    @param model_path: the model directory
+    @param target_path: the directory to recreate the model in, by default
+                        the model directory itself
+    """
+    model_path = str(model_path)
+    target_path = model_path if target_path is None else str(target_path)
+    manifest = load_manifest(model_path)
+    if manifest is None:
+        return model_path
+    store_path = os.path.join(model_path, manifest["store"])
+
+    if target_path != model_path:
+        os.makedirs(target_path, exist_ok=True)
+        for file_name in KEPT_FILE_NAMES:
+            shutil.copyfile(os.path.join(model_path, file_name), os.path.join(target_path, file_name))
+    resolved_path = os.path.join(target_path, RESOLVED_FILE_NAME)
+    resolved = {}
+    if os.path.exists(resolved_path):
+        with open(resolved_path, encoding="utf-8") as resolved_file:
+            resolved = json.load(resolved_file)
+    blobs = {relative_path: entry["blob"] for relative_path, entry in manifest["files"].items()}
+    for relative_path, entry in sorted(manifest["files"].items()):
+        path = os.path.join(target_path, *relative_path.split("/"))
+        if os.path.exists(path) and resolved.get(relative_path) == entry["blob"]:
+            continue
+        if os.path.exists(path):
+            os.remove(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob_path = os.path.join(store_path, entry["blob"])
+        _, _, decompress = get_codec(entry["compression"])
+        if decompress is None:
+            try:
+                os.link(blob_path, path)
+                continue
+            except OSError:
+                # e.g. the target is on another file system
+                pass
+        with open(blob_path, "rb") as blob_file:
+            data = blob_file.read()
+        write_atomically(path, decompress(data) if decompress else data)
+    if resolved != blobs:
+        # recorded once all the files are in place, so an interrupted
+        # resolution is completed the next time
+        write_atomically(resolved_path, json.dumps(blobs, indent=2, sort_keys=True).encode("utf-8"))
+    return target_path
+
+def disk_usage(paths):
+    """Returns the bytes on disk of the files under some paths, counting hard
+       linked files once.
+    """
+    seen = set()
+    total = 0
+    for root in paths:
+        for directory, _, file_names in os.walk(str(root)):
+            for file_name in file_names:
+                stat = os.stat(os.path.join(directory, file_name))
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+    return total
@@ -0,0 +1,217 @@
+import json
+from array import array
+
+import numpy
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from custom_tokenizer import remove_new_lines_with_offsets # pylint: disable-msg=E0611,E0401
+from sentence_offsets import sentence_starts # pylint: disable-msg=E0611,E0401
+
+# bump this whenever the layout of a shard changes
+COLUMNAR_FORMAT_VERSION = 1
+
+# the files of a shard directory
+META_FILE = "meta.json"
+STRINGS_FILE = "strings.json"
+DOC_IDS_FILE = "doc_ids.json"
+# uint32, the index of each token's text in the shard's string table
+TOKEN_STRINGS_FILE = "token_strings.npy"
+# int32, the [start, end) character offsets of each token in the original text of its document
+TOKEN_STARTS_FILE = "token_starts.npy"
+TOKEN_ENDS_FILE = "token_ends.npy"
+# uint8, one bit per token that is set if the token starts a sentence (numpy.packbits order)
+SENT_STARTS_FILE = "sent_starts.npy"
+# int64, the index of the first token of each document, followed by the number of tokens
+DOC_TOKEN_STARTS_FILE = "doc_token_starts.npy"
+
+def original_offsets(offsets, cleaned_offsets):
+    """Vectorized `NewLineOffsets.to_original` for an array of offsets."""
+    cleaned_offsets = numpy.asarray(cleaned_offsets, dtype=numpy.int64)
+    if not len(offsets):
+        return cleaned_offsets
+    cleaned_starts = numpy.frombuffer(offsets.cleaned_starts, dtype=numpy.int64)
+    shifts = numpy.concatenate([[0], numpy.frombuffer(offsets.shifts, dtype=numpy.int64)])
+    return cleaned_offsets + shifts[numpy.searchsorted(cleaned_starts, cleaned_offsets, side="right")]
+
+class ShardWriter(object):
+    """Accumulates tokenized and segmented documents and writes them as a
+       columnar shard: a directory of flat arrays with one entry per token, and
+       a string table shared by the documents of the shard.
+    """
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.doc_ids = []
+        self.token_strings = array("I")
+        self.token_starts = array("i")
+        self.token_ends = array("i")
+        self.sent_starts = array("B")
+        self.doc_token_starts = array("q", [0])
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @property
+    def n_tokens(self):
+        return len(self.token_strings)
+
+    def add(self, doc_id, doc, offsets=None):
+        """Adds a document.
+
+        @param doc_id: the id of the document, anything JSON serializable
+        @param doc: the processed spaCy Doc
+        @param offsets: the `NewLineOffsets` of the text the Doc was made from,
+                        if it was cleaned by `remove_new_lines_with_offsets`,
+                        so that offsets refer to the original text
+        """
+        string_ids = self.string_ids
+        for token in doc:
+            string_id = string_ids.get(token.text)
+            if string_id is None:
+                string_id = string_ids[token.text] = len(self.strings)
+                self.strings.append(token.text)
+            self.token_strings.append(string_id)
+
+        starts = numpy.fromiter((token.idx for token in doc), dtype=numpy.int64, count=len(doc))
+        ends = starts + numpy.fromiter((len(token) for token in doc), dtype=numpy.int64, count=len(doc))
+        if offsets is not None:
+            # the last character of a token is mapped, so a token never ends after removed text
+            starts, ends = original_offsets(offsets, starts), original_offsets(offsets, ends - 1) + 1
+        self.token_starts.frombytes(starts.astype(numpy.int32).tobytes())
+        self.token_ends.frombytes(ends.astype(numpy.int32).tobytes())
+
+        sent_starts = numpy.zeros(len(doc), dtype=numpy.uint8)
+        sent_starts[sentence_starts(doc)] = 1
+        self.sent_starts.frombytes(sent_starts.tobytes())
+        self.doc_ids.append(doc_id)
+        self.doc_token_starts.append(len(self.token_strings))
+
+    def write(self, path):
+        """Writes the shard to a directory, which is created if necessary."""
+        if not os.path.exists(path):
+            os.makedirs(path)
+        meta = {"version": COLUMNAR_FORMAT_VERSION,
+                "docs": len(self.doc_ids),
+                "tokens": len(self.token_strings),
+                "strings": len(self.strings)}
+        for name, data in [(META_FILE, meta), (STRINGS_FILE, self.strings), (DOC_IDS_FILE, self.doc_ids)]:
+            with open(os.path.join(path, name), "w", encoding="utf-8") as json_file:
+                json.dump(data, json_file, ensure_ascii=False)
+        columns = [(TOKEN_STRINGS_FILE, numpy.frombuffer(self.token_strings, dtype=numpy.uint32)),
+                   (TOKEN_STARTS_FILE, numpy.frombuffer(self.token_starts, dtype=numpy.int32)),
+                   (TOKEN_ENDS_FILE, numpy.frombuffer(self.token_ends, dtype=numpy.int32)),
+                   (SENT_STARTS_FILE, numpy.packbits(numpy.frombuffer(self.sent_starts, dtype=numpy.uint8))),
+                   (DOC_TOKEN_STARTS_FILE, numpy.frombuffer(self.doc_token_starts, dtype=numpy.int64))]
+        for name, column in columns:
+            numpy.save(os.path.join(path, name), column)
+
+class CorpusShard(object):
+    """Reads a shard written by `ShardWriter`. The token columns are memory
+       mapped, so opening a shard only reads its string table and document
+       ids, and sentences are read without creating spaCy Docs.
+    """
+    def __init__(self, path, mmap=True):
+        """@param path: the shard directory
+           @param mmap: whether to memory map the token columns instead of
+                        reading them into memory
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta["version"] != COLUMNAR_FORMAT_VERSION:
+            raise ValueError("The shard at {} has format version {}, but version {} is required".format(
+                path, self.meta["version"], COLUMNAR_FORMAT_VERSION))
+        with open(os.path.join(path, STRINGS_FILE), encoding="utf-8") as strings_file:
+            self.strings = json.load(strings_file)
+        with open(os.path.join(path, DOC_IDS_FILE), encoding="utf-8") as doc_ids_file:
+            self.doc_ids = json.load(doc_ids_file)
+        mmap_mode = "r" if mmap else None
+        load = lambda name: numpy.load(os.path.join(path, name), mmap_mode=mmap_mode)
+        self.token_strings = load(TOKEN_STRINGS_FILE)
+        self.token_starts = load(TOKEN_STARTS_FILE)
+        self.token_ends = load(TOKEN_ENDS_FILE)
+        self.packed_sent_starts = load(SENT_STARTS_FILE)
+        self.doc_token_starts = load(DOC_TOKEN_STARTS_FILE)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def token_range(self, i):
+        """Returns the [start, end) indices of the tokens of the i-th document."""
+        return int(self.doc_token_starts[i]), int(self.doc_token_starts[i + 1])
+
+    def sent_starts(self, start, end):
+        """Returns a bool array of whether each token in [start, end) starts a
+           sentence, unpacking only the bytes that hold their bits.
+        """
+        bits = numpy.unpackbits(self.packed_sent_starts[start // 8:(end + 7) // 8])
+        return bits[start % 8:start % 8 + end - start].astype(bool)
+
+    def tokens(self, start, end):
+        strings = self.strings
+        return [strings[string_id] for string_id in self.token_strings[start:end].tolist()]
+
+    def sentences(self, i):
+        """Returns the [start, end) token indices of the sentences of the i-th
+           document, relative to the document.
+        """
+        start, end = self.token_range(i)
+        boundaries = numpy.flatnonzero(self.sent_starts(start, end)).tolist() + [end - start]
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def iter_sentences(self):
+        """Yields every sentence of the shard as a dict with the id of its
+           document, its token texts and the [start, end) character offsets of
+           its tokens in the original text.
+        """
+        for i, doc_id in enumerate(self.doc_ids):
+            doc_start, _ = self.token_range(i)
+            for start, end in self.sentences(i):
+                start += doc_start
+                end += doc_start
+                yield {"id": doc_id,
+                       "tokens": self.tokens(start, end),
+                       "token_offsets": numpy.stack([self.token_starts[start:end],
+                                                     self.token_ends[start:end]], axis=1)}
+
+def shard_path(output_dir, shard):
+    return os.path.join(output_dir, "shard-{:05d}".format(shard))
+
+def write_corpus(nlp, documents, output_dir, shard_size=10000, batch_size=64):
+    """Processes (id, text) pairs with a pipeline and writes their tokens and
+       sentences as columnar shards of at most `shard_size` documents. New
+       lines in the middle of words are removed before processing, and
+       offsets refer to the original text. Returns the number of shards.
+
+    @param nlp: the pipeline, e.g. from `util.create_combined_rule_model()`
+    @param documents: an iterable of (id, text) pairs, e.g. from
+                      `corpus_annotation.read_texts`
+    @param output_dir: the directory to write the shards to
+    @param shard_size: the maximum number of documents in a shard
+    @param batch_size: the batch size passed to `nlp.pipe`
+    """
+    def cleaned_documents():
+        for doc_id, text in documents:
+            cleaned_text, offsets = remove_new_lines_with_offsets(text)
+            yield cleaned_text, (doc_id, offsets)
+
+    n_shards = 0
+    writer = ShardWriter()
+    for doc, (doc_id, offsets) in nlp.pipe(cleaned_documents(), as_tuples=True, batch_size=batch_size):
+        writer.add(doc_id, doc, offsets)
+        if len(writer) == shard_size:
+            writer.write(shard_path(output_dir, n_shards))
+            n_shards += 1
+            writer = ShardWriter()
+    if len(writer) or not n_shards:
+        writer.write(shard_path(output_dir, n_shards))
+        n_shards += 1
+    return n_shards
+
+def read_corpus(corpus_dir, mmap=True):
+    """Returns the shards written by `write_corpus` in order."""
+    names = sorted(name for name in os.listdir(corpus_dir) if name.startswith("shard-"))
+    return [CorpusShard(os.path.join(corpus_dir, name), mmap) for name in names]
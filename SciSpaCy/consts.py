@@ -15,3 +15,35 @@ ABBREVIATIONS = ["sec.",
                  "No.",
                  "Nos.",
                  "al."]
+
+# the rules of combined_rule_sentence_segmenter, in the format of segmentation_rules.py.
+# Later rules override earlier ones, and bracket rules are applied after the others.
+DOUBLE_NEW_LINES = ["\n\n", "\n\n\n\n"]
+SEGMENTATION_RULES = [
+    # for example: 'in word order or syntactic structure
+    # (e.g., “cats climb trees” vs. “trees climb cats”).'
+    {"name": "curly_quote_after_period",
+     "prev": {"NOT": {"TEXT": "."}}, "token": {"TEXT": ["“", "”"]}, "action": "not_start"},
+    # for example: 'LSTM networks, which we review in Sec. 2, have been successfully'
+    {"name": "number_after_abbreviation",
+     "prev": {"IS_ABBREVIATION": True}, "token": {"STARTS_WITH_DIGIT": True}, "action": "not_start"},
+    # for example: 'environments such as Microsoft Robotics Studio [9] and Webots [10] have many'
+    {"name": "number_after_bracket",
+     "prev": {"TEXT": "["}, "token": {"STARTS_WITH_DIGIT": True}, "action": "not_start"},
+    # for example: 'the support of the Defense Advanced Resarch Projects Agency (DARPA) Deep Exploration'
+    {"name": "capital_after_paren",
+     "prev2": {"NOT": {"TEXT": "."}}, "prev": {"TEXT": ")"}, "token": {"STARTS_WITH_UPPER": True},
+     "action": "not_start"},
+    {"name": "period", "token": {"TEXT": "."}, "action": "not_start"},
+    # section headers are their own sentences, for example: '\n\n2 Long Short-Term Memory Networks\n\n'
+    {"name": "after_double_new_line", "prev": {"TEXT": DOUBLE_NEW_LINES}, "token": {}, "action": "start"},
+    {"name": "double_new_line", "token": {"TEXT": DOUBLE_NEW_LINES}, "next": {}, "action": "start"},
+    # sentences can only start with ( if there is a complete sentence within the parens, with
+    # a . serving as a proxy for a complete sentence, or if it is something like (A)
+    {"name": "parens", "open": {"TEXT": "("}, "close": {"TEXT": ")"}, "action": "not_start",
+     "unless": [{"before_close": {"TEXT": "."}}, {"before_close": {"LENGTH": 1}, "inside": 1}],
+     "unmatched": "not_start"},
+    {"name": "brackets", "open": {"TEXT": "["}, "close": {"TEXT": "]"}, "action": "not_start",
+     "unless": [{"before_close": {"TEXT": "."}}, {"before_close": {"LENGTH": 1}, "inside": 1}],
+     "unmatched": "not_start"},
+]
@@ -0,0 +1,354 @@
+import json
+import multiprocessing
+import sys
+import os
+import time
+from collections import deque
+
+import numpy
+import spacy
+from spacy.attrs import ORTH, SENT_START # pylint: disable-msg=E0611,E0401
+from spacy.util import minibatch
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from custom_tokenizer import remove_new_lines_with_offsets # pylint: disable-msg=E0611,E0401
+from streaming import stream_sentences # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_model # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_segmentation_model # pylint: disable-msg=E0611,E0401
+from sentence_offsets import sentence_token_offsets # pylint: disable-msg=E0611,E0401
+from annotation_cache import AnnotationCache # pylint: disable-msg=E0611,E0401
+from incremental_segmentation import is_segmenter, paragraph_breaks # pylint: disable-msg=E0611,E0401
+from incremental_segmentation import unmatched_brackets # pylint: disable-msg=E0611,E0401
+
+# the model each worker process annotates with, loaded once by init_worker
+WORKER_NLP = None
+# documents longer than this are annotated in windows by the worker
+WORKER_WINDOW_SIZE = 100000
+# the worker's cache of annotations of texts it has seen, if any
+WORKER_CACHE = None
+
+def load_model(model):
+    """Loads the model to annotate with.
+
+    @param model: "combined_rule" for `util.create_combined_rule_model()`,
+                  "combined_rule_segmentation" for the tokenize and segment only
+                  `util.create_combined_rule_segmentation_model()`, otherwise
+                  the name or path of a spaCy model such as the packaged SciSpaCy model
+    """
+    if model == "combined_rule":
+        return create_combined_rule_model()
+    if model == "combined_rule_segmentation":
+        return create_combined_rule_segmentation_model()
+    return spacy.load(model)
+
+def read_texts(path, input_format="jsonl", text_field="text", id_field="id"):
+    """Streams (id, text) pairs from a corpus file without reading it into memory.
+
+    @param path: the corpus file
+    @param input_format: "jsonl" for one JSON object per line, or "text" for one
+                         document per line, in which case the id is the line number
+    @param text_field: the field holding the text of a JSON object
+    @param id_field: the field holding the id of a JSON object, the line number
+                     is used if it is missing
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        for line_number, line in enumerate(corpus_file):
+            if input_format == "jsonl":
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                yield document.get(id_field, line_number), document[text_field]
+            elif input_format == "text":
+                yield line_number, line.rstrip("\n")
+            else:
+                raise ValueError("Unknown input format: {}".format(input_format))
+
+def annotate_long_text(nlp, doc_id, text, window_size=100000):
+    """Annotates a single document in windows of at most `window_size`
+       characters with `streaming.stream_sentences`, and returns the same dict
+       as `annotate_texts`.
+    """
+    tokens = []
+    token_offsets = []
+    sentences = []
+    for sentence in stream_sentences(nlp, text, window_size):
+        sentences.append([len(tokens), len(tokens) + len(sentence["tokens"])])
+        tokens.extend(sentence["tokens"])
+        token_offsets.extend(sentence["token_offsets"])
+    return {"id": doc_id,
+            "tokens": tokens,
+            "token_offsets": token_offsets,
+            "sentences": sentences}
+
+def annotate_texts(nlp, documents, batch_size=64, window_size=100000, cache=None):
+    """Annotates (id, text) pairs with tokens and sentences. New lines in the
+       middle of words are removed before annotating, and all offsets refer
+       to the original text.
+
+       Each document becomes a dict with the id, the token texts, the
+       [start, end) character offsets of the tokens and the [start, end)
+       token indices of the sentences.
+
+    @param nlp: the model to annotate with
+    @param documents: a list of (id, text) pairs
+    @param batch_size: the batch size passed to `nlp.pipe`
+    @param window_size: documents longer than this many characters are
+                        annotated in windows, see `annotate_long_text`
+    @param cache: an `annotation_cache.AnnotationCache` of the annotations of
+                  texts seen before, which are not annotated again. Texts
+                  that are in documents more than once are annotated once. If
+                  the pipeline only has combined rule sentence segmenters,
+                  such as `util.create_combined_rule_segmentation_model()`,
+                  the cache holds paragraphs instead, see `annotate_paragraphs`.
+    """
+    if cache is None:
+        yield from annotate_uncached_texts(nlp, documents, batch_size, window_size)
+        return
+    if all(is_segmenter(component) for _, component in nlp.pipeline):
+        yield from annotate_paragraphs(nlp, documents, cache, batch_size, window_size)
+        return
+    cached = [cache.get(text) for _, text in documents]
+    # the first document with each text that is not cached, and the number of
+    # documents with the text
+    uncached = []
+    counts = {}
+    for (doc_id, text), annotation in zip(documents, cached):
+        if annotation is None:
+            if text not in counts:
+                uncached.append((doc_id, text))
+                counts[text] = 0
+            counts[text] += 1
+    annotations = annotate_uncached_texts(nlp, uncached, batch_size, window_size)
+    # the serialized annotations of the texts that come again in documents
+    repeated = {}
+    for (doc_id, text), annotation in zip(documents, cached):
+        if annotation is None:
+            counts[text] -= 1
+            if text in repeated:
+                serialized = repeated[text] if counts[text] else repeated.pop(text)
+                annotation = json.loads(serialized)
+            else:
+                annotation = next(annotations)
+                cache.put(text, annotation)
+                if counts[text]:
+                    repeated[text] = json.dumps({name: value for name, value in annotation.items()
+                                                 if name != "id"})
+                yield annotation
+                continue
+        yield dict(id=doc_id, **annotation)
+
+def split_paragraphs(text):
+    """Cleans a text with `remove_new_lines_with_offsets` and returns the
+       cleaned text, its offsets and the [start, end) offsets of its
+       paragraphs in the cleaned text with the number of context tokens at
+       their end. As in `paragraph_parallel.ParagraphParallelPipeline`, a
+       paragraph after the first starts with the paragraph break before it,
+       and a paragraph before the last ends with the break after it, which
+       only gives its last tokens the same context as in the whole text.
+    """
+    cleaned, offsets = remove_new_lines_with_offsets(text)
+    breaks = paragraph_breaks(cleaned)
+    starts = [0] + [start for start, _ in breaks]
+    ends = [end for _, end in breaks] + [len(cleaned)]
+    contexts = [1] * len(breaks) + [0]
+    return cleaned, offsets, list(zip(starts, ends, contexts))
+
+def annotate_paragraph(nlp, doc, context):
+    """Returns the annotation of a paragraph without its context tokens: the
+       [start, end) offsets of its tokens in its cleaned text, the indices of
+       the tokens that start a sentence, whether any sentence boundary is set,
+       and whether its brackets are unmatched, see
+       `incremental_segmentation.unmatched_brackets`.
+    """
+    n_tokens = len(doc) - context
+    sent_starts = doc.to_array(SENT_START)[:n_tokens].astype(numpy.int64)
+    return {"tokens": [token.text for token in doc[:n_tokens]],
+            "token_offsets": [[token.idx, token.idx + len(token)] for token in doc[:n_tokens]],
+            "sentence_starts": numpy.flatnonzero(sent_starts == 1).tolist(),
+            "boundaries_set": bool(sent_starts.any()),
+            "unmatched_brackets": list(unmatched_brackets(nlp, doc.vocab.strings, doc.to_array(ORTH)[:n_tokens]))}
+
+def annotate_paragraphs(nlp, documents, cache, batch_size=64, window_size=100000):
+    """Annotates (id, text) pairs like `annotate_texts`, from the annotations of
+       their paragraphs, which are looked up in and added to the cache by
+       their cleaned text, so that documents that only share some paragraphs,
+       such as a funding acknowledgement at their end, reuse them.
+
+       The tokenizer makes a token of a paragraph break, and the segmenter
+       always starts a sentence at it and at the token after it, so a pipeline
+       that only tokenizes and segments with the combined rules annotates the
+       paragraphs of a text on their own as it annotates the whole text,
+       except for brackets that are opened in one paragraph and closed in a
+       later one. Documents with such brackets, without any sentence boundary
+       or with a paragraph longer than window_size are annotated whole and
+       not cached. Other documents longer than window_size are annotated as
+       if processed whole too, rather than in windows.
+    """
+    documents = list(documents)
+    split = [split_paragraphs(text) for _, text in documents]
+    # the annotation of each paragraph of the documents, annotated once per call
+    paragraphs = {}
+    uncached = []
+    for cleaned, _, units in split:
+        for start, end, context in units:
+            paragraph = cleaned[start:end]
+            if paragraph not in paragraphs:
+                paragraphs[paragraph] = cache.get(paragraph)
+                if paragraphs[paragraph] is None and len(paragraph) <= window_size:
+                    uncached.append((paragraph, context))
+    docs = nlp.pipe((paragraph for paragraph, _ in uncached), batch_size=batch_size)
+    for (paragraph, context), doc in zip(uncached, docs):
+        paragraphs[paragraph] = annotate_paragraph(nlp, doc, context)
+        cache.put(paragraph, paragraphs[paragraph])
+
+    annotations = []
+    whole = []
+    for (doc_id, text), (cleaned, offsets, units) in zip(documents, split):
+        parts = [(start, paragraphs[cleaned[start:end]]) for start, end, _ in units]
+        if (any(part is None for _, part in parts) or not any(part["boundaries_set"] for _, part in parts) or
+                brackets_span_paragraphs(part for _, part in parts)):
+            annotations.append(None)
+            whole.append((doc_id, text))
+        else:
+            annotations.append(join_paragraphs(doc_id, offsets, parts))
+    whole_annotations = annotate_uncached_texts(nlp, whole, batch_size, window_size)
+    for annotation in annotations:
+        yield annotation if annotation is not None else next(whole_annotations)
+
+def brackets_span_paragraphs(parts):
+    """Returns whether a paragraph closes a bracket it did not open after an
+       earlier paragraph left one open, so the segmenter would match them.
+    """
+    left_open = False
+    for part in parts:
+        open_at_end, closed_unopened = part["unmatched_brackets"]
+        if closed_unopened and left_open:
+            return True
+        left_open |= open_at_end
+    return False
+
+def join_paragraphs(doc_id, offsets, parts):
+    """Joins the annotations of the paragraphs of a document, shifting their
+       token offsets to the original text and their sentence starts to the
+       tokens of the document, whose first token always starts a sentence.
+
+    @param doc_id: the id of the document
+    @param offsets: the `NewLineOffsets` of the cleaned text of the document
+    @param parts: (start, annotation) pairs of the paragraphs, where start is
+                  the offset of the paragraph in the cleaned text
+    """
+    tokens = []
+    token_offsets = []
+    starts = [0]
+    for start, part in parts:
+        starts.extend(first + len(tokens) for first in part["sentence_starts"] if first + len(tokens))
+        tokens.extend(part["tokens"])
+        token_offsets.extend([offsets.to_original(start + token_start),
+                              offsets.to_original(start + token_end - 1) + 1]
+                             for token_start, token_end in part["token_offsets"])
+    ends = starts[1:] + [len(tokens)]
+    return {"id": doc_id,
+            "tokens": tokens,
+            "token_offsets": token_offsets,
+            "sentences": [[start, end] for start, end in zip(starts, ends)] if tokens else []}
+
+def annotate_uncached_texts(nlp, documents, batch_size=64, window_size=100000):
+    cleaned = [remove_new_lines_with_offsets(text) if len(text) <= window_size else None
+               for _, text in documents]
+    docs = nlp.pipe((text for text, _ in filter(None, cleaned)), batch_size=batch_size)
+    for (doc_id, text), cleaned_text in zip(documents, cleaned):
+        if cleaned_text is None:
+            yield annotate_long_text(nlp, doc_id, text, window_size)
+            continue
+        offsets = cleaned_text[1]
+        doc = next(docs)
+        token_offsets = [[offsets.to_original(token.idx),
+                          offsets.to_original(token.idx + len(token) - 1) + 1] for token in doc]
+        yield {"id": doc_id,
+               "tokens": [token.text for token in doc],
+               "token_offsets": token_offsets,
+               "sentences": sentence_token_offsets(doc).tolist()}
+
+def init_worker(model, window_size=100000, cache_size=0):
+    global WORKER_NLP, WORKER_WINDOW_SIZE, WORKER_CACHE # pylint: disable=global-statement
+    WORKER_NLP = load_model(model)
+    WORKER_WINDOW_SIZE = window_size
+    WORKER_CACHE = AnnotationCache(cache_size, namespace=model) if cache_size else None
+
+def annotate_batch(documents):
+    """Annotates a batch of documents with the worker's model and returns the
+       output lines together with the number of tokens in them and the number
+       of texts or paragraphs found in the worker's cache.
+    """
+    lines = []
+    n_tokens = 0
+    hits = WORKER_CACHE.hits if WORKER_CACHE is not None else 0
+    for annotation in annotate_texts(WORKER_NLP, documents, window_size=WORKER_WINDOW_SIZE, cache=WORKER_CACHE):
+        n_tokens += len(annotation["tokens"])
+        lines.append(json.dumps(annotation, ensure_ascii=False))
+    n_cached = WORKER_CACHE.hits - hits if WORKER_CACHE is not None else 0
+    return lines, n_tokens, n_cached
+
+def annotate_corpus(input_path, output_path, model="combined_rule", n_workers=1, batch_size=64,
+                    input_format="jsonl", text_field="text", id_field="id", window_size=100000,
+                    cache_size=0):
+    """Annotates a corpus file with tokens and sentences, writing one JSON object
+       per document to the output file in input order. The corpus is streamed
+       and at most two batches per worker are in flight, so memory use does not
+       depend on the size of the corpus.
+
+       Returns a dict with the number of docs and tokens, the number of docs
+       found in a worker's cache, the elapsed seconds and the docs and tokens
+       per second.
+
+    @param input_path: the corpus file, see `read_texts`
+    @param output_path: the JSON lines file to write the annotations to
+    @param model: the model to annotate with, see `load_model`
+    @param n_workers: the number of worker processes, each loads the model once.
+                      With 1 the corpus is annotated in this process.
+    @param batch_size: the number of documents sent to a worker at a time
+    @param window_size: documents longer than this many characters are
+                        annotated in windows, so that book length documents
+                        do not exceed the model's max_length
+    @param cache_size: the number of annotations each worker caches, so that
+                       duplicated texts are annotated once per worker, see
+                       `annotation_cache.AnnotationCache`. 0 disables caching.
+    """
+    start = time.perf_counter()
+    counts = {"docs": 0, "tokens": 0, "cache_hits": 0}
+    documents = read_texts(input_path, input_format, text_field, id_field)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        def write(result):
+            lines, n_tokens, n_cached = result
+            for line in lines:
+                output_file.write(line)
+                output_file.write("\n")
+            counts["docs"] += len(lines)
+            counts["tokens"] += n_tokens
+            counts["cache_hits"] += n_cached
+
+        if n_workers == 1:
+            init_worker(model, window_size, cache_size)
+            for batch in minibatch(documents, size=batch_size):
+                write(annotate_batch(batch))
+        else:
+            # Pool.imap would consume the whole input up front, so the batches in
+            # flight are bounded by hand, and collected in order
+            pending = deque()
+            with multiprocessing.Pool(n_workers, initializer=init_worker,
+                                      initargs=(model, window_size, cache_size)) as pool:
+                for batch in minibatch(documents, size=batch_size):
+                    if len(pending) >= 2 * n_workers:
+                        write(pending.popleft().get())
+                    pending.append(pool.apply_async(annotate_batch, (batch,)))
+                while pending:
+                    write(pending.popleft().get())
+
+    elapsed = time.perf_counter() - start
+    return {"docs": counts["docs"],
+            "tokens": counts["tokens"],
+            "cache_hits": counts["cache_hits"],
+            "seconds": elapsed,
+            "docs_per_second": counts["docs"] / elapsed if elapsed else 0.0,
+            "tokens_per_second": counts["tokens"] / elapsed if elapsed else 0.0}
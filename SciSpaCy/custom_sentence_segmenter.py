@@ -1,11 +1,22 @@
+import json
 import sys
 import os
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy
+from spacy.attrs import ORTH, SENT_START # pylint: disable-msg=E0611,E0401
+from spacy.util import minibatch
+
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
-from consts import ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from abbreviations import DEFAULT_ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from segmentation_rules import SegmentationRules, DEFAULT_SEGMENTATION_RULES # pylint: disable-msg=E0611,E0401
 
 def combined_rule_sentence_segmenter(doc):
     """Adds sentence boundaries to a Doc. Intended to be used as a pipe in a spaCy pipeline.
+       This is the reference implementation of the default rule set,
+       `consts.SEGMENTATION_RULES`, which the other segmenters apply compiled.
 
     @param doc: the spaCy document to be annotated with sentence boundaries
     """
@@ -28,7 +39,7 @@ def combined_rule_sentence_segmenter(doc):
         if token.text[0].isdigit():
             # handling an abbrevation followed by a number
             # for example: 'LSTM networks, which we review in Sec. 2, have been successfully'
-            if prev_tokens[-1] and prev_tokens[-1].text in ABBREVIATIONS:
+            if prev_tokens[-1] and prev_tokens[-1].text in DEFAULT_ABBREVIATIONS:
                 doc[token.i].is_sent_start = False
 
             # handle a bracket followed by a number
@@ -83,3 +94,247 @@ def combined_rule_sentence_segmenter(doc):
         doc[open_bracket.i].is_sent_start = False
 
     return doc
+
+# bit flags for the lexeme properties that proposing sentence boundaries looks at
+IS_TERMINAL_PUNCT = 1 << 0
+IS_CLOSING_PUNCT = 1 << 1
+
+# the flags only depend on the text of a lexeme, and orth ids are hashes of
+# the text, so the flags can be cached by orth id across docs and vocabs. The
+# least recently used ones are evicted after LEXEME_FLAGS_CACHE_SIZE lexemes.
+LEXEME_FLAGS_CACHE = OrderedDict()
+LEXEME_FLAGS_CACHE_SIZE = 100000
+
+def lexeme_flags(text):
+    """Computes the flags of a single lexeme.
+
+    @param text: the text of the lexeme
+    """
+    flags = 0
+    if text in (".", "!", "?"):
+        flags |= IS_TERMINAL_PUNCT
+    if text in (")", "]", "}", '"', "'", "”", "’"):
+        flags |= IS_CLOSING_PUNCT
+    return flags
+
+def token_flags(strings, orths):
+    """Looks up the flags of every token. The flags are computed in Python
+       once per distinct lexeme, not once per token.
+
+    @param strings: the StringStore the orth ids belong to
+    @param orths: an array with the orth id of every token
+    """
+    unique_orths, inverse = numpy.unique(orths, return_inverse=True)
+    unique_flags = numpy.empty(len(unique_orths), dtype=numpy.int32)
+    for k, orth in enumerate(unique_orths.tolist()):
+        flags = LEXEME_FLAGS_CACHE.get(orth)
+        if flags is None:
+            flags = LEXEME_FLAGS_CACHE[orth] = lexeme_flags(strings[orth])
+            if len(LEXEME_FLAGS_CACHE) > LEXEME_FLAGS_CACHE_SIZE:
+                LEXEME_FLAGS_CACHE.popitem(last=False)
+        else:
+            LEXEME_FLAGS_CACHE.move_to_end(orth)
+        unique_flags[k] = flags
+    return unique_flags[inverse]
+
+def propose_sentence_starts(flags, sent_starts, doc_lengths=None):
+    """Marks the first token after sentence final punctuation (and any closing
+       brackets or quotes that follow it) as a sentence start, for pipelines
+       without a parser to propose boundaries for the rules to correct. Only
+       tokens without a boundary decision yet are changed.
+
+       The first token of every doc is marked too, so that a doc without any
+       other boundary, e.g. a single sentence without a period, is still
+       segmented and `doc.sents` does not raise.
+
+    @param flags: the `token_flags` of the tokens in the docs
+    @param sent_starts: the SENT_START values of the tokens (-1, 0 or 1),
+                        which are updated in place
+    @param doc_lengths: the number of tokens in each doc, or None if the
+                        arrays hold a single doc
+    """
+    length = len(flags)
+    if doc_lengths is None:
+        doc_lengths = [length]
+    doc_lengths = numpy.asarray(doc_lengths, dtype=numpy.int64)
+    doc_ends = numpy.cumsum(doc_lengths)
+    token_doc_starts = numpy.repeat(doc_ends - doc_lengths, doc_lengths)
+
+    not_closing = flags & IS_CLOSING_PUNCT == 0
+    # the last token before each token that is not closing punctuation
+    last_not_closing = numpy.maximum.accumulate(numpy.where(not_closing, numpy.arange(length), -1))
+    before = numpy.empty(length, dtype=numpy.int64)
+    before[:1] = -1
+    before[1:] = last_not_closing[:-1]
+    follows_terminal = (before >= token_doc_starts) & (flags[before] & IS_TERMINAL_PUNCT != 0)
+
+    proposed = follows_terminal & not_closing & (flags & IS_TERMINAL_PUNCT == 0) & (sent_starts == 0)
+    sent_starts[proposed] = 1
+    doc_starts = (doc_ends - doc_lengths)[doc_lengths > 0]
+    sent_starts[doc_starts[sent_starts[doc_starts] == 0]] = 1
+    return sent_starts
+
+def check_not_parsed(doc):
+    if doc.is_parsed:
+        raise ValueError("Sentence boundaries cannot be set on a parsed Doc, "
+                         "the segmenter has to run before the parser")
+
+def write_sent_starts(doc, sent_starts):
+    """Writes SENT_START values (-1, 0 or 1) back into a Doc in bulk.
+
+    @param doc: the spaCy document to write to
+    @param sent_starts: an int64 array with a value for every token in the doc
+    """
+    # from_array resets is_tagged, which is not ours to change
+    is_tagged = doc.is_tagged
+    # SENT_START is stored as uint64 in token attribute arrays, so -1 wraps around
+    doc.from_array([SENT_START], sent_starts.view(numpy.uint64).reshape((len(doc), 1)))
+    doc.is_tagged = is_tagged
+
+def vectorized_combined_rule_sentence_segmenter(doc):
+    """Adds the same sentence boundaries to a Doc as `combined_rule_sentence_segmenter`,
+       but reads the token attributes out of the Doc once, computes the boundaries
+       with the compiled default rules and writes them back in bulk.
+
+    @param doc: the spaCy document to be annotated with sentence boundaries
+    """
+    if len(doc) == 0:
+        return doc
+    check_not_parsed(doc)
+
+    attributes = doc.to_array([ORTH, SENT_START])
+    sent_starts = DEFAULT_SEGMENTATION_RULES.apply(doc.vocab.strings, attributes[:, 0],
+                                                   attributes[:, 1].astype(numpy.int64))
+    write_sent_starts(doc, sent_starts)
+    return doc
+
+class CombinedRuleSentenceSegmenter(object):
+    """A pipeline component that adds the sentence boundaries of
+       `combined_rule_sentence_segmenter`. Unlike the function, it implements
+       `pipe`, which segments whole batches of docs at once, so `nlp.pipe`
+       does not fall back to calling it one doc at a time. It is registered
+       in `Language.factories` under its name by `proto_model.load`.
+
+       The rules mostly prevent bad boundaries, so they rely on the parser to
+       propose boundaries. With `propose_boundaries=True` the component
+       proposes them itself (see `propose_sentence_starts`), so it can be used
+       in pipelines without a parser.
+
+       Other rules, e.g. for the abbreviations and figure panels of a domain,
+       can be given in the format of `segmentation_rules.SegmentationRules`:
+
+            rules = consts.SEGMENTATION_RULES + [
+                {"name": "figure_panel", "prev2": {"TEXT": ["Fig.", "Figs."]}, "prev": {"STARTS_WITH_DIGIT": True},
+                 "token": {"REGEX": "[A-H]"}, "action": "not_start"}]
+            nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp, rules=rules), first=True)
+    """
+    name = "combined_rule_sentence_segmenter"
+
+    def __init__(self, nlp=None, propose_boundaries=False, abbreviations=None, rules=None, **cfg):
+        """@param nlp: the Language the component is created for, unused but
+                       passed in by `Language.create_pipe`
+           @param propose_boundaries: whether to propose boundaries after
+                                      sentence final punctuation before applying
+                                      the rules
+           @param abbreviations: the `AbbreviationIndex` to use, by default a
+                                 copy of `DEFAULT_ABBREVIATIONS`
+           @param rules: a list of rules to apply instead of
+                         `consts.SEGMENTATION_RULES`
+        """
+        self.configure(propose_boundaries, rules, **cfg)
+        self.abbreviations = DEFAULT_ABBREVIATIONS.copy() if abbreviations is None else abbreviations
+        # scratch buffers for the token attributes of a batch, reused across batches
+        self.orths = numpy.empty(0, dtype=numpy.uint64)
+        self.sent_starts = numpy.empty(0, dtype=numpy.int64)
+
+    def configure(self, propose_boundaries=False, rules=None, **cfg):
+        self.cfg = dict(cfg, propose_boundaries=propose_boundaries)
+        if rules is None:
+            self.rules = DEFAULT_SEGMENTATION_RULES
+        else:
+            # the rules are plain data, so they are saved in the component's cfg
+            self.cfg["rules"] = list(rules)
+            self.rules = SegmentationRules(rules)
+        self.propose_boundaries = propose_boundaries
+
+    def to_bytes(self, **exclude): # pylint: disable=unused-argument
+        return json.dumps(self.cfg).encode("utf-8")
+
+    def from_bytes(self, bytes_data, **exclude): # pylint: disable=unused-argument
+        self.configure(**json.loads(bytes_data.decode("utf-8")))
+        return self
+
+    def to_disk(self, path, **exclude): # pylint: disable=unused-argument
+        """Saves the component's cfg, i.e. whether it proposes boundaries and
+           its rules, to a directory, as `Language.to_disk` does for every
+           component of a pipeline.
+        """
+        path = Path(path)
+        if not path.exists():
+            path.mkdir(parents=True)
+        with (path / "cfg").open("w", encoding="utf-8") as cfg_file:
+            json.dump(self.cfg, cfg_file, indent=2)
+
+    def from_disk(self, path, **exclude): # pylint: disable=unused-argument
+        """Reads the cfg saved with `to_disk`, when the component is created
+           by `load_model_from_path`, which creates it without a config.
+        """
+        cfg_path = Path(path) / "cfg"
+        # models saved before the segmenter had a cfg file keep the defaults
+        if cfg_path.exists():
+            with cfg_path.open(encoding="utf-8") as cfg_file:
+                self.configure(**json.load(cfg_file))
+        return self
+
+    def __call__(self, doc):
+        self.segment_batch([doc])
+        return doc
+
+    def pipe(self, docs, batch_size=1000, n_threads=-1): # pylint: disable=unused-argument
+        """Segments a stream of docs in batches, yielding them in order.
+
+        @param docs: an iterable of spaCy documents
+        @param batch_size: the number of docs to segment at once
+        @param n_threads: unused, accepted for compatibility with `nlp.pipe`
+        """
+        for batch in minibatch(docs, size=batch_size):
+            self.segment_batch(batch)
+            for doc in batch:
+                yield doc
+
+    def segment_batch(self, docs):
+        """Adds sentence boundaries to a list of docs, computing the boundaries
+           of all of them with a single set of array operations.
+
+        @param docs: a list of spaCy documents
+        """
+        docs = [doc for doc in docs if len(doc) > 0]
+        if not docs:
+            return
+        for doc in docs:
+            check_not_parsed(doc)
+
+        doc_lengths = [len(doc) for doc in docs]
+        n_tokens = sum(doc_lengths)
+        if len(self.orths) < n_tokens:
+            self.orths = numpy.empty(n_tokens, dtype=numpy.uint64)
+            self.sent_starts = numpy.empty(n_tokens, dtype=numpy.int64)
+        orths = self.orths[:n_tokens]
+        sent_starts = self.sent_starts[:n_tokens]
+
+        start = 0
+        for doc, length in zip(docs, doc_lengths):
+            attributes = doc.to_array([ORTH, SENT_START])
+            orths[start:start + length] = attributes[:, 0]
+            sent_starts[start:start + length] = attributes[:, 1].view(numpy.int64)
+            start += length
+
+        strings = docs[0].vocab.strings
+        if self.propose_boundaries:
+            propose_sentence_starts(token_flags(strings, orths), sent_starts, doc_lengths)
+        self.rules.apply(strings, orths, sent_starts, doc_lengths, self.abbreviations)
+
+        start = 0
+        for doc, length in zip(docs, doc_lengths):
+            write_sent_starts(doc, sent_starts[start:start + length])
+            start += length
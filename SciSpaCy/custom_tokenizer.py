@@ -1,3 +1,10 @@
+from array import array
+from bisect import bisect_right
+import pickle
+import re
+
+import regex
+from spacy import about
 from spacy.lang import char_classes
 from spacy.symbols import ORTH # pylint: disable-msg=E0611,E0401
 from spacy.tokenizer import Tokenizer # pylint: disable-msg=E0611,E0401
@@ -7,7 +14,38 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
-from consts import ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from abbreviations import DEFAULT_ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+
+# a hyphen, an optional space and one or two new lines, i.e. a word that was
+# broken across lines, e.g. "lan-\nguage" or "lan- \n\nguage"
+HYPHENATED_NEW_LINE_RE = re.compile(r"- ?\n\n?")
+
+class NewLineOffsets:
+    """Maps character offsets in text cleaned by `remove_new_lines_with_offsets`
+       back to character offsets in the original text. Only the positions where
+       text was removed are stored, so the memory used is proportional to the
+       number of removals rather than to the length of the text.
+    """
+    __slots__ = ("cleaned_starts", "shifts")
+
+    def __init__(self):
+        # cleaned_starts[k] is the offset in the cleaned text from which
+        # shifts[k] characters have been removed from the original text
+        self.cleaned_starts = array("q")
+        self.shifts = array("q")
+
+    def __len__(self):
+        return len(self.cleaned_starts)
+
+    def to_original(self, offset):
+        """Returns the offset in the original text of the character at
+           `offset` in the cleaned text. The length of the cleaned text maps
+           to the length of the original text.
+
+        @param offset: a character offset into the cleaned text
+        """
+        k = bisect_right(self.cleaned_starts, offset)
+        return offset + self.shifts[k - 1] if k else offset
 
 def remove_new_lines(text):
     """Used to preprocess away new lines in the middle of words. This function
@@ -16,11 +54,139 @@ def remove_new_lines(text):
 
     @param text: a string of text to be processed
     """
-    text = text.replace("-\n\n", "")
-    text = text.replace("- \n\n", "")
-    text = text.replace("-\n", "")
-    text = text.replace("- \n", "")
-    return text
+    return HYPHENATED_NEW_LINE_RE.sub("", text)
+
+def remove_new_lines_with_offsets(text):
+    """Same as `remove_new_lines`, but also returns a `NewLineOffsets` that maps
+       offsets in the cleaned text (e.g. token.idx) back to offsets in the
+       original text.
+
+    @param text: a string of text to be processed
+    """
+    offsets = NewLineOffsets()
+    pieces = []
+    last_end = 0
+    removed = 0
+    for match in HYPHENATED_NEW_LINE_RE.finditer(text):
+        start, end = match.span()
+        pieces.append(text[last_end:start])
+        offsets.cleaned_starts.append(start - removed)
+        removed += end - start
+        offsets.shifts.append(removed)
+        last_end = end
+    if not pieces:
+        return text, offsets
+    pieces.append(text[last_end:])
+    return "".join(pieces), offsets
+
+class SuffixMatch(object):
+    """The part of a regex match object the spaCy tokenizer uses, for suffixes
+       found by `CombinedRuleSuffixMatcher` without a regex.
+    """
+    __slots__ = ("string", "span")
+
+    def __init__(self, string, start, end):
+        self.string = string
+        self.span = (start, end)
+
+    def start(self):
+        return self.span[0]
+
+    def end(self):
+        return self.span[1]
+
+    def group(self):
+        return self.string[self.span[0]:self.span[1]]
+
+class CombinedRuleSuffixMatcher(object):
+    """Finds the suffix to split off a token like the compiled suffix regex of
+       `combined_rule_tokenizer`, but decides the unit rule and the closing
+       bracket rules, whose variable length lookbehinds make them the most
+       expensive part of the regex, without a regex:
+
+       - a unit is split off when everything before it is digits, e.g.
+         "5mg" but not "h3g", which is a set lookup after the leading digits
+       - a closing bracket is split off unless it closes a bracket opened
+         inside the token, e.g. "cI-yfp)" but not "camera(s)", which is a
+         search for the last opening bracket
+
+       The regex returns the leftmost of the suffixes matching at the end of
+       the string, so the result is the leftmost of what the remaining rules'
+       regex and these two checks find. The lookbehinds also match across
+       whitespace, which never occurs in the strings the tokenizer passes in,
+       so strings with whitespace are handed to the full regex.
+    """
+    def __init__(self, suffixes, unit_suffix, bracket_suffixes, units=None):
+        """@param suffixes: all the suffix rules of the tokenizer
+           @param unit_suffix: the unit rule in `suffixes`
+           @param bracket_suffixes: the rules in `suffixes` for ")", "]" and "}"
+           @param units: the units the unit rule matches, by default char_classes.LIST_UNITS
+        """
+        handled = set(bracket_suffixes) | {unit_suffix}
+        # the full pattern is used by Tokenizer.to_bytes and for strings with whitespace
+        self.set_state({"pattern": compile_suffix_regex(suffixes).pattern,
+                        "rules_search": compile_suffix_regex([suffix for suffix in suffixes
+                                                              if suffix not in handled]).search,
+                        "units": sorted(char_classes.LIST_UNITS if units is None else units)})
+
+    def get_state(self):
+        """Returns the state of the matcher as a dict of strings and compiled
+           patterns of the regex module, which can be pickled without
+           referring to this module.
+        """
+        return {"pattern": self.pattern, "rules_search": self.rules_search, "units": sorted(self.units)}
+
+    def set_state(self, state):
+        """Sets the state of the matcher from the result of `get_state`."""
+        self.pattern = state["pattern"]
+        self._full_search = None
+        self.rules_search = state["rules_search"]
+        self.units = frozenset(state["units"])
+        self.brackets = {")": "(", "]": "[", "}": "{"}
+        self.leading_digits = regex.compile(r"[0-9]*").match
+        self.whitespace_search = regex.compile(r"\s").search
+
+    @classmethod
+    def from_state(cls, state):
+        """Creates a matcher from the result of `get_state`."""
+        matcher = cls.__new__(cls)
+        matcher.set_state(state)
+        return matcher
+
+    def full_search(self, string):
+        if self._full_search is None:
+            self._full_search = regex.compile(self.pattern).search
+        return self._full_search(string)
+
+    def search(self, string):
+        """Returns a match for the suffix of the string, or None. Only its
+           start() and end() are the same as those of the full regex match.
+        """
+        if self.whitespace_search(string):
+            return self.full_search(string)
+        match = self.rules_search(string)
+        length = len(string)
+        start = match.start() if match is not None else length
+
+        if "0" <= string[:1] <= "9":
+            n_digits = self.leading_digits(string).end()
+            if n_digits < start and string[n_digits:] in self.units:
+                start = n_digits
+
+        last = length - 1
+        if 0 <= last < start and string[last] in self.brackets:
+            # the closing bracket stays unless an opening bracket after the
+            # first character is followed by at least one character and no
+            # closing bracket before it
+            opening = string.rfind(self.brackets[string[last]], 1, last - 1)
+            if opening == -1 or string[last] in string[opening + 1:last]:
+                start = last
+
+        if start == length:
+            return None
+        if match is not None and match.start() == start:
+            return match
+        return SuffixMatch(string, start, length)
 
 def combined_rule_prefixes():
     """Helper function that returns the prefix pattern for the tokenizer.
@@ -41,7 +207,7 @@ def combined_rule_prefixes():
                 char_classes.LIST_ICONS)
     return prefixes
 
-def combined_rule_tokenizer(nlp):
+def combined_rule_tokenizer(nlp, abbreviations=DEFAULT_ABBREVIATIONS):
     """Creates a custom tokenizer on top of spaCy's default tokenizer. The
        intended use of this function is to replace the tokenizer in a spaCy
        pipeline like so:
@@ -50,6 +216,8 @@ def combined_rule_tokenizer(nlp):
             nlp.tokenizer = combined_rule_tokenizer(nlp)
 
        @param nlp: a loaded spaCy model
+       @param abbreviations: the `AbbreviationIndex` whose abbreviations keep
+                             their period, by default `DEFAULT_ABBREVIATIONS`
     """
     # remove the first hyphen to prevent tokenization of the normal hyphen
     hyphens = char_classes.HYPHENS.replace("-|", "", 1)
@@ -70,10 +238,14 @@ def combined_rule_tokenizer(nlp):
     quotes = char_classes.QUOTES.replace('|', ' ') + " ’"
 
     # add lookbehind assertions for brackets (may not work properly for unbalanced brackets)
+    bracket_suffixes = [r"(?<!\S+\([^\)\s]+)\)", r"(?<!\S+\[[^\]\s]+)\]", r"(?<!\S+\{[^\}\s]+)\}"]
     suffix_punct = char_classes.PUNCT.replace('|', ' ')
-    suffix_punct = suffix_punct.replace(r"\)", r"(?<!\S+\([^\)\s]+)\)")
-    suffix_punct = suffix_punct.replace(r"\]", r"(?<!\S+\[[^\]\s]+)\]")
-    suffix_punct = suffix_punct.replace(r"\}", r"(?<!\S+\{[^\}\s]+)\}")
+    suffix_punct = suffix_punct.replace(r"\)", bracket_suffixes[0])
+    suffix_punct = suffix_punct.replace(r"\]", bracket_suffixes[1])
+    suffix_punct = suffix_punct.replace(r"\}", bracket_suffixes[2])
+
+    # add to look behind to exclude things like h3g from splitting off the g as a unit
+    unit_suffix = r'(?<=(^[0-9]+|\s{p}*[0-9]+))(?:{u})'.format(u=char_classes.UNITS, p=prefixes)
 
     suffixes = (char_classes.split_chars(suffix_punct) +
                 char_classes.LIST_ELLIPSES +
@@ -83,8 +255,7 @@ def combined_rule_tokenizer(nlp):
                 [r'(?<=[0-9])\+',
                  r'(?<=°[FfCcKk])\.',
                  r'(?<=[0-9])(?:{})'.format(char_classes.CURRENCY),
-                 # add to look behind to exclude things like h3g from splitting off the g as a unit
-                 r'(?<=(^[0-9]+|\s{p}*[0-9]+))(?:{u})'.format(u=char_classes.UNITS, p=prefixes),
+                 unit_suffix,
                  r'(?<=[0-9{}{}(?:{})])\.'.format(char_classes.ALPHA_LOWER,
                                                   r'%²\-\)\]\+',
                                                   char_classes.merge_chars(quotes)),
@@ -92,17 +263,88 @@ def combined_rule_tokenizer(nlp):
                  r'(?<=[{a}|\d][{a}])\.'.format(a=char_classes.ALPHA_UPPER)])
     infix_re = compile_infix_regex(infixes)
     prefix_re = compile_prefix_regex(prefixes)
-    suffix_re = compile_suffix_regex(suffixes)
+    suffix_matcher = CombinedRuleSuffixMatcher(suffixes, unit_suffix, bracket_suffixes)
 
     # Update exclusions to include these abbreviations so the period is not split off
-    exclusions = {abbreviation: [{ORTH: abbreviation}] for abbreviation in ABBREVIATIONS}
+    exclusions = {abbreviation: [{ORTH: abbreviation}] for abbreviation in abbreviations}
     tokenizer_exceptions = nlp.Defaults.tokenizer_exceptions.copy()
     tokenizer_exceptions.update(exclusions)
 
     tokenizer = Tokenizer(nlp.vocab,
                           tokenizer_exceptions,
                           prefix_search=prefix_re.search,
-                          suffix_search=suffix_re.search,
+                          suffix_search=suffix_matcher.search,
                           infix_finditer=infix_re.finditer,
                           token_match=nlp.tokenizer.token_match)
     return tokenizer
+
+def add_abbreviation_exceptions(tokenizer, abbreviations):
+    """Adds tokenizer exceptions that keep the period of each abbreviation
+       attached. Add them before tokenizing any text, as text the tokenizer
+       has already cached is not re-tokenized.
+
+    @param tokenizer: a tokenizer created by `combined_rule_tokenizer`
+    @param abbreviations: an iterable of abbreviations
+    """
+    for abbreviation in abbreviations:
+        tokenizer.add_special_case(abbreviation, [{ORTH: abbreviation}])
+
+# bump this whenever the layout of the tokenizer artifact changes
+TOKENIZER_ARTIFACT_VERSION = 2
+
+def save_tokenizer_artifact(tokenizer, path):
+    """Saves the compiled rules of a tokenizer (prefix, suffix and infix patterns,
+       token_match and exceptions) to a versioned artifact, so that other
+       processes can load them with `load_tokenizer_artifact` instead of
+       rebuilding and recompiling the patterns with `combined_rule_tokenizer`.
+
+    @param tokenizer: a tokenizer created by `combined_rule_tokenizer`
+    @param path: the file to write the artifact to
+    """
+    # the suffix matcher is saved as its state, so that the artifact does not
+    # refer to the module path this module was imported under
+    suffix_matcher = getattr(tokenizer.suffix_search, "__self__", None)
+    suffix_matcher_state = suffix_matcher.get_state() if hasattr(suffix_matcher, "get_state") else None
+    artifact = {"version": TOKENIZER_ARTIFACT_VERSION,
+                "spacy_version": about.__version__,
+                "regex_version": regex.__version__,
+                # compiled patterns from the regex module pickle their compiled
+                # code, so unpickling them does not compile them again
+                "prefix_search": tokenizer.prefix_search,
+                "suffix_search": None if suffix_matcher_state else tokenizer.suffix_search,
+                "suffix_matcher": suffix_matcher_state,
+                "infix_finditer": tokenizer.infix_finditer,
+                "token_match": tokenizer.token_match,
+                # the exceptions are only exposed through pickling support
+                "exceptions": tokenizer.__reduce__()[1][1]}
+    with open(path, "wb") as artifact_file:
+        pickle.dump(artifact, artifact_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_tokenizer_artifact(nlp, path):
+    """Creates a tokenizer from an artifact written by `save_tokenizer_artifact`.
+       The resulting tokenizer is equivalent to `combined_rule_tokenizer(nlp)`
+       at the time the artifact was saved.
+
+       @param nlp: a loaded spaCy model
+       @param path: the artifact file to load
+    """
+    with open(path, "rb") as artifact_file:
+        artifact = pickle.load(artifact_file)
+
+    versions = (artifact.get("version"), artifact.get("spacy_version"), artifact.get("regex_version"))
+    required_versions = (TOKENIZER_ARTIFACT_VERSION, about.__version__, regex.__version__)
+    if versions != required_versions:
+        raise ValueError("Tokenizer artifact {} was built with (artifact version, spacy, regex) = {}, "
+                         "but {} is required. Rebuild it with save_tokenizer_artifact."
+                         .format(path, versions, required_versions))
+
+    suffix_search = artifact["suffix_search"]
+    if artifact["suffix_matcher"] is not None:
+        suffix_search = CombinedRuleSuffixMatcher.from_state(artifact["suffix_matcher"]).search
+    tokenizer = Tokenizer(nlp.vocab,
+                          artifact["exceptions"],
+                          prefix_search=artifact["prefix_search"],
+                          suffix_search=suffix_search,
+                          infix_finditer=artifact["infix_finditer"],
+                          token_match=artifact["token_match"])
+    return tokenizer
@@ -0,0 +1,196 @@
+import re
+import sys
+import os
+
+import numpy
+from spacy.attrs import ORTH, SPACY, LEMMA, POS, TAG, SENT_START # pylint: disable-msg=E0611,E0401
+from spacy.tokens import Doc # pylint: disable-msg=E0611,E0401
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from custom_sentence_segmenter import combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import vectorized_combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import token_flags, IS_CLOSING_PUNCT # pylint: disable-msg=E0611,E0401
+from segmentation_rules import DEFAULT_SEGMENTATION_RULES # pylint: disable-msg=E0611,E0401
+from abbreviations import DEFAULT_ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from consts import DOUBLE_NEW_LINES # pylint: disable-msg=E0611,E0401
+
+# the token attributes a doc that was only tokenized and segmented can have
+TOKEN_ATTRS = [ORTH, SPACY, LEMMA, POS, TAG, SENT_START]
+
+# a run of whitespace that the tokenizer makes a "\n\n" or "\n\n\n\n" token of,
+# i.e. one that is exactly that between two words, after the single space the
+# tokenizer leaves out of a whitespace token
+PARAGRAPH_BREAK_RE = re.compile(r"(?<=\S) ?({})(?=\S)".format(
+    "|".join(re.escape(new_lines) for new_lines in sorted(DOUBLE_NEW_LINES, key=len, reverse=True))))
+
+def paragraph_breaks(text):
+    """Returns the [start, end) offsets of the paragraph breaks of a text,
+       which the tokenizer makes a token of its own that
+       `combined_rule_sentence_segmenter` always starts a sentence at.
+    """
+    return [match.span(1) for match in PARAGRAPH_BREAK_RE.finditer(text)]
+
+# the segmenter functions by name, as this module and a packaged model may import
+# them under different module paths, e.g. SciSpaCy.custom_sentence_segmenter
+SEGMENTER_FUNCTION_NAMES = {combined_rule_sentence_segmenter.__name__,
+                            vectorized_combined_rule_sentence_segmenter.__name__}
+
+def is_segmenter(component):
+    """Returns whether a pipeline component is a combined rule sentence
+       segmenter, by its name rather than its class, for the same reason.
+    """
+    return (getattr(component, "name", None) == CombinedRuleSentenceSegmenter.name or
+            getattr(component, "__name__", None) in SEGMENTER_FUNCTION_NAMES)
+
+def is_clean_cut(text, offset):
+    """Returns whether the spaCy tokenizer tokenizes text[:offset] and
+       text[offset:] on their own exactly like the corresponding parts of text,
+       which is the case at the start of a token that follows whitespace.
+    """
+    return (offset == 0 or offset == len(text) or
+            (text[offset - 1].isspace() and not text[offset].isspace()))
+
+def first_token_at(doc, offset):
+    """Returns the index of the first token of doc that starts at or after offset."""
+    low, high = 0, len(doc)
+    while low < high:
+        middle = (low + high) // 2
+        if doc[middle].idx < offset:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def balanced(nlp, strings, orths):
+    """Returns whether no bracket of the bracket rules of any segmenter in the
+       pipeline is open before every token, and after the last one.
+    """
+    result = numpy.ones(len(orths) + 1, dtype=bool)
+    for _, component in nlp.pipeline:
+        rules = getattr(component, "rules", DEFAULT_SEGMENTATION_RULES)
+        result &= rules.balanced(strings, orths, getattr(component, "abbreviations", DEFAULT_ABBREVIATIONS))
+    return result
+
+def unmatched_brackets(nlp, strings, orths):
+    """Returns whether a bracket of the bracket rules of any segmenter in the
+       pipeline is still open after the last token, and whether one is closed
+       without having been opened.
+    """
+    open_at_end = False
+    closed_unopened = False
+    for _, component in nlp.pipeline:
+        rules = getattr(component, "rules", DEFAULT_SEGMENTATION_RULES)
+        unmatched = rules.unmatched_brackets(strings, orths, getattr(component, "abbreviations",
+                                                                     DEFAULT_ABBREVIATIONS))
+        open_at_end |= unmatched[0]
+        closed_unopened |= unmatched[1]
+    return open_at_end, closed_unopened
+
+def last_not_closing(flags):
+    """Returns the index of the last token before every token (and after the
+       last one) that is not closing punctuation, or -1, which is as far back
+       as the segmenter looks when it proposes sentence boundaries.
+    """
+    last = numpy.full(len(flags) + 1, -1, dtype=numpy.int64)
+    not_closing = numpy.where(flags & IS_CLOSING_PUNCT == 0, numpy.arange(len(flags)), -1)
+    if len(flags):
+        numpy.maximum.accumulate(not_closing, out=last[1:])
+    return last
+
+def make_doc(vocab, attributes):
+    """Creates a Doc from a uint64 array of `TOKEN_ATTRS`."""
+    strings = vocab.strings
+    doc = Doc(vocab, words=[strings[orth] for orth in attributes[:, 0].tolist()],
+              spaces=attributes[:, 1].astype(bool).tolist())
+    if not len(doc):
+        return doc
+    is_tagged = doc.is_tagged
+    # tags assign a lemma and part of speech, which the tokenizer's special
+    # cases may have overridden, so they are set first
+    if attributes[:, 4].any():
+        doc.from_array([TAG], attributes[:, 4:5])
+    doc.from_array([LEMMA, POS, SENT_START], attributes[:, [2, 3, 5]])
+    doc.is_tagged = is_tagged
+    return doc
+
+def edit_doc(nlp, doc, start, end, replacement):
+    """Applies a text edit to a Doc that was processed by a pipeline that
+       tokenizes and segments sentences with the combined rules, such as
+       `util.create_combined_rule_segmentation_model()`, and returns a new Doc
+       equal to processing the edited text with the pipeline from scratch.
+
+       Only the whitespace delimited chunks the edit touches are tokenized
+       again. The segmenter runs again from the last sentence start before the
+       edit to the first one after it at which no parens or brackets are open
+       (in the old and new text), as its rules only look at the two previous
+       tokens, the next one and at matching brackets. Everywhere else the sentence boundaries
+       of the old Doc are kept.
+
+    @param nlp: the pipeline that processed doc, whose components may only be
+                combined rule sentence segmenters
+    @param doc: the processed Doc, which is not changed
+    @param start: the offset in doc.text the replaced span starts at
+    @param end: the offset in doc.text the replaced span ends at
+    @param replacement: the text to replace doc.text[start:end] with
+    """
+    for name, component in nlp.pipeline:
+        if not is_segmenter(component):
+            raise ValueError("Only the tokenization and sentence boundaries of a Doc can be updated "
+                             "incrementally, but the pipeline has a {} component".format(name))
+    text = doc.text
+    if not 0 <= start <= end <= len(text):
+        raise ValueError("Invalid edit span [{}, {}) of a text of length {}".format(start, end, len(text)))
+    new_text = text[:start] + replacement + text[end:]
+    shift = len(new_text) - len(text)
+
+    # the edited chunks of text, which are tokenized again
+    cut_start = start
+    while not (is_clean_cut(text, cut_start) and is_clean_cut(new_text, cut_start)):
+        cut_start -= 1
+    cut_end = end
+    while not (is_clean_cut(text, cut_end) and is_clean_cut(new_text, cut_end + shift)):
+        cut_end += 1
+    n_left = first_token_at(doc, cut_start)
+    right_start = first_token_at(doc, cut_end)
+    edited = nlp.tokenizer(new_text[cut_start:cut_end + shift])
+
+    # SENT_START values of -1 wrap around in these uint64 arrays, but are only
+    # compared with 1 and copied
+    old_attributes = doc.to_array(TOKEN_ATTRS)
+    attributes = numpy.concatenate([old_attributes[:n_left], edited.to_array(TOKEN_ATTRS),
+                                    old_attributes[right_start:]])
+    # the index of the first token after the edit, and its shift
+    edit_end = n_left + len(edited)
+    token_shift = edit_end - right_start
+
+    strings = doc.vocab.strings
+    old_balanced = balanced(nlp, strings, old_attributes[:, 0])
+    new_balanced = balanced(nlp, strings, attributes[:, 0])
+    not_closing_before = last_not_closing(token_flags(strings, attributes[:, 0]))
+
+    # the last sentence start before the edit without open parens
+    before = numpy.arange(1, n_left)
+    starts = before[(old_attributes[before, 5] == 1) & new_balanced[before]]
+    segment_start = int(starts[-1]) if len(starts) else 0
+    # the first one after it, at which the tokens the rules look back at are
+    # the same as in the old doc
+    after = numpy.arange(edit_end + 2, len(attributes))
+    ends = after[(old_attributes[after - token_shift, 5] == 1) & new_balanced[after] &
+                 old_balanced[after - token_shift] & (not_closing_before[after] >= edit_end)]
+    segment_end = int(ends[0]) if len(ends) else len(attributes)
+
+    # segment enough context on either side for the rules to see what they
+    # would see in the whole doc
+    context_start = max(min(segment_start - 2, int(not_closing_before[segment_start])), 0)
+    context_end = min(segment_end + 2, len(attributes))
+    context = attributes[context_start:context_end].copy()
+    context[:, 5] = 0
+    segmented = make_doc(doc.vocab, context)
+    for _, component in nlp.pipeline:
+        segmented = component(segmented)
+    if len(segmented):
+        attributes[segment_start:segment_end, 5] = segmented.to_array([SENT_START])[
+            segment_start - context_start:segment_end - context_start]
+    return make_doc(doc.vocab, attributes)
@@ -0,0 +1,68 @@
+class LazyComponent(object):
+    """Stands in for a component of a pipeline loaded from a model directory,
+       and only creates the component and reads its weights from disk the
+       first time it is used, e.g. to process a document. Components that are
+       disabled with `nlp.disable_pipes` before they are used are never loaded.
+    """
+    def __init__(self, nlp, name, path, config=None):
+        """@param nlp: the pipeline the component belongs to
+           @param name: the name of the component's factory, e.g. "parser"
+           @param path: the directory of the component in the model directory
+           @param config: the config to create the component with, from the
+                          pipeline_args of the model meta
+        """
+        self.nlp = nlp
+        self.name = name
+        self.path = path
+        self.config = config or {}
+        self.component = None
+
+    @property
+    def is_loaded(self):
+        return self.component is not None
+
+    def load(self):
+        """Creates and deserializes the component, if it has not been yet, and
+           returns it.
+        """
+        if self.component is None:
+            component = self.nlp.create_pipe(self.name, config=self.config)
+            component.from_disk(self.path, vocab=False)
+            self.component = component
+        return self.component
+
+    def __call__(self, doc):
+        return self.load()(doc)
+
+    def pipe(self, docs, **kwargs):
+        return self.load().pipe(docs, **kwargs)
+
+    def to_disk(self, path, **exclude):
+        return self.load().to_disk(path, **exclude)
+
+    def from_disk(self, path, **exclude):
+        self.component = self.load().from_disk(path, **exclude)
+        return self
+
+    def __getattr__(self, attr):
+        # everything else, e.g. the labels of a parser, is the loaded component's
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+def make_components_lazy(nlp, model_path, meta, names):
+    """Adds lazy stand-ins for components of a model that were disabled while
+       loading it, in the order of the model's pipeline.
+
+    @param nlp: the pipeline loaded from the model directory with the
+                components in `names` disabled
+    @param model_path: the model directory
+    @param meta: the model meta
+    @param names: the names of the components to add
+    """
+    pipeline = meta.get("pipeline", [])
+    for name in names:
+        config = meta.get("pipeline_args", {}).get(name, {})
+        nlp.add_pipe(LazyComponent(nlp, name, model_path / name, config), name=name)
+    nlp.pipeline.sort(key=lambda pipe: pipeline.index(pipe[0]) if pipe[0] in pipeline else len(pipeline))
+    return nlp
@@ -0,0 +1,201 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from spacy import about
+from spacy.cli import package
+from spacy.util import get_package_path
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from util import create_combined_rule_model # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_segmentation_model, save_model # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import load_warmup # pylint: disable-msg=E0611,E0401
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+INIT_PATH = os.path.join(REPO_PATH, "proto_model", "__init__.py")
+
+# the code a built model depends on, which is part of the inputs of every variant
+SOURCE_PATHS = sorted(glob.glob(os.path.join(REPO_PATH, "SciSpaCy", "*.py"))) + [INIT_PATH]
+
+# the model variants built by default. A variant has a "name" and optionally
+#   "pipeline": "combined_rule" (the default) or "segmentation" for the tokenize
+#               and segment only pipeline
+#   "base_model": the spaCy model to start from, by default en_core_web_sm for
+#                 the full pipeline and a blank English pipeline otherwise
+#   "shared_vectors": whether to keep the vectors table out of the vocab, see
+#                     `util.save_model`
+#   "warmup_from": a model directory with a tokenizer_warmup.json to warm up with
+#   "compression": "gzip", "lz4" or "zstd" to package the model's files as
+#                  compressed blobs, see `blob_store.store_blobs`
+#   "version", "description": for the model meta
+DEFAULT_VARIANTS = [
+    {"name": "scispacy_core_web_sm", "base_model": "en_core_web_sm"},
+    {"name": "scispacy_core_web_md", "base_model": "en_core_web_md", "shared_vectors": True},
+    {"name": "scispacy_segmentation", "pipeline": "segmentation"},
+]
+
+def hash_file(digest, path, root):
+    digest.update(os.path.relpath(path, root).encode("utf-8"))
+    with open(path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(block)
+
+def hash_tree(digest, root):
+    for directory, directories, files in os.walk(root):
+        directories[:] = sorted(name for name in directories if name != "__pycache__")
+        for name in sorted(files):
+            if not name.endswith(".pyc"):
+                hash_file(digest, os.path.join(directory, name), root)
+
+def variant_input_hash(variant):
+    """Returns a hash of everything building a variant depends on: its
+       definition, the SciSpaCy code, the spaCy version and the contents of its
+       base model and warm up chunks.
+
+    @param variant: the variant definition, see `DEFAULT_VARIANTS`
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(variant, sort_keys=True).encode("utf-8"))
+    digest.update(about.__version__.encode("utf-8"))
+    for path in SOURCE_PATHS:
+        hash_file(digest, path, REPO_PATH)
+    base_model = variant.get("base_model")
+    if base_model is not None:
+        hash_tree(digest, base_model if os.path.isdir(base_model) else str(get_package_path(base_model)))
+    if variant.get("warmup_from") is not None:
+        digest.update(json.dumps(load_warmup(variant["warmup_from"])).encode("utf-8"))
+    return digest.hexdigest()
+
+def stamp_path(output_dir, variant):
+    return os.path.join(output_dir, "{}.build.json".format(variant["name"]))
+
+def read_stamp(output_dir, variant, input_hash):
+    """Returns the stamp of the last build of a variant if its inputs have not
+       changed since and its artifacts are still there, otherwise None.
+    """
+    path = stamp_path(output_dir, variant)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as stamp_file:
+        stamp = json.load(stamp_file)
+    if stamp.get("input_hash") != input_hash:
+        return None
+    if not all(os.path.exists(os.path.join(output_dir, artifact["file"])) for artifact in stamp["artifacts"]):
+        return None
+    return stamp
+
+def create_variant_pipeline(variant):
+    if variant.get("pipeline", "combined_rule") == "segmentation":
+        nlp = create_combined_rule_segmentation_model(variant.get("base_model"))
+    else:
+        nlp = create_combined_rule_model(model=variant.get("base_model", "en_core_web_sm"))
+    nlp.meta["name"] = variant["name"]
+    nlp.meta["version"] = variant.get("version", "1.0.0")
+    if "description" in variant:
+        nlp.meta["description"] = variant["description"]
+    return nlp
+
+def build_variant(variant, output_dir, input_hash):
+    """Builds the sdist and wheel of a model variant into output_dir, in a
+       temporary directory of its own, and writes its build stamp. Returns the
+       build report of the variant.
+
+    @param variant: the variant definition, see `DEFAULT_VARIANTS`
+    @param output_dir: the directory to put the artifacts in
+    @param input_hash: the `variant_input_hash` of the variant
+    """
+    start = time.perf_counter()
+    work_dir = tempfile.mkdtemp(prefix="scispacy_build_")
+    try:
+        nlp = create_variant_pipeline(variant)
+        model_path = os.path.join(work_dir, "model")
+        warmup_chunks = load_warmup(variant["warmup_from"]) if variant.get("warmup_from") else None
+        compression = variant.get("compression")
+        save_model(nlp, model_path, warmup_chunks=warmup_chunks,
+                   shared_vectors=variant.get("shared_vectors", False),
+                   blob_store=os.path.join(model_path, "blobs") if compression else None, compression=compression)
+
+        package_root = os.path.join(work_dir, "package")
+        os.makedirs(package_root)
+        package(model_path, package_root, force=True)
+        package_path, = glob.glob(os.path.join(package_root, "*"))
+        package_name = "{}_{}".format(nlp.meta["lang"], nlp.meta["name"])
+        # the packaged model loads the SciSpaCy components, see proto_model/__init__.py
+        shutil.copy(INIT_PATH, os.path.join(package_path, package_name, "__init__.py"))
+
+        dist_dir = os.path.join(work_dir, "dist")
+        subprocess.run([sys.executable, "setup.py", "--quiet", "sdist", "--dist-dir", dist_dir,
+                        "bdist_wheel", "--dist-dir", dist_dir],
+                       cwd=package_path, check=True, stdout=subprocess.DEVNULL)
+        artifacts = []
+        for name in sorted(os.listdir(dist_dir)):
+            shutil.move(os.path.join(dist_dir, name), os.path.join(output_dir, name))
+            artifacts.append({"file": name, "bytes": os.path.getsize(os.path.join(output_dir, name))})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stamp = {"name": variant["name"], "input_hash": input_hash, "seconds": time.perf_counter() - start,
+             "artifacts": artifacts}
+    with open(stamp_path(output_dir, variant), "w", encoding="utf-8") as stamp_file:
+        json.dump(stamp, stamp_file, indent=2)
+    return dict(stamp, status="built")
+
+def failed_report(variant, error):
+    return {"name": variant["name"], "status": "failed", "error": repr(error), "seconds": 0.0, "artifacts": []}
+
+def build_variant_in_worker(args):
+    variant, output_dir, input_hash = args
+    try:
+        return build_variant(variant, output_dir, input_hash)
+    except Exception as error: # pylint: disable=broad-except
+        # one failed variant should not stop the others
+        return failed_report(variant, error)
+
+def build_variants(variants, output_dir, n_workers=None, force=False):
+    """Builds model variants in parallel, each in a fresh process that shares
+       nothing with the others but the output directory. Variants whose inputs
+       have not changed since their last build are skipped. Returns a build
+       report per variant, in the order of variants, with its status ("built",
+       "skipped" or "failed"), build time in seconds and artifacts.
+
+    @param variants: a list of variant definitions, see `DEFAULT_VARIANTS`
+    @param output_dir: the directory to put the sdists, wheels and build stamps in
+    @param n_workers: the number of variants to build at once, by default one
+                      per variant up to the number of CPUs
+    @param force: whether to rebuild variants whose inputs have not changed
+    """
+    names = [variant["name"] for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Variant names must be unique: {}".format(names))
+    os.makedirs(output_dir, exist_ok=True)
+
+    reports = {}
+    to_build = []
+    for variant in variants:
+        try:
+            input_hash = variant_input_hash(variant)
+        except Exception as error: # pylint: disable=broad-except
+            # e.g. a base model that is not installed, which only fails its variant
+            reports[variant["name"]] = failed_report(variant, error)
+            continue
+        stamp = None if force else read_stamp(output_dir, variant, input_hash)
+        if stamp is not None:
+            reports[variant["name"]] = dict(stamp, status="skipped")
+        else:
+            to_build.append((variant, output_dir, input_hash))
+
+    if to_build:
+        n_workers = n_workers or min(len(to_build), multiprocessing.cpu_count())
+        # a process per variant, so the models one variant loads are freed before the next
+        with multiprocessing.Pool(n_workers, maxtasksperchild=1) as pool:
+            for report in pool.imap_unordered(build_variant_in_worker, to_build):
+                reports[report["name"]] = report
+    return [reports[name] for name in names]
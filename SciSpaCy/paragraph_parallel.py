@@ -0,0 +1,168 @@
+import sys
+import os
+
+import numpy
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from corpus_annotation import load_model # pylint: disable-msg=E0611,E0401
+from incremental_segmentation import TOKEN_ATTRS, make_doc # pylint: disable-msg=E0611,E0401
+from incremental_segmentation import paragraph_breaks, unmatched_brackets # pylint: disable-msg=E0611,E0401
+from preloaded_pool import PreloadedPool # pylint: disable-msg=E0611,E0401
+
+def group_paragraphs(starts, n_units):
+    """Groups consecutive paragraphs into at most n_units units of about the
+       same number of characters, and returns the [first, last) paragraph
+       indices of each.
+
+    @param starts: the offsets of the paragraphs in the text, followed by its length
+    @param n_units: the number of units to aim for
+    """
+    target = starts[-1] / max(n_units, 1)
+    units = []
+    first = 0
+    for last in range(1, len(starts)):
+        if starts[last] - starts[first] >= target or last == len(starts) - 1:
+            units.append((first, last))
+            first = last
+    return units
+
+def process_units(nlp, units):
+    """Processes units of paragraphs and returns, for each, a uint64 array of
+       the `incremental_segmentation.TOKEN_ATTRS` of its tokens, the strings
+       of their ORTH and LEMMA ids, and whether its brackets are unmatched,
+       see `unmatched_brackets`.
+
+    @param nlp: the pipeline to process the units with
+    @param units: a list of (text, context) pairs, where context is the number
+                  of tokens at the end of the text that only give the tokens
+                  before them their context, and are left out
+    """
+    results = []
+    for text, context in units:
+        doc = nlp(text)
+        attributes = doc.to_array(TOKEN_ATTRS)[:len(doc) - context]
+        strings = [doc.vocab.strings[key] for key in numpy.unique(attributes[:, [0, 2]]).tolist() if key]
+        results.append((attributes, strings) + unmatched_brackets(nlp, doc.vocab.strings, attributes[:, 0]))
+    return results
+
+def conflicting_runs(results):
+    """Returns the [first, last] indices of the runs of consecutive units that
+       have to be processed together because the segmenter would match
+       brackets across them: from a unit that leaves a bracket open to a later
+       one that closes a bracket it did not open.
+    """
+    runs = []
+    last_open = None
+    for i, (_, _, open_at_end, closed_unopened) in enumerate(results):
+        if closed_unopened and last_open is not None:
+            if runs and runs[-1][1] >= last_open:
+                runs[-1][1] = i
+            else:
+                runs.append([last_open, i])
+        if open_at_end:
+            last_open = i
+    return runs
+
+class ParagraphParallelPipeline(object):
+    """Processes long documents with a pipeline that tokenizes and segments
+       sentences with the combined rules, such as
+       `util.create_combined_rule_segmentation_model()`, by splitting them at
+       paragraph breaks and processing the paragraphs in worker processes.
+
+       The tokenizer makes a token of a "\\n\\n" or "\\n\\n\\n\\n" between two
+       words, and the segmenter always starts a sentence at it and at the
+       token after it, so the paragraphs on either side are tokenized and
+       segmented independently, except for brackets that are opened in one
+       paragraph and closed in a later one. Paragraphs are grouped into a few
+       units per worker of about the same size, each unit is processed with
+       the paragraph break that follows it, so its last tokens see the same
+       context as in the whole document, and units that brackets are matched
+       across are processed again together. The Doc that is returned has the
+       same tokens, whitespace and sentence boundaries as `nlp(text)`.
+
+       Pipelines with a tagger or parser can be used too, but as those see
+       each unit without the text around it, their sentence boundaries near
+       paragraph breaks can differ from those of `nlp(text)`, and only the
+       tokens and sentence boundaries are kept in the Doc.
+
+       The workers are forked with `preloaded_pool.PreloadedPool`, as the
+       tokenizer and segmenter hold the GIL, which leaves nothing for threads
+       to gain.
+
+       >>> with ParagraphParallelPipeline(util.create_combined_rule_segmentation_model(), n_workers=4) as nlp:
+       ...     doc = nlp(remove_new_lines(text))
+    """
+    def __init__(self, nlp=None, model="combined_rule_segmentation", n_workers=None, warmup_texts=(),
+                 units_per_worker=4):
+        """@param nlp: the pipeline to process the paragraphs with, by
+                       default loaded from model
+           @param model: the model to load if nlp is None, see
+                         `corpus_annotation.load_model`
+           @param n_workers: the number of worker processes, by default the
+                             number of CPUs. With 1 the paragraphs are
+                             processed in this process.
+           @param warmup_texts: texts to process before forking the workers
+           @param units_per_worker: the number of units to split a document
+                                    into per worker
+        """
+        self.units_per_worker = units_per_worker
+        if n_workers == 1:
+            self.pool = None
+            self.nlp = nlp if nlp is not None else load_model(model)
+            self.n_workers = 1
+        else:
+            self.pool = PreloadedPool(nlp, model, n_workers, warmup_texts, batch_size=1)
+            self.nlp = self.pool.nlp
+            self.n_workers = self.pool.n_workers
+
+    def process(self, units):
+        if self.pool is None:
+            return process_units(self.nlp, units)
+        return self.pool.map(units, process_units)
+
+    def __call__(self, text):
+        """Processes a text and returns a Doc with its tokens and sentence
+           boundaries.
+
+        @param text: the text to process, cleaned with `remove_new_lines` if
+                     it would be for `nlp(text)`
+        """
+        breaks = paragraph_breaks(text)
+        # a paragraph after the first starts with the break before it
+        starts = [0] + [start for start, _ in breaks] + [len(text)]
+        context_ends = [None] + [end for _, end in breaks] + [len(text)]
+
+        def unit_text(unit):
+            first, last = unit
+            if last == len(starts) - 1:
+                return text[starts[first]:], 0
+            return text[starts[first]:context_ends[last]], 1
+
+        units = group_paragraphs(starts, self.n_workers * self.units_per_worker)
+        results = self.process([unit_text(unit) for unit in units])
+        runs = conflicting_runs(results)
+        while runs:
+            for first, last in reversed(runs):
+                units[first:last + 1] = [(units[first][0], units[last][1])]
+                results[first:last + 1] = [None]
+            pending = [i for i, result in enumerate(results) if result is None]
+            for i, result in zip(pending, self.process([unit_text(units[i]) for i in pending])):
+                results[i] = result
+            runs = conflicting_runs(results)
+
+        strings = self.nlp.vocab.strings
+        for _, unit_strings, _, _ in results:
+            for string in unit_strings:
+                strings.add(string)
+        return make_doc(self.nlp.vocab, numpy.concatenate([attributes for attributes, _, _, _ in results]))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
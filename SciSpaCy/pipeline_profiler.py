@@ -0,0 +1,231 @@
+import re
+import time
+from collections import OrderedDict
+
+# the whitespace delimited runs of text the spaCy tokenizer caches its tokenization of
+CHUNK_RE = re.compile(r"\s+|\S+")
+
+# the tokenizer hooks whose calls are counted, in the order the tokenizer tries them
+TOKENIZER_PHASES = ["token_match", "prefix_search", "suffix_search", "infix_finditer"]
+
+def tokenizer_chunks(text):
+    """Splits a text into the chunks the spaCy tokenizer looks up in its cache:
+       runs of non whitespace, and runs of whitespace without the single space
+       that follows a token.
+    """
+    chunks = []
+    for match in CHUNK_RE.finditer(text):
+        chunk = match.group()
+        if chunk[0] == " " and match.start() > 0:
+            chunk = chunk[1:]
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+class ComponentStats(object):
+    """Cumulative wall time, calls, docs and tokens of one pipeline component."""
+    __slots__ = ("seconds", "calls", "docs", "tokens")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.docs = 0
+        self.tokens = 0
+
+    def as_dict(self):
+        return OrderedDict([("seconds", self.seconds),
+                            ("calls", self.calls),
+                            ("docs", self.docs),
+                            ("tokens", self.tokens),
+                            ("tokens_per_second", self.tokens / self.seconds if self.seconds else 0.0)])
+
+class ProfiledComponent(object):
+    """Wraps a pipeline component and records its cumulative wall time. When
+       documents are streamed through `pipe`, the time spent by the components
+       before it to produce its input is not counted.
+    """
+    def __init__(self, component, stats):
+        self.component = component
+        self.stats = stats
+
+    def __call__(self, doc):
+        start = time.perf_counter()
+        doc = self.component(doc)
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.calls += 1
+        self.stats.docs += 1
+        self.stats.tokens += len(doc)
+        return doc
+
+    def pipe(self, docs, **kwargs):
+        upstream = [0.0]
+
+        def timed_input():
+            docs_iter = iter(docs)
+            while True:
+                start = time.perf_counter()
+                try:
+                    doc = next(docs_iter)
+                except StopIteration:
+                    return
+                finally:
+                    upstream[0] += time.perf_counter() - start
+                yield doc
+
+        if hasattr(self.component, "pipe"):
+            outputs = self.component.pipe(timed_input(), **kwargs)
+        else:
+            outputs = (self.component(doc) for doc in timed_input())
+        self.stats.calls += 1
+        while True:
+            upstream_before = upstream[0]
+            start = time.perf_counter()
+            try:
+                doc = next(outputs)
+            except StopIteration:
+                self.stats.seconds += time.perf_counter() - start - (upstream[0] - upstream_before)
+                return
+            self.stats.seconds += time.perf_counter() - start - (upstream[0] - upstream_before)
+            self.stats.docs += 1
+            self.stats.tokens += len(doc)
+            yield doc
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.component, attr)
+
+class ProfiledTokenizer(object):
+    """Wraps a spaCy tokenizer, recording its cumulative wall time and counting
+       the calls to its prefix, suffix, infix and token_match hooks.
+
+       spaCy does not expose its tokenizer cache, so cache misses are counted
+       as the chunks whose tokenization calls the first hook the tokenizer
+       tries (token_match if it is set, otherwise prefix_search) on the whole
+       chunk, and every other chunk is a cache hit.
+    """
+    def __init__(self, tokenizer, stats):
+        self.tokenizer = tokenizer
+        self.stats = stats
+        self.phase_calls = OrderedDict((phase, 0) for phase in TOKENIZER_PHASES)
+        self.chunks = 0
+        self.cache_misses = 0
+        self.original_hooks = {phase: getattr(tokenizer, phase) for phase in TOKENIZER_PHASES}
+        self.first_phase = "token_match" if tokenizer.token_match is not None else "prefix_search"
+        self.current_chunks = frozenset()
+        self.last_call = None
+        for phase, hook in self.original_hooks.items():
+            if hook is not None:
+                setattr(tokenizer, phase, self.counting_hook(phase, hook))
+
+    def counting_hook(self, phase, hook):
+        def counted(string):
+            self.phase_calls[phase] += 1
+            if phase == self.first_phase and string in self.current_chunks and self.last_call != string:
+                self.cache_misses += 1
+            self.last_call = string
+            return hook(string)
+        # Tokenizer.to_bytes reads the pattern of the hooks from their __self__
+        counted.__self__ = getattr(hook, "__self__", None)
+        return counted
+
+    def restore(self):
+        """Puts the original hooks back on the tokenizer and returns it."""
+        for phase, hook in self.original_hooks.items():
+            setattr(self.tokenizer, phase, hook)
+        return self.tokenizer
+
+    def __call__(self, text):
+        chunks = tokenizer_chunks(text)
+        self.current_chunks = frozenset(chunks)
+        self.last_call = None
+        start = time.perf_counter()
+        doc = self.tokenizer(text)
+        self.stats.seconds += time.perf_counter() - start
+        self.current_chunks = frozenset()
+        self.chunks += len(chunks)
+        self.stats.calls += 1
+        self.stats.docs += 1
+        self.stats.tokens += len(doc)
+        return doc
+
+    def pipe(self, texts, **kwargs): # pylint: disable=unused-argument
+        for text in texts:
+            yield self(text)
+
+    def tokenizer_stats(self):
+        return OrderedDict([("calls", OrderedDict(self.phase_calls)),
+                            ("chunks", self.chunks),
+                            ("cache_hits", max(self.chunks - self.cache_misses, 0)),
+                            ("cache_misses", self.cache_misses)])
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.tokenizer, attr)
+
+class PipelineProfiler(object):
+    """Opt-in instrumentation of a pipeline such as the one built by
+       `util.create_combined_rule_model`. Wraps the tokenizer and every
+       component in place, so that processing texts with the pipeline as usual
+       records the wall time, calls, docs and tokens of each of them.
+
+            nlp = create_combined_rule_model()
+            profiler = PipelineProfiler(nlp)
+            docs = list(nlp.pipe(texts))
+            print(profiler.to_prometheus())
+            profiler.remove()
+    """
+    def __init__(self, nlp):
+        """@param nlp: the pipeline to instrument"""
+        self.nlp = nlp
+        self.components = OrderedDict()
+        self.components["tokenizer"] = ComponentStats()
+        self.tokenizer = ProfiledTokenizer(nlp.tokenizer, self.components["tokenizer"])
+        nlp.tokenizer = self.tokenizer
+        for name, component in list(nlp.pipeline):
+            self.components[name] = ComponentStats()
+            nlp.replace_pipe(name, ProfiledComponent(component, self.components[name]))
+
+    def remove(self):
+        """Removes the instrumentation from the pipeline."""
+        self.nlp.tokenizer = self.tokenizer.restore()
+        for name, component in list(self.nlp.pipeline):
+            if isinstance(component, ProfiledComponent):
+                self.nlp.replace_pipe(name, component.component)
+
+    def stats(self):
+        """Returns the statistics of every component, in pipeline order, and
+           the tokenizer's hook calls and cache hits.
+        """
+        return OrderedDict([("components", OrderedDict((name, stats.as_dict())
+                                                       for name, stats in self.components.items())),
+                            ("tokenizer", self.tokenizer.tokenizer_stats())])
+
+    def to_prometheus(self, prefix="scispacy"):
+        """Returns the statistics in the Prometheus text exposition format."""
+        lines = []
+        def metric(name, help_text, samples):
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} counter".format(prefix, name))
+            for labels, value in samples:
+                label_text = ",".join('{}="{}"'.format(key, value) for key, value in labels)
+                lines.append("{}_{}{} {}".format(prefix, name, "{" + label_text + "}" if label_text else "",
+                                                 value))
+
+        for name, help_text in [("seconds", "Cumulative wall time spent in the pipeline component."),
+                                ("calls", "Calls to the pipeline component."),
+                                ("docs", "Documents processed by the pipeline component."),
+                                ("tokens", "Tokens processed by the pipeline component.")]:
+            metric("component_{}_total".format(name), help_text,
+                   [((("component", component),), getattr(stats, name))
+                    for component, stats in self.components.items()])
+        tokenizer_stats = self.tokenizer.tokenizer_stats()
+        metric("tokenizer_phase_calls_total",
+               "Calls to the tokenizer's prefix, suffix, infix and token_match hooks.",
+               [((("phase", phase),), calls) for phase, calls in tokenizer_stats["calls"].items()])
+        metric("tokenizer_chunks_total", "Whitespace delimited chunks looked up in the tokenizer cache.",
+               [((), tokenizer_stats["chunks"])])
+        metric("tokenizer_cache_hits_total", "Chunks found in the tokenizer cache.",
+               [((), tokenizer_stats["cache_hits"])])
+        return "\n".join(lines) + "\n"
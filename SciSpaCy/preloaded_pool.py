@@ -0,0 +1,155 @@
+import gc
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+from spacy.util import minibatch
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from corpus_annotation import load_model, annotate_texts # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import load_warmup, warm_up_tokenizer # pylint: disable-msg=E0611,E0401
+
+# the pipelines of the live pools of this process by pool id, which forked
+# workers inherit instead of loading them
+POOL_MODELS = {}
+# when the pool a worker was forked for was created, and how long the worker
+# took to be ready after that
+POOL_CREATED = {}
+WORKER_STARTUP_SECONDS = None
+
+def annotate(nlp, texts):
+    """Annotates texts like `corpus_annotation.annotate_texts`, without ids."""
+    annotations = list(annotate_texts(nlp, list(enumerate(texts))))
+    for annotation in annotations:
+        del annotation["id"]
+    return annotations
+
+def init_forked_worker(pool_id):
+    global WORKER_STARTUP_SECONDS # pylint: disable=global-statement
+    WORKER_STARTUP_SECONDS = time.time() - POOL_CREATED[pool_id]
+
+def process_batch(pool_id, function, texts):
+    return os.getpid(), WORKER_STARTUP_SECONDS, function(POOL_MODELS[pool_id], texts)
+
+class PreloadedPool(object):
+    """A pool of worker processes that are forked from this process after it
+       has loaded and warmed up the pipeline, so that a worker starts in
+       milliseconds instead of loading the model and compiling the tokenizer
+       rules itself, and the workers share the pipeline's memory copy on write.
+
+       The pipeline is warmed up before the workers are forked, so the strings,
+       lexemes and tokenizer cache entries of common text are in the shared
+       pages rather than added to the StringStore of every worker. This is also
+       where the tokenizer warm up chunks saved with a model are tokenized, once
+       for all workers. The objects
+       that exist at the fork are moved out of reach of the garbage collector
+       (on Python 3.7+), whose bookkeeping would otherwise write to, and so
+       copy, every page they are on. The garbage collector is process wide, so
+       they are only given back to it when the last open pool is closed.
+       Strings a worker adds are private to it, so workers can be replaced
+       after max_batches_per_worker batches to bound their growth.
+
+       Workers are forked, so this only works on platforms with os.fork.
+
+       >>> with PreloadedPool(n_workers=4, warmup_texts=texts[:1000]) as pool:
+       ...     for annotation in pool.imap(texts):
+       ...         ...
+    """
+    def __init__(self, nlp=None, model="combined_rule", n_workers=None, warmup_texts=(), batch_size=64,
+                 max_batches_per_worker=None, warmup_chunks=None):
+        """@param nlp: the pipeline to fork the workers with, by default loaded
+                       from model
+           @param model: the model to load if nlp is None, see
+                         `corpus_annotation.load_model`
+           @param n_workers: the number of worker processes, by default the
+                             number of CPUs
+           @param warmup_texts: texts to process before forking the workers
+           @param batch_size: the number of texts sent to a worker at a time
+           @param max_batches_per_worker: the number of batches after which a
+                                          worker is replaced by a fresh fork,
+                                          by default never
+           @param warmup_chunks: chunks to warm the tokenizer up with before
+                                 forking the workers, by default the ones saved
+                                 with the model, see `tokenizer_cache.load_warmup`
+        """
+        start = time.perf_counter()
+        self.nlp = nlp if nlp is not None else load_model(model)
+        self.load_seconds = time.perf_counter() - start
+        if warmup_chunks is None:
+            warmup_chunks = load_warmup(self.nlp.path) if self.nlp.path is not None else []
+        self.n_warmup_chunks = warm_up_tokenizer(self.nlp.tokenizer, warmup_chunks)
+        for _ in self.nlp.pipe(warmup_texts):
+            pass
+        self.warmup_seconds = time.perf_counter() - start - self.load_seconds
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.worker_startup_seconds = {}
+
+        self.pool_id = id(self)
+        POOL_MODELS[self.pool_id] = self.nlp
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        POOL_CREATED[self.pool_id] = time.time()
+        self.pool = multiprocessing.get_context("fork").Pool(
+            self.n_workers, initializer=init_forked_worker, initargs=(self.pool_id,),
+            maxtasksperchild=max_batches_per_worker)
+
+    def imap(self, texts, function=annotate):
+        """Processes texts in the workers and yields the results in order. The
+           texts are consumed lazily, with at most two batches per worker in
+           flight.
+
+        @param texts: an iterable of texts
+        @param function: a module level function that takes the pipeline and a
+                         list of texts and returns a list of results, by
+                         default `annotate`
+        """
+        pending = deque()
+        for batch in minibatch(texts, size=self.batch_size):
+            if len(pending) >= 2 * self.n_workers:
+                yield from self.collect(pending.popleft())
+            pending.append(self.pool.apply_async(process_batch, (self.pool_id, function, batch)))
+        while pending:
+            yield from self.collect(pending.popleft())
+
+    def map(self, texts, function=annotate):
+        """Returns the list of results of `imap`."""
+        return list(self.imap(texts, function))
+
+    def collect(self, result):
+        pid, startup_seconds, results = result.get()
+        # workers that replace retired ones start long after the pool was created
+        if pid not in self.worker_startup_seconds and len(self.worker_startup_seconds) < self.n_workers:
+            self.worker_startup_seconds[pid] = startup_seconds
+        return results
+
+    def stats(self):
+        """Returns the seconds it took to load and warm up the pipeline, and
+           to start each of the first workers that processed a batch.
+        """
+        startups = sorted(self.worker_startup_seconds.values())
+        return {"load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds,
+                "warmup_chunks": self.n_warmup_chunks,
+                "workers": self.n_workers,
+                "worker_startup_seconds": startups,
+                "max_worker_startup_seconds": startups[-1] if startups else None}
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        closed = POOL_MODELS.pop(self.pool_id, None) is not None
+        POOL_CREATED.pop(self.pool_id, None)
+        # the objects frozen for other pools that are still open stay frozen
+        if closed and not POOL_MODELS and hasattr(gc, "unfreeze"):
+            gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
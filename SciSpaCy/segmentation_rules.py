@@ -0,0 +1,369 @@
+import re
+import sys
+import os
+from collections import OrderedDict
+
+import numpy
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from abbreviations import DEFAULT_ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from consts import SEGMENTATION_RULES # pylint: disable-msg=E0611,E0401
+
+# the values of SENT_START the actions of a rule set
+ACTIONS = {"start": 1, "not_start": -1}
+
+# the tokens a window rule can look at, by their position relative to the token it applies to
+WINDOW = ["prev2", "prev", "token", "next"]
+
+# the number of lexemes whose predicate masks are cached, after which the least
+# recently used ones are evicted and computed again when they are seen
+MAX_CACHED_LEXEMES = 100000
+
+# the number of lexeme classes the window rule table can have. The table has
+# one entry per combination of the classes of the four tokens of a window, so
+# 64 classes take 16 MB. Lexemes that satisfy mutually exclusive predicates,
+# such as different TEXT values, share few classes: the default rules see 12.
+MAX_TABLE_CLASSES = 64
+
+WINDOW_RULE_KEYS = frozenset(["name", "action"] + WINDOW)
+BRACKET_RULE_KEYS = frozenset(["name", "action", "open", "close", "unless", "unmatched"])
+
+# predicates of a single lexeme, given as a boolean in a token pattern
+BOOLEAN_PREDICATES = {
+    "STARTS_WITH_DIGIT": lambda text: text[:1].isdigit(),
+    "STARTS_WITH_UPPER": lambda text: text[:1].isupper(),
+    "STARTS_WITH_LOWER": lambda text: text[:1].islower(),
+    # looked up in an `AbbreviationIndex` when the rules are applied, as it can be extended
+    "IS_ABBREVIATION": None,
+}
+
+def value_predicate(key, value):
+    """Returns a function of the text of a lexeme for a predicate with a value."""
+    if key == "TEXT":
+        texts = frozenset([value] if isinstance(value, str) else value)
+        return lambda text: text in texts
+    if key == "LENGTH":
+        return lambda text: len(text) == value
+    if key == "REGEX":
+        pattern = re.compile(value)
+        return lambda text: pattern.fullmatch(text) is not None
+    raise ValueError("Unknown token predicate: {}".format(key))
+
+class SegmentationRules(object):
+    """Sentence segmentation rules compiled from a declarative specification.
+       A rule set is a list of rules (dicts) of two kinds:
+
+       Window rules set SENT_START on a token depending on the token and its
+       neighbours, e.g. a number after an abbreviation does not start a sentence:
+
+            {"name": "number_after_abbreviation",
+             "prev": {"IS_ABBREVIATION": True}, "token": {"STARTS_WITH_DIGIT": True},
+             "action": "not_start"}
+
+       The keys "prev2", "prev", "token" and "next" hold token patterns for the
+       tokens at offsets -2 to 1. A pattern matches an existing token that
+       satisfies all of its predicates: "TEXT" (a string or a list of
+       strings), "LENGTH", "REGEX" (matching the whole text),
+       "STARTS_WITH_DIGIT", "STARTS_WITH_UPPER", "STARTS_WITH_LOWER" and
+       "IS_ABBREVIATION", and none of the predicates under "NOT". So {}
+       matches any token, and a missing key matches anything, including the
+       start or end of the doc.
+
+       Bracket rules set SENT_START on the opening bracket when a closing
+       bracket is matched with it, unless one of the "unless" conditions
+       holds, and on the brackets left unmatched at the end of a doc:
+
+            {"name": "parens", "open": {"TEXT": "("}, "close": {"TEXT": ")"},
+             "action": "not_start",
+             "unless": [{"before_close": {"TEXT": "."}},
+                        {"before_close": {"LENGTH": 1}, "inside": 1}],
+             "unmatched": "not_start"}
+
+       A condition holds if the token before the closing bracket matches the
+       "before_close" pattern and, if given, there are "inside" tokens between
+       the brackets. A closing bracket without an opening one is ignored.
+
+       Actions are "start" or "not_start". Window rules are applied first, and
+       a later rule that matches a token overrides earlier ones.
+
+       The predicates are evaluated once per lexeme, and lexemes that satisfy
+       the same predicates share a class. The window rules are compiled into a
+       table that maps the classes of the four tokens of a window to the
+       action for the token, so applying them is one lookup per token however
+       many rules there are. The table is extended when a lexeme with a new
+       combination of predicates is seen, up to `MAX_TABLE_CLASSES` classes,
+       after which a ValueError is raised, as the table grows with the fourth
+       power of the number of classes. Rules with many predicates that hold
+       independently of each other, such as several overlapping REGEX
+       predicates, can reach that limit.
+    """
+    def __init__(self, rules=SEGMENTATION_RULES):
+        """@param rules: a list of rules in the format above
+        """
+        self.rules = list(rules)
+        # the predicates of the rules, whose bit in a lexeme mask is their index
+        self.predicates = []
+        self.predicate_bits = {}
+        self.abbreviation_bit = None
+        # (required, forbidden) masks for each window position, or None, and the action
+        self.window_rules = []
+        self.bracket_rules = []
+        for rule in self.rules:
+            self.add_rule(rule)
+
+        # the predicate masks of recently seen lexemes, by orth id
+        self.lexeme_masks = OrderedDict()
+        # class 0 stands for a position before the start or after the end of a doc
+        self.class_masks = [None]
+        self.class_ids = {}
+        self.table = None
+        self.bracket_tables = []
+        self.n_table_classes = 0
+
+    def predicate_bit(self, key, value):
+        """Returns the bit of a predicate, and whether the predicate holds when it is set."""
+        if isinstance(value, bool):
+            if key not in BOOLEAN_PREDICATES:
+                raise ValueError("Unknown boolean token predicate: {}".format(key))
+            identifier = (key,)
+        else:
+            if isinstance(value, list):
+                value = tuple(sorted(value))
+            identifier = (key, value)
+        if identifier not in self.predicate_bits:
+            self.predicate_bits[identifier] = len(self.predicates)
+            if key == "IS_ABBREVIATION":
+                self.abbreviation_bit = len(self.predicates)
+                self.predicates.append(None)
+            elif isinstance(value, bool):
+                self.predicates.append(BOOLEAN_PREDICATES[key])
+            else:
+                self.predicates.append(value_predicate(key, value))
+        return self.predicate_bits[identifier], value is not False
+
+    def compile_pattern(self, pattern):
+        """Returns the masks of the predicates a token pattern requires and forbids."""
+        if pattern is None:
+            return None
+        required, forbidden = 0, 0
+        for key, value in pattern.items():
+            if key == "NOT":
+                for negated_key, negated_value in value.items():
+                    bit, holds = self.predicate_bit(negated_key, negated_value)
+                    if holds:
+                        forbidden |= 1 << bit
+                    else:
+                        required |= 1 << bit
+            else:
+                bit, holds = self.predicate_bit(key, value)
+                if holds:
+                    required |= 1 << bit
+                else:
+                    forbidden |= 1 << bit
+        return required, forbidden
+
+    def add_rule(self, rule):
+        if rule.get("action") not in ACTIONS:
+            raise ValueError("Rule {} has no action, or one that is not in {}".format(rule, sorted(ACTIONS)))
+        if "open" in rule or "close" in rule:
+            if set(rule) - BRACKET_RULE_KEYS or "open" not in rule or "close" not in rule:
+                raise ValueError("Bracket rule {} needs open and close patterns, and can only have the keys {}"
+                                 .format(rule, sorted(BRACKET_RULE_KEYS)))
+            if rule.get("unmatched") is not None and rule["unmatched"] not in ACTIONS:
+                raise ValueError("Rule {} has an unmatched action that is not in {}".format(rule, sorted(ACTIONS)))
+            self.bracket_rules.append({
+                "open": self.compile_pattern(rule["open"]),
+                "close": self.compile_pattern(rule["close"]),
+                "action": ACTIONS[rule["action"]],
+                "unless": [(self.compile_pattern(condition.get("before_close", {})), condition.get("inside"))
+                           for condition in rule.get("unless", [])],
+                "unmatched": ACTIONS.get(rule.get("unmatched"))})
+        else:
+            if set(rule) - WINDOW_RULE_KEYS:
+                raise ValueError("Window rule {} can only have the keys {}".format(rule, sorted(WINDOW_RULE_KEYS)))
+            self.window_rules.append(([self.compile_pattern(rule.get(position)) for position in WINDOW],
+                                      ACTIONS[rule["action"]]))
+
+    def lexeme_mask(self, text):
+        mask = 0
+        for bit, predicate in enumerate(self.predicates):
+            if predicate is not None and predicate(text):
+                mask |= 1 << bit
+        return mask
+
+    def matches(self, pattern):
+        """Returns whether each lexeme class matches a compiled pattern."""
+        if pattern is None:
+            return numpy.ones(len(self.class_masks), dtype=bool)
+        required, forbidden = pattern
+        return numpy.array([False] + [mask & required == required and not mask & forbidden
+                                      for mask in self.class_masks[1:]], dtype=bool)
+
+    def compile_tables(self):
+        n_classes = len(self.class_masks)
+        table = numpy.zeros((n_classes,) * len(WINDOW), dtype=numpy.int8)
+        for patterns, action in self.window_rules:
+            table[numpy.ix_(*[self.matches(pattern) for pattern in patterns])] = action
+        self.table = table.ravel()
+        self.bracket_tables = [{"open": self.matches(rule["open"]),
+                                "close": self.matches(rule["close"]),
+                                "unless": [(self.matches(before_close), inside)
+                                           for before_close, inside in rule["unless"]]}
+                               for rule in self.bracket_rules]
+        self.n_table_classes = n_classes
+
+    def lexeme_classes(self, strings, orths, abbreviations=DEFAULT_ABBREVIATIONS):
+        """Returns the lexeme class of every token. The predicates are
+           evaluated in Python once per distinct lexeme, not once per token.
+
+        @param strings: the StringStore the orth ids belong to
+        @param orths: an array with the orth id of every token
+        @param abbreviations: the `AbbreviationIndex` to look abbreviations up in
+        """
+        abbreviation_orths = abbreviations.orths(strings) if self.abbreviation_bit is not None else frozenset()
+        unique_orths, inverse = numpy.unique(orths, return_inverse=True)
+        unique_classes = numpy.empty(len(unique_orths), dtype=numpy.int64)
+        for k, orth in enumerate(unique_orths.tolist()):
+            mask = self.lexeme_masks.get(orth)
+            if mask is None:
+                mask = self.lexeme_masks[orth] = self.lexeme_mask(strings[orth])
+                if len(self.lexeme_masks) > MAX_CACHED_LEXEMES:
+                    self.lexeme_masks.popitem(last=False)
+            else:
+                self.lexeme_masks.move_to_end(orth)
+            if orth in abbreviation_orths:
+                mask |= 1 << self.abbreviation_bit
+            class_id = self.class_ids.get(mask)
+            if class_id is None:
+                if len(self.class_masks) >= MAX_TABLE_CLASSES:
+                    raise ValueError("The lexemes seen satisfy more than {} combinations of the predicates of "
+                                     "the segmentation rules".format(MAX_TABLE_CLASSES - 1))
+                class_id = self.class_ids[mask] = len(self.class_masks)
+                self.class_masks.append(mask)
+            unique_classes[k] = class_id
+        if self.n_table_classes != len(self.class_masks):
+            self.compile_tables()
+        return unique_classes[inverse]
+
+    def apply(self, strings, orths, sent_starts, doc_lengths=None, abbreviations=DEFAULT_ABBREVIATIONS):
+        """Applies the rules to the tokens of one or more docs laid out back to back.
+
+        @param strings: the StringStore the orth ids belong to
+        @param orths: an array with the orth id of every token
+        @param sent_starts: the SENT_START values of the tokens (-1, 0 or 1),
+                            which are updated in place
+        @param doc_lengths: the number of tokens in each doc, or None if the
+                            arrays hold a single doc
+        @param abbreviations: the `AbbreviationIndex` to look abbreviations up in
+        """
+        classes = self.lexeme_classes(strings, orths, abbreviations)
+        length = len(classes)
+        if doc_lengths is None:
+            doc_lengths = [length]
+        doc_ends = numpy.cumsum(doc_lengths)
+        # the position of every token within its doc
+        positions = numpy.arange(length) - numpy.repeat(doc_ends - doc_lengths, doc_lengths)
+
+        # the classes of the tokens around every token, 0 beyond the ends of its doc
+        window = []
+        for offset in range(-2, 2):
+            neighbours = numpy.zeros(length, dtype=numpy.int64)
+            if offset < 0:
+                neighbours[-offset:] = classes[:offset]
+                neighbours[positions < -offset] = 0
+            elif offset > 0:
+                neighbours[:-offset] = classes[offset:]
+                neighbours[positions >= numpy.repeat(doc_lengths, doc_lengths) - offset] = 0
+            else:
+                neighbours = classes
+            window.append(neighbours)
+        index = window[0]
+        for neighbours in window[1:]:
+            index = index * self.n_table_classes + neighbours
+        actions = self.table[index]
+        has_action = actions != 0
+        sent_starts[has_action] = actions[has_action]
+
+        for rule, tables in zip(self.bracket_rules, self.bracket_tables):
+            self.apply_bracket_rule(rule, tables, classes, window[1], sent_starts, doc_ends)
+        return sent_starts
+
+    @staticmethod
+    def apply_bracket_rule(rule, tables, classes, prev_classes, sent_starts, doc_ends):
+        is_open = tables["open"][classes]
+        bracket_positions = numpy.flatnonzero(is_open | tables["close"][classes])
+        bracket_doc_ends = doc_ends[numpy.searchsorted(doc_ends, bracket_positions, side="right")]
+        stack = []
+        unmatched = []
+        doc_end = 0
+        for i, opening, before_close, bracket_doc_end in zip(bracket_positions.tolist(),
+                                                             is_open[bracket_positions].tolist(),
+                                                             prev_classes[bracket_positions].tolist(),
+                                                             bracket_doc_ends.tolist()):
+            if bracket_doc_end != doc_end:
+                # brackets are only matched within a doc
+                unmatched.extend(stack)
+                stack = []
+                doc_end = bracket_doc_end
+            if opening:
+                stack.append(i)
+            elif stack:
+                last_open = stack.pop()
+                if not any(matches[before_close] and (inside is None or inside == i - last_open - 1)
+                           for matches, inside in tables["unless"]):
+                    sent_starts[last_open] = rule["action"]
+        unmatched.extend(stack)
+        if rule["unmatched"] is not None:
+            sent_starts[unmatched] = rule["unmatched"]
+
+    def bracket_depths(self, classes):
+        """Yields, for every bracket rule, the number of its brackets that are
+           open before every token and after the last one, and the lowest that
+           number has been so far, which only goes below zero for closing
+           brackets without an opening one.
+
+        @param classes: the lexeme class of every token, see `lexeme_classes`
+        """
+        for tables in self.bracket_tables:
+            is_open = tables["open"][classes]
+            steps = is_open.astype(numpy.int64) - (tables["close"][classes] & ~is_open)
+            depth = numpy.zeros(len(classes) + 1, dtype=numpy.int64)
+            numpy.cumsum(steps, out=depth[1:])
+            yield depth, numpy.minimum.accumulate(numpy.minimum(depth, 0))
+
+    def balanced(self, strings, orths, abbreviations=DEFAULT_ABBREVIATIONS):
+        """Returns whether no bracket of any bracket rule is open before every
+           token of a doc, and after the last one. The rules' decisions on
+           either side of such a position do not depend on each other.
+
+        @param strings: the StringStore the orth ids belong to
+        @param orths: an array with the orth id of every token
+        @param abbreviations: the `AbbreviationIndex` to look abbreviations up in
+        """
+        classes = self.lexeme_classes(strings, orths, abbreviations)
+        balanced = numpy.ones(len(classes) + 1, dtype=bool)
+        for depth, lowest in self.bracket_depths(classes):
+            # a closing bracket without an opening one is ignored
+            balanced &= depth == lowest
+        return balanced
+
+    def unmatched_brackets(self, strings, orths, abbreviations=DEFAULT_ABBREVIATIONS):
+        """Returns whether a bracket of any bracket rule is still open after
+           the last token of a doc, and whether one is closed without having
+           been opened in the doc.
+
+        @param strings: the StringStore the orth ids belong to
+        @param orths: an array with the orth id of every token
+        @param abbreviations: the `AbbreviationIndex` to look abbreviations up in
+        """
+        classes = self.lexeme_classes(strings, orths, abbreviations)
+        open_at_end = False
+        closed_unopened = False
+        for depth, lowest in self.bracket_depths(classes):
+            open_at_end |= bool(depth[-1] != lowest[-1])
+            closed_unopened |= bool(lowest[-1] < 0)
+        return open_at_end, closed_unopened
+
+# the rules of combined_rule_sentence_segmenter
+DEFAULT_SEGMENTATION_RULES = SegmentationRules(SEGMENTATION_RULES)
@@ -0,0 +1,75 @@
+import numpy
+from spacy.attrs import LENGTH, SPACY, SENT_START # pylint: disable-msg=E0611,E0401
+
+def sentence_starts(doc):
+    """Returns the indices of the tokens of a Doc that start a sentence, read
+       from its SENT_START column, the same way `doc.sents` finds them.
+    """
+    if "sents" in doc.user_hooks:
+        return numpy.asarray([sent.start for sent in doc.sents], dtype=numpy.int64)
+    if not len(doc):
+        return numpy.zeros(0, dtype=numpy.int64)
+    # SENT_START is -1, 0 or 1, and -1 wraps around in the uint64 array
+    sent_start = doc.to_array([SENT_START])
+    if not doc.is_parsed and not sent_start.any():
+        raise ValueError("The sentence boundaries of the Doc are not set, process it with a "
+                         "sentence segmenter or parser first")
+    starts = numpy.flatnonzero(sent_start == 1)
+    if not len(starts) or starts[0] != 0:
+        # the first token always starts a sentence
+        starts = numpy.concatenate([[0], starts])
+    return starts
+
+def sentence_token_offsets(doc):
+    """Returns the [start, end) token indices of the sentences of a Doc, as an
+       int32 array of shape (sentences, 2), without creating a Span per
+       sentence. Row i equals (sent.start, sent.end) of the i-th of doc.sents.
+    """
+    starts = sentence_starts(doc)
+    offsets = numpy.empty((len(starts), 2), dtype=numpy.int32)
+    offsets[:, 0] = starts
+    offsets[:-1, 1] = starts[1:]
+    offsets[-1:, 1] = len(doc)
+    return offsets
+
+def sentence_char_offsets(doc):
+    """Returns the [start, end) character offsets of the sentences of a Doc,
+       as an int32 array of shape (sentences, 2), without creating a Span per
+       sentence. Row i equals (sent.start_char, sent.end_char) of the i-th of
+       doc.sents, which excludes the whitespace after the sentence. For a Doc
+       of a text cleaned by `remove_new_lines_with_offsets`, map them to the
+       original text with `columnar_corpus.original_offsets`.
+    """
+    token_offsets = sentence_token_offsets(doc)
+    if not len(token_offsets):
+        return token_offsets
+    # the text of a Doc is its tokens and their trailing whitespace, so the
+    # character offset of a token is the sum of those before it
+    columns = doc.to_array([LENGTH, SPACY]).astype(numpy.int64)
+    token_starts = numpy.zeros(len(doc), dtype=numpy.int64)
+    numpy.cumsum(columns[:-1, 0] + columns[:-1, 1], out=token_starts[1:])
+    last_tokens = token_offsets[:, 1] - 1
+    offsets = numpy.empty_like(token_offsets)
+    offsets[:, 0] = token_starts[token_offsets[:, 0]]
+    offsets[:, 1] = token_starts[last_tokens] + columns[last_tokens, 0]
+    return offsets
+
+def docs_sentence_offsets(docs, unit="token"):
+    """Returns the sentence offsets of many Docs at once, as one int32 array of
+       shape (sentences, 2) and an int64 array with the index of the first row
+       of each Doc, followed by the number of rows, so that the sentences of
+       the i-th Doc are offsets[doc_starts[i]:doc_starts[i + 1]].
+
+    @param docs: an iterable of processed Docs, e.g. from `nlp.pipe`
+    @param unit: "token" for `sentence_token_offsets` or "char" for
+                 `sentence_char_offsets`
+    """
+    if unit not in ("token", "char"):
+        raise ValueError("Unknown unit {!r}, expected 'token' or 'char'".format(unit))
+    function = sentence_token_offsets if unit == "token" else sentence_char_offsets
+    arrays = [function(doc) for doc in docs]
+    doc_starts = numpy.zeros(len(arrays) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(array) for array in arrays], out=doc_starts[1:])
+    if not arrays:
+        return numpy.zeros((0, 2), dtype=numpy.int32), doc_starts
+    return numpy.concatenate(arrays), doc_starts
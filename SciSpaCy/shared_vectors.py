@@ -0,0 +1,48 @@
+import os
+
+import numpy
+from spacy.util import get_lang_class
+
+# the file in a model directory that holds the vectors table when it is kept out
+# of the vocab, saved with numpy.save so that it can be memory mapped
+VECTORS_FILE_NAME = "vectors.npy"
+
+def separate_vectors(model_path):
+    """Moves the vectors table of a model saved with `nlp.to_disk` out of its
+       vocab directory, so that loading the vocab only reads the keys of the
+       vectors and `load_shared_vocab` can memory map the table instead.
+       Returns whether the model had a vectors table.
+
+    @param model_path: the model directory
+    """
+    vocab_vectors_path = os.path.join(str(model_path), "vocab", "vectors")
+    if not os.path.exists(vocab_vectors_path):
+        return False
+    os.replace(vocab_vectors_path, os.path.join(str(model_path), VECTORS_FILE_NAME))
+    return True
+
+def load_shared_vocab(model_path, meta, mmap=True):
+    """Creates the vocab of a model directory whose vectors were moved out of
+       the vocab with `separate_vectors`, with the vectors table already set,
+       or returns None if the model has no separate vectors table.
+
+       The vocab has to be passed to `spacy.util.load_model_from_path` as
+       vocab=, so that the components that use the vectors, such as the
+       tagger or parser, find the table when they are read from disk.
+
+    @param model_path: the model directory
+    @param meta: the meta of the model
+    @param mmap: whether to memory map the table read only. The mapped pages
+                 are shared through the page cache by every process that
+                 loads the model, so the table is not copied into each of them.
+                 Otherwise the table is read into memory, like spaCy does.
+    """
+    vectors_path = os.path.join(str(model_path), VECTORS_FILE_NAME)
+    if not os.path.exists(vectors_path):
+        return None
+    # the vocab Language creates for the model's meta, which nlp.from_disk
+    # fills in from the vocab directory without replacing the table set here
+    vocab = get_lang_class(meta["lang"]).Defaults.create_vocab()
+    vocab.vectors.data = numpy.load(vectors_path, mmap_mode="r" if mmap else None)
+    vocab.vectors.name = meta.get("vectors", {}).get("name")
+    return vocab
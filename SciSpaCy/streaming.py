@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from custom_tokenizer import remove_new_lines_with_offsets # pylint: disable-msg=E0611,E0401
+
+def safe_cut(text, start, end):
+    """Returns the last offset in (start, end] at which a window of text can end
+       without splitting a token or a word broken across lines, i.e. the first
+       non whitespace character after whitespace that does not follow a
+       hyphen. The whitespace stays at the end of the window, so the next
+       window starts at a token, as it would in the whole text. If there is
+       none, the window is cut at end.
+
+    @param text: the text to cut
+    @param start: the offset the window starts at
+    @param end: the offset the window can extend to, which must be < len(text)
+    """
+    for i in range(end, start, -1):
+        if text[i - 1].isspace() and not text[i].isspace():
+            whitespace_start = i - 1
+            while whitespace_start > start and text[whitespace_start - 1].isspace():
+                whitespace_start -= 1
+            if whitespace_start > start and text[whitespace_start - 1] != "-":
+                return i
+    return end
+
+def stream_sentences(nlp, text, window_size=100000, overlap=1000):
+    """Processes a long text in windows of at most `window_size` characters and
+       yields its sentences in order, so that memory use depends on the window
+       size rather than on the length of the text. Each window is passed
+       through `remove_new_lines` and the pipeline on its own. The sentences
+       near the end of a window, whose boundaries may depend on text that was
+       cut off, are held back and processed again at the start of the next
+       window.
+
+       Each sentence is a dict with the [start, end) character offsets of the
+       sentence, the token texts and the [start, end) character offsets of the
+       tokens, all in the original text.
+
+    @param nlp: the pipeline to process the windows with, e.g. from
+                `util.create_combined_rule_model()`
+    @param text: the raw text, or an iterable of consecutive pieces of it such
+                 as a file opened in text mode
+    @param window_size: the maximum number of characters in a window, which
+                        must not exceed nlp.max_length
+    @param overlap: sentences ending within this many characters of the end of
+                    a window are held back for the next window, unless there
+                    is no other sentence to emit
+    """
+    pieces = iter([text] if isinstance(text, str) else text)
+    buffer = ""
+    # the offset of buffer[0] in the original text
+    buffer_start = 0
+    position = 0
+    exhausted = False
+    while True:
+        if not exhausted and len(buffer) - position <= window_size:
+            # keep one character past the window so that safe_cut can look at it
+            pending = [buffer[position:]]
+            size = len(pending[0])
+            while size <= window_size:
+                piece = next(pieces, None)
+                if piece is None:
+                    exhausted = True
+                    break
+                pending.append(piece)
+                size += len(piece)
+            buffer_start += position
+            buffer = "".join(pending)
+            position = 0
+
+        # windows start at a token, so whitespace at their start, such as
+        # the new lines between paragraphs, is tokenized as in the whole text
+        if position == len(buffer):
+            return
+
+        end = position + window_size
+        last_window = end >= len(buffer)
+        if last_window:
+            end = len(buffer)
+        else:
+            end = safe_cut(buffer, position, end)
+
+        cleaned, offsets = remove_new_lines_with_offsets(buffer[position:end])
+        doc = nlp(cleaned)
+        sentences = list(doc.sents)
+        next_position = end
+        if not last_window and len(sentences) > 1:
+            n_emitted = len(sentences) - 1
+            while n_emitted > 1 and sentences[n_emitted - 1].end_char > len(cleaned) - overlap:
+                n_emitted -= 1
+            next_position = position + offsets.to_original(sentences[n_emitted].start_char)
+            sentences = sentences[:n_emitted]
+
+        window_start = buffer_start + position
+        for sentence in sentences:
+            token_offsets = [[window_start + offsets.to_original(token.idx),
+                              window_start + offsets.to_original(token.idx + len(token) - 1) + 1]
+                             for token in sentence]
+            yield {"start": token_offsets[0][0],
+                   "end": token_offsets[-1][1],
+                   "tokens": [token.text for token in sentence],
+                   "token_offsets": token_offsets}
+        position = next_position
@@ -0,0 +1,73 @@
+import random
+
+# building blocks for synthetic scientific text, chosen to exercise the
+# custom tokenization and segmentation rules
+SUBJECTS = ["The model", "Our method", "This approach", "The protein", "The LSTM network",
+            "Each neuron", "The repressor", "The Tree-LSTM", "A fluorescent reporter", "The cascade"]
+VERBS = ["increases", "reduces", "activates", "depends on", "is applied to", "is compared with",
+         "fits", "regulates", "controls", "outperforms"]
+OBJECTS = ["the cGMP-dependent protein", "phorbol 12-myristate 13-acetate", "the [Ca2+]i response",
+           "pyrilamine[3H] binding", "the (TRAP)-positive genes", "the bag-of-words model",
+           "a 28×28 image", "the Gq/11 protein", "the camera(s) and manipulator(s)",
+           "the hidden layers of C(j)", "the neurons’ activation", "the expression of cI-yfp"]
+MODIFIERS = ["by 83.40% on MNIST", "at 37 °C", "with 5mg of substrate", "in 10 ms", "after 3h",
+             "in H3G cells", "as shown in Fig. 1D", "as described in Sec. 2", "using Eqs. 2–8",
+             "(Fig. 3A and Table 1)", "(Lee et al., 2008)", "[9]",
+             "(Bahdanau et al., 2014; Sutskever et al., 2014)",
+             "(e.g., “cats climb trees” vs. “trees climb cats”)", "under condition (A)", "for no. 4"]
+HEADERS = ["Introduction", "Related Work", "Long Short-Term Memory Networks", "Overview",
+           "Experimental Setup", "Results", "Discussion"]
+
+def generate_sentence(rng):
+    """Generates a single synthetic scientific sentence.
+
+    @param rng: a random.Random instance
+    """
+    words = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS)]
+    words.extend(rng.sample(MODIFIERS, rng.randint(0, 3)))
+    if rng.random() < 0.3:
+        words.append("and " + rng.choice(VERBS) + " " + rng.choice(OBJECTS))
+    sentence = " ".join(words) + "."
+    if rng.random() < 0.1:
+        sentence = "(" + sentence + ")"
+    return sentence
+
+def hyphenate_line_breaks(rng, text, rate=0.02):
+    """Breaks some words across lines the way PDF extraction does, e.g.
+       "neu-\\nrons", for `remove_new_lines` to undo.
+    """
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        if len(word) > 6 and word.isalpha() and rng.random() < rate:
+            split = rng.randint(2, len(word) - 2)
+            words[i] = word[:split] + rng.choice(["-\n", "-\n\n", "- \n"]) + word[split:]
+    return " ".join(words)
+
+def generate_document(rng, n_paragraphs=5, sentences_per_paragraph=6):
+    """Generates a synthetic paper with numbered section headers separated by
+       double new lines, paragraphs of scientific sentences and words broken
+       across lines.
+
+    @param rng: a random.Random instance
+    @param n_paragraphs: the number of paragraphs in the document
+    @param sentences_per_paragraph: the average number of sentences in a paragraph
+    """
+    parts = []
+    for i in range(n_paragraphs):
+        if i == 0 or rng.random() < 0.3:
+            parts.append("{} {}".format(i + 1, rng.choice(HEADERS)))
+        n_sentences = max(1, rng.randint(sentences_per_paragraph // 2, sentences_per_paragraph * 3 // 2))
+        paragraph = " ".join(generate_sentence(rng) for _ in range(n_sentences))
+        parts.append(hyphenate_line_breaks(rng, paragraph))
+    return "\n\n".join(parts)
+
+def generate_corpus(n_docs, seed=0, n_paragraphs=5, sentences_per_paragraph=6):
+    """Generates a reproducible list of synthetic scientific documents. The same
+       arguments always produce the same corpus, so benchmark results can be
+       compared between commits.
+
+    @param n_docs: the number of documents to generate
+    @param seed: the random seed
+    """
+    rng = random.Random(seed)
+    return [generate_document(rng, n_paragraphs, sentences_per_paragraph) for _ in range(n_docs)]
@@ -0,0 +1,102 @@
+import json
+from collections import Counter
+
+import sys
+import os
+
+from spacy.util import minibatch
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+
+from custom_tokenizer import remove_new_lines # pylint: disable-msg=E0611,E0401
+
+# the file in a model directory that holds the chunks to warm the tokenizer up with
+WARMUP_FILE_NAME = "tokenizer_warmup.json"
+
+def mine_frequent_chunks(texts, max_chunks=100000, min_count=2):
+    """Counts the whitespace delimited chunks of a corpus, which are the units the
+       spaCy tokenizer caches its tokenization of, and returns the most frequent
+       ones as (chunk, count) pairs.
+
+    @param texts: an iterable of raw texts, preprocessed with `remove_new_lines`
+    @param max_chunks: the maximum number of chunks to return
+    @param min_count: the minimum number of occurrences of a returned chunk
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(remove_new_lines(text).split())
+    return [(chunk, count) for chunk, count in counts.most_common(max_chunks) if count >= min_count]
+
+def warm_up_tokenizer(tokenizer, chunks, batch_size=1000):
+    """Tokenizes each chunk once, which fills the tokenizer's cache with their
+       tokenization and adds their strings and lexemes to the vocab. Chunks that
+       involve a special case are never cached by spaCy, so they only add
+       lexemes.
+
+    @param tokenizer: the tokenizer to warm up
+    @param chunks: an iterable of chunks, or of (chunk, count) pairs
+    @param batch_size: the number of chunks tokenized per call to the tokenizer
+    """
+    chunks = (chunk if isinstance(chunk, str) else chunk[0] for chunk in chunks)
+    n_chunks = 0
+    for batch in minibatch(chunks, size=batch_size):
+        # chunks are separated by single spaces, so each one is tokenized and cached on its own
+        tokenizer(" ".join(batch))
+        n_chunks += len(batch)
+    return n_chunks
+
+def cache_hit_rate(texts, warm_chunks=()):
+    """Estimates how often the tokenizer's cache is hit on a corpus. This is a
+       simulation on the chunks of the texts, not a measurement of a tokenizer:
+       every chunk that was warmed up or has been seen before in the corpus
+       counts as a hit, as the tokenizer caches each chunk the first time it
+       tokenizes it. Chunks involving special cases, which spaCy never caches,
+       count as hits too, so the estimate is an upper bound.
+
+       Returns a dict with the number of chunks, the estimated hits, the hits
+       that are only due to warming up and the estimated hit rates.
+
+    @param texts: an iterable of raw texts
+    @param warm_chunks: the chunks the tokenizer was warmed up with
+    """
+    warm = set(chunk if isinstance(chunk, str) else chunk[0] for chunk in warm_chunks)
+    seen = set()
+    n_chunks = 0
+    hits = 0
+    warm_hits = 0
+    for text in texts:
+        for chunk in remove_new_lines(text).split():
+            n_chunks += 1
+            if chunk in seen:
+                hits += 1
+            elif chunk in warm:
+                hits += 1
+                warm_hits += 1
+            seen.add(chunk)
+    return {"chunks": n_chunks,
+            "hits": hits,
+            "warm_hits": warm_hits,
+            "hit_rate": hits / n_chunks if n_chunks else 0.0,
+            "cold_hit_rate": (hits - warm_hits) / n_chunks if n_chunks else 0.0}
+
+def save_warmup(model_path, chunks):
+    """Saves the chunks to warm the tokenizer up with alongside a saved model.
+
+    @param model_path: the model directory
+    @param chunks: a list of (chunk, count) pairs or chunks
+    """
+    chunks = [list(chunk) if not isinstance(chunk, str) else [chunk, 0] for chunk in chunks]
+    with open(os.path.join(str(model_path), WARMUP_FILE_NAME), "w", encoding="utf-8") as warmup_file:
+        json.dump(chunks, warmup_file, ensure_ascii=False)
+
+def load_warmup(model_path):
+    """Loads the (chunk, count) pairs saved with `save_warmup`, or an empty list
+       if the model has none.
+
+    @param model_path: the model directory
+    """
+    warmup_path = os.path.join(str(model_path), WARMUP_FILE_NAME)
+    if not os.path.exists(warmup_path):
+        return []
+    with open(warmup_path, encoding="utf-8") as warmup_file:
+        return [(chunk, count) for chunk, count in json.load(warmup_file)]
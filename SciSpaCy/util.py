@@ -1,13 +1,130 @@
 import spacy
+from spacy.lang.en import English
 
-from custom_sentence_segmenter import combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
-from custom_tokenizer import combined_rule_tokenizer # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import combined_rule_tokenizer, load_tokenizer_artifact # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import add_abbreviation_exceptions # pylint: disable-msg=E0611,E0401
+from abbreviations import DEFAULT_ABBREVIATIONS, read_abbreviations # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import warm_up_tokenizer, save_warmup # pylint: disable-msg=E0611,E0401
+from columnar_corpus import write_corpus, read_corpus # pylint: disable-msg=E0611,E0401
+from shared_vectors import separate_vectors # pylint: disable-msg=E0611,E0401
+from blob_store import store_blobs # pylint: disable-msg=E0611,E0401
 
-def save_model(nlp, output_path):
+def save_model(nlp, output_path, warmup_chunks=None, shared_vectors=False, blob_store=None, compression=None):
+    """Saves a pipeline to a model directory.
+
+    @param nlp: the pipeline to save
+    @param output_path: the model directory
+    @param warmup_chunks: optional (chunk, count) pairs from
+                          `tokenizer_cache.mine_frequent_chunks`. Their strings
+                          and lexemes are added to the saved vocab, and they are
+                          saved so that `preloaded_pool.PreloadedPool` warms the
+                          tokenizer cache up with them before forking workers.
+    @param shared_vectors: whether to keep the vectors table out of the vocab,
+                           so that the packaged model memory maps it and every
+                           process that loads the model shares one copy, see
+                           `shared_vectors.load_shared_vocab`
+    @param blob_store: optional directory of a content addressed blob store to
+                       move the model's files into, see `blob_store.store_blobs`.
+                       Models saved to the same store share the files they have
+                       in common, and a store inside output_path keeps the model
+                       self contained for packaging.
+    @param compression: None, "gzip", "lz4" or "zstd" to compress the blobs with
+    """
+    if compression is not None and blob_store is None:
+        raise ValueError("Only models saved to a blob store can be compressed")
+    if warmup_chunks:
+        warm_up_tokenizer(nlp.tokenizer, warmup_chunks)
     nlp.to_disk(output_path)
+    if warmup_chunks:
+        save_warmup(output_path, warmup_chunks)
+    if shared_vectors:
+        separate_vectors(output_path)
+    if blob_store is not None:
+        store_blobs(output_path, blob_store, compression)
+
+def save_corpus(nlp, documents, output_path, shard_size=10000):
+    """Processes (id, text) pairs and saves their tokens, token offsets and
+       sentence boundaries in the columnar format of `columnar_corpus`, which
+       is much smaller and faster to read than pickled Docs or JSON. Returns
+       the number of shards written.
+
+    @param nlp: the pipeline to process the texts with
+    @param documents: an iterable of (id, text) pairs
+    @param output_path: the directory to write the shards to
+    @param shard_size: the maximum number of documents in a shard
+    """
+    return write_corpus(nlp, documents, output_path, shard_size)
+
+def load_corpus(corpus_path, mmap=True):
+    """Opens the shards of a corpus saved with `save_corpus`, as a list of
+       `columnar_corpus.CorpusShard`s whose columns are memory mapped.
+    """
+    return read_corpus(corpus_path, mmap)
+
+def add_abbreviations(nlp, abbreviations, index=None):
+    """Extends the abbreviations shared by the tokenizer and the sentence
+       segmenter of a combined rule pipeline, e.g. with domain abbreviations
+       such as "approx.", "resp.", "cf." or "ca.". Only this pipeline is
+       changed, as `DEFAULT_ABBREVIATIONS` itself is never extended.
+
+    @param nlp: a pipeline with the combined rule tokenizer
+    @param abbreviations: an iterable of abbreviations, or the path of a file
+                          with one abbreviation per line
+    @param index: the `AbbreviationIndex` the pipeline uses, by default the
+                  one of its sentence segmenter
+    """
+    if index is None:
+        indices = [component.abbreviations for _, component in nlp.pipeline if hasattr(component, "abbreviations")]
+        if not indices:
+            raise ValueError("The pipeline has no sentence segmenter with abbreviations, pass its index instead.")
+        index = indices[0]
+    if index is DEFAULT_ABBREVIATIONS:
+        raise ValueError("DEFAULT_ABBREVIATIONS is shared by all pipelines and can not be extended, "
+                         "create the pipeline with a copy of it instead.")
+    if isinstance(abbreviations, str):
+        abbreviations = read_abbreviations(abbreviations)
+    added = index.update(abbreviations)
+    add_abbreviation_exceptions(nlp.tokenizer, added)
+    return added
+
+def create_combined_rule_model(tokenizer_artifact=None, model='en_core_web_sm'):
+    """Creates the full pipeline, with the combined rule tokenizer and
+       sentence segmenter added to a statistical spaCy model.
+
+    @param tokenizer_artifact: a path to a saved tokenizer artifact to load
+                               instead of building the tokenizer
+    @param model: the name or path of the spaCy model to start from
+    """
+    nlp = spacy.load(model)
+    abbreviations = DEFAULT_ABBREVIATIONS.copy()
+    if tokenizer_artifact is not None:
+        nlp.tokenizer = load_tokenizer_artifact(nlp, tokenizer_artifact)
+    else:
+        nlp.tokenizer = combined_rule_tokenizer(nlp, abbreviations)
+    nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp, abbreviations=abbreviations), first=True)
+    return nlp
+
+def create_combined_rule_segmentation_model(model=None, tokenizer_artifact=None):
+    """Creates a pipeline that only tokenizes and segments sentences with the
+       combined rules. Without a parser to propose sentence boundaries, the
+       segmenter proposes them itself. By default it starts from a blank
+       English pipeline, so no statistical model is loaded at all.
 
-def create_combined_rule_model():
-    nlp = spacy.load('en_core_web_sm')
-    nlp.tokenizer = combined_rule_tokenizer(nlp)
-    nlp.add_pipe(combined_rule_sentence_segmenter, first=True)
+    @param model: the name or path of a spaCy model to take the vocab from,
+                  loaded without its tagger, parser and NER
+    @param tokenizer_artifact: a path to a saved tokenizer artifact to load
+                               instead of building the tokenizer
+    """
+    if model is None:
+        nlp = English()
+    else:
+        nlp = spacy.load(model, disable=['tagger', 'parser', 'ner'])
+    abbreviations = DEFAULT_ABBREVIATIONS.copy()
+    if tokenizer_artifact is not None:
+        nlp.tokenizer = load_tokenizer_artifact(nlp, tokenizer_artifact)
+    else:
+        nlp.tokenizer = combined_rule_tokenizer(nlp, abbreviations)
+    nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp, propose_boundaries=True, abbreviations=abbreviations),
+                 first=True)
     return nlp
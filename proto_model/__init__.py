@@ -2,14 +2,50 @@ from __future__ import unicode_literals
 
 from pathlib import Path
 from spacy.language import Language
-from spacy.util import load_model_from_init_py, get_model_meta
+from spacy.util import load_model_from_path, get_model_meta
 
-from SciSpaCy.custom_sentence_segmenter import combined_rule_sentence_segmenter
+from SciSpaCy.custom_sentence_segmenter import CombinedRuleSentenceSegmenter
+from SciSpaCy.tokenizer_cache import load_warmup, warm_up_tokenizer
+from SciSpaCy.shared_vectors import load_shared_vocab
+from SciSpaCy.lazy_components import make_components_lazy
+from SciSpaCy.blob_store import resolve_blobs
 
 __version__ = get_model_meta(Path(__file__).parent)['version']
 
 
-def load(**overrides):
-    Language.factories['combined_rule_sentence_segmenter'] = lambda nlp, **cfg: combined_rule_sentence_segmenter
-    nlp = load_model_from_init_py(__file__, **overrides)
-    return nlp
\ No newline at end of file
+def data_path():
+    # the same data directory load_model_from_init_py loads the model from
+    meta = get_model_meta(Path(__file__).parent)
+    return Path(__file__).parent / ('%s_%s-%s' % (meta['lang'], meta['name'], meta['version']))
+
+
+def load(mmap_vectors=True, components=None, lazy=False, blob_cache=None, warm_up=False, **overrides):
+    Language.factories[CombinedRuleSentenceSegmenter.name] = CombinedRuleSentenceSegmenter
+    meta = get_model_meta(Path(__file__).parent)
+    # a model saved with save_model(..., blob_store=...) has its files recreated
+    # from the blobs on first load, in a directory of blob_cache named after the
+    # model's version if the package is read only
+    target_path = None if blob_cache is None else Path(blob_cache) / data_path().name
+    model_path = Path(resolve_blobs(data_path(), target_path))
+    pipeline = meta.get('pipeline') or []
+    disable = list(overrides.pop('disable', []))
+    # components that are not asked for are never created or read from disk
+    if components is not None:
+        disable.extend(name for name in pipeline if name not in components and name not in disable)
+    # with lazy=True, the components with weights are only read from disk when first used
+    lazy_components = []
+    if lazy:
+        lazy_components = [name for name in pipeline
+                           if name not in disable and (model_path / name).exists()]
+    # a vectors table saved with save_model(..., shared_vectors=True) is memory
+    # mapped unless mmap_vectors=False, so worker processes share its pages
+    vocab = load_shared_vocab(model_path, meta, mmap=mmap_vectors)
+    if vocab is not None:
+        overrides['vocab'] = vocab
+    nlp = load_model_from_path(model_path, meta, disable=disable + lazy_components, **overrides)
+    make_components_lazy(nlp, model_path, meta, lazy_components)
+    # tokenizing the saved warm up chunks takes seconds, so it is only done when
+    # asked for, e.g. once by preloaded_pool.PreloadedPool before it forks workers
+    if warm_up:
+        warm_up_tokenizer(nlp.tokenizer, load_warmup(model_path))
+    return nlp
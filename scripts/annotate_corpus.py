@@ -0,0 +1,53 @@
+"""Annotates a corpus with tokens and sentences using the combined rule model,
+spread over several worker processes that each load the model once.
+
+    python scripts/annotate_corpus.py abstracts.jsonl annotated.jsonl --workers 8
+
+Each output line is a JSON object with the document id, its tokens, the
+character offsets of the tokens in the original text and the token ranges of
+its sentences.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from corpus_annotation import annotate_corpus # pylint: disable-msg=E0611,E0401
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_path", help="the corpus to annotate")
+    parser.add_argument("output_path", help="the JSON lines file to write the annotations to")
+    parser.add_argument("--format", choices=["jsonl", "text"], default="jsonl",
+                        help="jsonl for one JSON object per line, text for one document per line")
+    parser.add_argument("--text-field", default="text", help="the field holding the text in jsonl input")
+    parser.add_argument("--id-field", default="id", help="the field holding the document id in jsonl input")
+    parser.add_argument("--model", default="combined_rule",
+                        help="combined_rule for util.create_combined_rule_model(), combined_rule_segmentation "
+                             "to only tokenize and segment, or a spaCy model name or path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="the number of documents per worker task")
+    parser.add_argument("--window-size", type=int, default=100000,
+                        help="documents longer than this many characters are annotated in windows")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="the number of annotations each worker caches, so duplicated texts are "
+                             "annotated once, 0 to disable caching")
+    args = parser.parse_args()
+
+    stats = annotate_corpus(args.input_path,
+                            args.output_path,
+                            model=args.model,
+                            n_workers=args.workers,
+                            batch_size=args.batch_size,
+                            input_format=args.format,
+                            text_field=args.text_field,
+                            id_field=args.id_field,
+                            window_size=args.window_size,
+                            cache_size=args.cache_size)
+    print("annotated {docs} docs with {tokens} tokens in {seconds:.1f}s: "
+          "{docs_per_second:.1f} docs/sec, {tokens_per_second:.1f} tokens/sec, "
+          "{cache_hits} texts or paragraphs from cache".format(**stats), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compares tokenizing texts one Doc at a time, `[tokenizer(text) for text in texts]`,
+with `batch_tokenizer.BatchTokenizer`, which returns flat arrays of token
+offsets without creating Docs, on a reproducible synthetic corpus.
+
+    python scripts/benchmark_batch_tokenizer.py --docs 2000 --batch-size 256
+
+Both are timed with warm caches, after tokenizing the corpus once, as in a
+long running indexing job. The first, cold pass of the batch tokenizer, which
+tokenizes every chunk it has not seen with the spaCy tokenizer, is reported too.
+"""
+import argparse
+import os
+import sys
+import time
+
+import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from batch_tokenizer import BatchTokenizer # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import combined_rule_tokenizer, remove_new_lines # pylint: disable-msg=E0611,E0401
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+
+def batches(texts, batch_size):
+    return [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+def best_time(function, trials):
+    timings = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def check_offsets(tokenizer, batch_tokenizer, texts):
+    starts, ends, _, text_starts = batch_tokenizer(texts)
+    for i, text in enumerate(texts):
+        expected = [[token.idx, token.idx + len(token)] for token in tokenizer(text)]
+        found = [[int(start), int(end)] for start, end in zip(starts[text_starts[i]:text_starts[i + 1]],
+                                                               ends[text_starts[i]:text_starts[i + 1]])]
+        if found != expected:
+            sys.exit("The batch tokenizer does not match the tokenizer on document {}".format(i))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="en_core_web_sm", help="the spaCy model to build the tokenizer for")
+    parser.add_argument("--docs", type=int, default=1000, help="the number of synthetic documents")
+    parser.add_argument("--batch-size", type=int, default=256, help="the number of texts per batch")
+    parser.add_argument("--trials", type=int, default=5, help="the number of timed passes over the corpus")
+    args = parser.parse_args()
+
+    tokenizer = combined_rule_tokenizer(spacy.load(args.model))
+    texts = [remove_new_lines(text) for text in generate_corpus(args.docs)]
+    text_batches = batches(texts, args.batch_size)
+    batch_tokenizer = BatchTokenizer(tokenizer)
+
+    start = time.perf_counter()
+    for batch in text_batches:
+        batch_tokenizer(batch)
+    cold_seconds = time.perf_counter() - start
+    check_offsets(tokenizer, batch_tokenizer, texts)
+
+    n_tokens = sum(len(tokenizer(text)) for text in texts)
+    doc_seconds = best_time(lambda: [tokenizer(text) for text in texts], args.trials)
+    batch_seconds = best_time(lambda: [batch_tokenizer(batch) for batch in text_batches], args.trials)
+
+    print("{} documents, {} tokens".format(len(texts), n_tokens))
+    for name, seconds in (("tokenizer(text)", doc_seconds), ("batch, cold", cold_seconds),
+                          ("batch, warm", batch_seconds)):
+        print("{:>16}: {:.3f}s  {:,.0f} tokens/sec".format(name, seconds, n_tokens / seconds))
+    print("speedup: {:.1f}x".format(doc_seconds / batch_seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measures the per worker memory of loading a packaged SciSpaCy model in many
+processes at once, with the vectors table memory mapped and read into memory.
+
+    python scripts/benchmark_model_loading.py en_scispacy_core_web_sm --workers 8
+
+Every worker loads the model in a fresh process and stays alive until all of
+them have loaded it. RSS counts pages shared with other workers in full, while
+PSS (proportional set size) divides them between the processes sharing them, so
+the sum of PSS is what the workers cost together. The memory mapped table only
+shows up in PSS once, however many workers map it. Reading /proc/self/smaps_rollup
+requires Linux.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import spacy
+
+MODES = ["mmap", "in_memory"]
+
+def memory_mb():
+    """Returns the RSS, PSS, shared and private memory of this process in MB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss_mb": fields["Rss"],
+            "pss_mb": fields["Pss"],
+            "shared_mb": fields["Shared_Clean"] + fields["Shared_Dirty"],
+            "private_mb": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+def child(model, mode):
+    start = time.perf_counter()
+    nlp = spacy.load(model, mmap_vectors=mode == "mmap")
+    load_seconds = time.perf_counter() - start
+    # touch every row, as a worker serving similarity queries eventually would
+    nlp.vocab.vectors.data.sum()
+    print(json.dumps({"load_seconds": load_seconds, "vectors_mb": nlp.vocab.vectors.data.nbytes / 2 ** 20}),
+          flush=True)
+    # PSS depends on how many processes share a page, so memory is measured
+    # when the parent says that every worker has loaded the model
+    sys.stdin.readline()
+    print(json.dumps(memory_mb()), flush=True)
+    sys.stdin.read()
+
+def measure(model, mode, n_workers):
+    workers = [subprocess.Popen([sys.executable, __file__, model, "--child", mode],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+               for _ in range(n_workers)]
+    results = [json.loads(worker.stdout.readline().decode("utf-8")) for worker in workers]
+    for worker, result in zip(workers, results):
+        worker.stdin.write(b"measure\n")
+        worker.stdin.flush()
+        result.update(json.loads(worker.stdout.readline().decode("utf-8")))
+    for worker in workers:
+        worker.stdin.close()
+        worker.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="the name of an installed model package saved with shared vectors")
+    parser.add_argument("--workers", type=int, default=4, help="the number of worker processes")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.model, args.child)
+        return
+
+    print("{:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>12}".format("mode", "load s", "vectors MB", "RSS MB",
+                                                                    "PSS MB", "private MB", "total PSS MB"))
+    for mode in MODES:
+        results = measure(args.model, mode, args.workers)
+        mean = lambda key, results=results: sum(result[key] for result in results) / len(results)
+        print("{:>10} {:>10.2f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>12.1f}".format(
+            mode, mean("load_seconds"), mean("vectors_mb"), mean("rss_mb"), mean("pss_mb"), mean("private_mb"),
+            sum(result["pss_mb"] for result in results)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compares the disk footprint and load time of model variants saved with a plain
+`nlp.to_disk` with those saved to a shared content addressed blob store, with
+each available compression.
+
+    python scripts/benchmark_model_serialization.py en_core_web_sm en_core_web_md --trials 5
+
+Every base model is turned into the full combined rule pipeline and saved once
+per mode. The footprint is that of all the variants together, with a blob
+store counted once. The first load of a blob store model recreates its files
+from the blobs, later loads find them in place.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import spacy
+from spacy.language import Language
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from util import create_combined_rule_model, save_model # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from blob_store import COMPRESSIONS, get_codec, resolve_blobs, disk_usage # pylint: disable-msg=E0611,E0401
+
+def available_compressions():
+    compressions = [None]
+    for compression in COMPRESSIONS:
+        try:
+            get_codec(compression)
+            compressions.append(compression)
+        except ImportError:
+            print("skipping {}, which is not installed".format(compression))
+    return compressions
+
+def time_load(model_path, target_path=None):
+    start = time.perf_counter()
+    spacy.load(resolve_blobs(model_path, target_path))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="+", help="the spaCy models to build the variants from")
+    parser.add_argument("--trials", type=int, default=5, help="the number of timed loads after the first")
+    args = parser.parse_args()
+
+    Language.factories[CombinedRuleSentenceSegmenter.name] = CombinedRuleSentenceSegmenter
+    pipelines = [(model, create_combined_rule_model(model=model)) for model in args.models]
+    modes = [("to_disk", None, None)] + [("blobs " + (compression or "raw"), "blobs", compression)
+                                         for compression in available_compressions()]
+
+    print("{:<12} {:>10} {:>12} {:>16} {:>15}".format("mode", "disk MB", "save seconds",
+                                                       "first load secs", "load secs"))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mode, store_name, compression in modes:
+            mode_path = os.path.join(temp_dir, mode.replace(" ", "_"))
+            store_path = os.path.join(mode_path, store_name) if store_name else None
+            start = time.perf_counter()
+            model_paths = []
+            for model, nlp in pipelines:
+                model_paths.append(os.path.join(mode_path, model))
+                save_model(nlp, model_paths[-1], blob_store=store_path, compression=compression)
+            save_seconds = time.perf_counter() - start
+            footprint = disk_usage([mode_path])
+
+            # compressed blobs are recreated outside the store, as a read only
+            # package would be with blob_cache
+            targets = [path + "_resolved" if compression else None for path in model_paths]
+            first_load = sum(time_load(path, target) for path, target in zip(model_paths, targets))
+            loads = [sum(time_load(path, target) for path, target in zip(model_paths, targets))
+                     for _ in range(args.trials)]
+            print("{:<12} {:>10.1f} {:>12.2f} {:>16.2f} {:>15.2f}".format(
+                mode, footprint / 2**20, save_seconds, first_load, min(loads)))
+            shutil.rmtree(mode_path)
+
+if __name__ == "__main__":
+    main()
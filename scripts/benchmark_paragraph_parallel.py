@@ -0,0 +1,53 @@
+"""Compares the latency of processing long single documents with the combined
+rule segmentation pipeline, `nlp(text)`, with
+`paragraph_parallel.ParagraphParallelPipeline`, which splits them at paragraph
+breaks and processes the paragraphs in worker processes.
+
+    python scripts/benchmark_paragraph_parallel.py --workers 4 --docs 5 --paragraphs 400
+
+The documents are synthetic, and the sentences and token offsets of both are
+checked to be the same.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from corpus_annotation import load_model # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import remove_new_lines # pylint: disable-msg=E0611,E0401
+from paragraph_parallel import ParagraphParallelPipeline # pylint: disable-msg=E0611,E0401
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+
+def offsets(doc):
+    return ([(token.idx, len(token)) for token in doc],
+            [(sent.start_char, sent.end_char) for sent in doc.sents])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="combined_rule_segmentation",
+                        help="the model to load, see corpus_annotation.load_model")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the number of worker processes")
+    parser.add_argument("--docs", type=int, default=5, help="the number of long synthetic documents")
+    parser.add_argument("--paragraphs", type=int, default=400, help="the number of paragraphs per document")
+    args = parser.parse_args()
+
+    texts = [remove_new_lines(text) for text in generate_corpus(args.docs, n_paragraphs=args.paragraphs)]
+    nlp = load_model(args.model)
+    with ParagraphParallelPipeline(nlp, n_workers=args.workers, warmup_texts=texts[:1]) as parallel_nlp:
+        for text in texts:
+            start = time.perf_counter()
+            doc = nlp(text)
+            single_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            parallel_doc = parallel_nlp(text)
+            parallel_seconds = time.perf_counter() - start
+            if offsets(parallel_doc) != offsets(doc):
+                sys.exit("The paragraph parallel pipeline does not match nlp(text)")
+            print("{:,} characters, {:,} tokens: nlp(text) {:.3f}s, {} workers {:.3f}s, speedup {:.1f}x".format(
+                len(text), len(doc), single_seconds, parallel_nlp.n_workers, parallel_seconds,
+                single_seconds / parallel_seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares the startup time, resident memory and throughput of the full combined
+rule pipeline with the tokenize and segment only pipeline. Every pipeline is
+measured in a fresh process so that they do not share memory or caches.
+
+    python scripts/benchmark_segmentation_model.py --repeats 20
+
+With --package, the packaged model is also loaded eagerly, lazily (components
+are read from disk when first used, which is during the throughput run) and
+with only the sentence segmenter.
+
+    python scripts/benchmark_segmentation_model.py --package en_scispacy_core_web_sm
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from benchmark_segmenter import SAMPLE_TEXT # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import remove_new_lines # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_model # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_segmentation_model # pylint: disable-msg=E0611,E0401
+
+PIPELINES = ["full", "segmentation"]
+PACKAGE_PIPELINES = ["package", "package_lazy", "package_segmentation"]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def load_pipeline(pipeline, package=None):
+    if pipeline == "full":
+        return create_combined_rule_model()
+    if pipeline == "segmentation":
+        return create_combined_rule_segmentation_model()
+    if pipeline == "package":
+        return spacy.load(package)
+    if pipeline == "package_lazy":
+        return spacy.load(package, lazy=True)
+    return spacy.load(package, components=["combined_rule_sentence_segmenter"])
+
+def measure(pipeline, repeats, package=None):
+    start = time.perf_counter()
+    nlp = load_pipeline(pipeline, package)
+    startup = time.perf_counter() - start
+    startup_rss = peak_rss_mb()
+
+    texts = [remove_new_lines(SAMPLE_TEXT)] * repeats
+    start = time.perf_counter()
+    n_tokens = 0
+    n_sents = 0
+    for doc in nlp.pipe(texts):
+        n_tokens += len(doc)
+        n_sents += sum(1 for _ in doc.sents)
+    elapsed = time.perf_counter() - start
+    return {"pipeline": pipeline,
+            "startup_seconds": startup,
+            "startup_rss_mb": startup_rss,
+            "peak_rss_mb": peak_rss_mb(),
+            "tokens_per_second": n_tokens / elapsed,
+            "sentences": n_sents}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=20,
+                        help="the number of copies of the sample text to process")
+    parser.add_argument("--package", help="the name of an installed SciSpaCy model package to also measure")
+    parser.add_argument("--child", choices=PIPELINES + PACKAGE_PIPELINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.repeats, args.package)))
+        return
+
+    print("{:>20} {:>10} {:>12} {:>10} {:>12} {:>10}".format("pipeline", "startup s", "startup MB",
+                                                             "peak MB", "tokens/s", "sentences"))
+    pipelines = PIPELINES + (PACKAGE_PIPELINES if args.package else [])
+    for pipeline in pipelines:
+        command = [sys.executable, os.path.realpath(__file__), "--child", pipeline, "--repeats", str(args.repeats)]
+        if args.package:
+            command += ["--package", args.package]
+        output = subprocess.check_output(command)
+        result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+        print("{pipeline:>20} {startup_seconds:>10.2f} {startup_rss_mb:>12.1f} {peak_rss_mb:>10.1f} "
+              "{tokens_per_second:>12.0f} {sentences:>10}".format(**result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compares the per token cost of the rule based sentence segmenter with the
+vectorized implementation on the same tokenized text.
+
+    python scripts/benchmark_segmenter.py --repeats 200 --trials 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from custom_sentence_segmenter import combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import vectorized_combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import combined_rule_tokenizer, remove_new_lines # pylint: disable-msg=E0611,E0401
+
+SAMPLE_TEXT = ("LSTM networks, which we review in Sec. 2, have been successfully applied to a variety of "
+               "sequence modeling and prediction tasks, notably machine translation (Bahdanau et al., 2014; "
+               "Sutskever et al., 2014), speech recognition (Graves et al., 2013), and program execution "
+               "(Zaremba and Sutskever, 2014). While proprietary environments such as Microsoft Robotics "
+               "Studio [9] and Webots [10] have many commendable attributes, we feel there is no substitute "
+               "for a fully open platform.\n\n2 Long Short-Term Memory Networks\n\n\n\n2.1 Overview\n\n"
+               "This is a sentence. (This is an interjected sentence.) This is also a sentence (e.g., “cats "
+               "climb trees” vs. “trees climb cats”). Hill functions indeed fit the data well (Fig. 3A and "
+               "Table 1).\n\n")
+
+def time_segmenter(tokenizer, segmenter, text, trials):
+    timings = []
+    for _ in range(trials):
+        # segmenting modifies the doc, so every trial gets a freshly tokenized one
+        doc = tokenizer(text)
+        start = time.perf_counter()
+        segmenter(doc)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(doc)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="en_core_web_sm", help="the spaCy model to take the vocab from")
+    parser.add_argument("--repeats", type=int, default=200,
+                        help="how many times the sample text is repeated per doc")
+    parser.add_argument("--trials", type=int, default=5, help="the number of timed runs, the fastest is reported")
+    args = parser.parse_args()
+
+    nlp = spacy.load(args.model)
+    tokenizer = combined_rule_tokenizer(nlp)
+    text = remove_new_lines(SAMPLE_TEXT * args.repeats)
+
+    rules_doc = combined_rule_sentence_segmenter(tokenizer(text))
+    vectorized_doc = vectorized_combined_rule_sentence_segmenter(tokenizer(text))
+    if [t.is_sent_start for t in rules_doc] != [t.is_sent_start for t in vectorized_doc]:
+        sys.exit("The vectorized segmenter does not match the rule based segmenter")
+
+    results = {}
+    for name, segmenter in (("rules", combined_rule_sentence_segmenter),
+                            ("vectorized", vectorized_combined_rule_sentence_segmenter)):
+        elapsed, n_tokens = time_segmenter(tokenizer, segmenter, text, args.trials)
+        results[name] = elapsed
+        print("{:>10}: {:.4f}s for {} tokens, {:.3f} us/token".format(name, elapsed, n_tokens,
+                                                                      elapsed / n_tokens * 1e6))
+    print("speedup: {:.1f}x".format(results["rules"] / results["vectorized"]))
+
+if __name__ == "__main__":
+    main()
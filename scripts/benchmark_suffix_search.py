@@ -0,0 +1,79 @@
+"""Compares the per call cost of the combined rule tokenizer's suffix_search,
+which decides the unit and closing bracket rules without a regex, with the
+single compiled suffix regex it replaces. Both are run on the strings the
+tokenizer passes to suffix_search for a synthetic scientific corpus, and are
+checked to find the same suffixes.
+
+    python scripts/benchmark_suffix_search.py --docs 200 --trials 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import regex
+from spacy.lang.en import English
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from custom_tokenizer import combined_rule_tokenizer, remove_new_lines # pylint: disable-msg=E0611,E0401
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+
+def suffix_search_calls(tokenizer, texts):
+    """Returns the strings the tokenizer calls suffix_search with, by repeating
+       its prefix and suffix splitting on every whitespace delimited chunk.
+       Special cases and token_match are ignored.
+    """
+    calls = []
+    for text in texts:
+        for string in remove_new_lines(text).split():
+            last_size = 0
+            while string and len(string) != last_size:
+                last_size = len(string)
+                prefix = tokenizer.prefix_search(string)
+                if prefix is not None and prefix.end() > 0:
+                    string = string[prefix.end():]
+                if not string:
+                    break
+                calls.append(string)
+                suffix = tokenizer.suffix_search(string)
+                if suffix is not None and suffix.end() > suffix.start():
+                    string = string[:suffix.start()]
+    return calls
+
+def span(match):
+    return None if match is None else (match.start(), match.end())
+
+def time_search(search, calls, trials):
+    best = None
+    for _ in range(trials):
+        start = time.perf_counter()
+        for string in calls:
+            search(string)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(calls)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="the number of synthetic documents")
+    parser.add_argument("--trials", type=int, default=5, help="the number of timed runs, the fastest is reported")
+    args = parser.parse_args()
+
+    tokenizer = combined_rule_tokenizer(English())
+    matcher_search = tokenizer.suffix_search
+    regex_search = regex.compile(matcher_search.__self__.pattern).search
+
+    calls = suffix_search_calls(tokenizer, generate_corpus(args.docs))
+    mismatches = [string for string in calls if span(matcher_search(string)) != span(regex_search(string))]
+    if mismatches:
+        sys.exit("suffix_search differs from the suffix regex on {!r}".format(mismatches[:10]))
+
+    regex_time = time_search(regex_search, calls, args.trials)
+    matcher_time = time_search(matcher_search, calls, args.trials)
+    print("{} suffix_search calls on {} documents".format(len(calls), args.docs))
+    print("suffix regex:   {:.2f} µs per call".format(regex_time * 1e6))
+    print("suffix matcher: {:.2f} µs per call ({:.1f}x)".format(matcher_time * 1e6, regex_time / matcher_time))
+
+if __name__ == "__main__":
+    main()
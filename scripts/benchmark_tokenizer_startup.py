@@ -0,0 +1,64 @@
+"""Compares the time it takes to build the combined rule tokenizer from scratch
+with the time it takes to load it from a precompiled tokenizer artifact.
+
+    python scripts/benchmark_tokenizer_startup.py --trials 10
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import regex
+import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from custom_tokenizer import combined_rule_tokenizer # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import save_tokenizer_artifact, load_tokenizer_artifact # pylint: disable-msg=E0611,E0401
+
+SAMPLE_TEXT = ("activators of cAMP- and cGMP-dependent protein for [Ca2+]i protein "
+               "phorbol 12-myristate 13-acetate, caused almost a 28×28 image (3g) in Fig. 1D.")
+
+def time_trials(function, trials):
+    timings = []
+    for _ in range(trials):
+        # both regex modules cache compiled patterns, which would hide the compilation cost
+        regex.purge()
+        re.purge()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="en_core_web_sm", help="the spaCy model to build the tokenizer for")
+    parser.add_argument("--trials", type=int, default=10, help="the number of timed builds and loads")
+    args = parser.parse_args()
+
+    nlp = spacy.load(args.model)
+    tokenizer = combined_rule_tokenizer(nlp)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        artifact_path = os.path.join(temp_dir, "tokenizer.pkl")
+        save_tokenizer_artifact(tokenizer, artifact_path)
+
+        loaded_tokens = [t.text for t in load_tokenizer_artifact(nlp, artifact_path)(SAMPLE_TEXT)]
+        if loaded_tokens != [t.text for t in tokenizer(SAMPLE_TEXT)]:
+            sys.exit("The tokenizer loaded from the artifact does not match the built tokenizer")
+
+        build_timings = time_trials(lambda: combined_rule_tokenizer(nlp), args.trials)
+        load_timings = time_trials(lambda: load_tokenizer_artifact(nlp, artifact_path), args.trials)
+        artifact_size = os.path.getsize(artifact_path)
+
+    print("artifact size: {} bytes".format(artifact_size))
+    for name, timings in (("cold build", build_timings), ("artifact load", load_timings)):
+        print("{:>13}: mean {:.4f}s  min {:.4f}s  max {:.4f}s".format(name,
+                                                                     sum(timings) / len(timings),
+                                                                     min(timings),
+                                                                     max(timings)))
+    print("speedup: {:.1f}x".format(min(build_timings) / min(load_timings)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compares the startup time of worker processes that each load the pipeline
+themselves, as `corpus_annotation.annotate_corpus` workers do, with workers
+forked from a process that has loaded and warmed it up once, with
+`preloaded_pool.PreloadedPool`.
+
+    python scripts/benchmark_worker_startup.py --workers 8 --docs 400
+
+A worker's startup time runs from the creation of its pool until it is ready
+to process texts. Both pools then annotate the same synthetic corpus, and the
+total time of each, startup included, is reported too.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+import corpus_annotation # pylint: disable-msg=E0611,E0401
+from preloaded_pool import PreloadedPool, annotate # pylint: disable-msg=E0611,E0401
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+
+NAIVE_STARTUP_SECONDS = None
+
+def init_naive_worker(model, created):
+    global NAIVE_STARTUP_SECONDS # pylint: disable=global-statement
+    corpus_annotation.init_worker(model)
+    NAIVE_STARTUP_SECONDS = time.time() - created
+
+def annotate_naive_batch(texts):
+    return os.getpid(), NAIVE_STARTUP_SECONDS, annotate(corpus_annotation.WORKER_NLP, texts)
+
+def run_naive(model, n_workers, texts, batch_size):
+    start = time.perf_counter()
+    startups = {}
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    # spawned like on platforms without fork, so every worker loads the model from scratch
+    with multiprocessing.get_context("spawn").Pool(n_workers, initializer=init_naive_worker,
+                                                    initargs=(model, time.time())) as pool:
+        for pid, startup_seconds, _ in pool.imap(annotate_naive_batch, batches):
+            startups[pid] = startup_seconds
+    return sorted(startups.values()), time.perf_counter() - start
+
+def run_preloaded(model, n_workers, texts, batch_size, n_warmup):
+    start = time.perf_counter()
+    with PreloadedPool(model=model, n_workers=n_workers, warmup_texts=texts[:n_warmup],
+                       batch_size=batch_size) as pool:
+        for _ in pool.imap(texts):
+            pass
+        stats = pool.stats()
+    return stats, time.perf_counter() - start
+
+def summary(startups):
+    return "mean {:.3f}s  max {:.3f}s over {} workers".format(sum(startups) / len(startups), max(startups),
+                                                              len(startups))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="combined_rule",
+                        help="the model to load, see corpus_annotation.load_model")
+    parser.add_argument("--workers", type=int, default=4, help="the number of worker processes")
+    parser.add_argument("--docs", type=int, default=200, help="the number of synthetic documents to annotate")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="the number of documents sent to a worker at a time")
+    parser.add_argument("--warmup-docs", type=int, default=20,
+                        help="the number of documents the preloaded pool warms up with")
+    args = parser.parse_args()
+
+    texts = generate_corpus(args.docs)
+    naive_startups, naive_seconds = run_naive(args.model, args.workers, texts, args.batch_size)
+    stats, preloaded_seconds = run_preloaded(args.model, args.workers, texts, args.batch_size, args.warmup_docs)
+
+    print("workers loading the model: startup {}, total {:.2f}s".format(summary(naive_startups), naive_seconds))
+    print("preloaded pool: load {:.2f}s and warm up {:.2f}s once, worker startup {}, total {:.2f}s".format(
+        stats["load_seconds"], stats["warmup_seconds"], summary(stats["worker_startup_seconds"]),
+        preloaded_seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Builds the sdists and wheels of several model variants in parallel, one
+process per variant, and reports the build time and artifact sizes of each.
+Variants whose inputs (their definition, the SciSpaCy code, the spaCy version
+and their base model) have not changed since their last build are skipped.
+
+    python scripts/build_models.py --output-dir dist
+    python scripts/build_models.py --variants variants.json --only scispacy_core_web_sm --force
+
+A variants file is a JSON list of variant definitions, see
+`model_build.DEFAULT_VARIANTS`.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from model_build import DEFAULT_VARIANTS, build_variants # pylint: disable-msg=E0611,E0401
+
+def artifact_megabytes(report, suffix):
+    sizes = [artifact["bytes"] for artifact in report["artifacts"] if artifact["file"].endswith(suffix)]
+    return "{:.1f}".format(sizes[0] / 2**20) if sizes else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", help="a JSON file of variant definitions, by default the built in variants")
+    parser.add_argument("--only", nargs="+", help="the names of the variants to build")
+    parser.add_argument("--output-dir", default="dist", help="the directory to put the sdists and wheels in")
+    parser.add_argument("--jobs", type=int, help="the number of variants to build at once")
+    parser.add_argument("--force", action="store_true", help="rebuild variants whose inputs have not changed")
+    args = parser.parse_args()
+
+    variants = DEFAULT_VARIANTS
+    if args.variants is not None:
+        with open(args.variants, encoding="utf-8") as variants_file:
+            variants = json.load(variants_file)
+    if args.only is not None:
+        unknown = set(args.only) - {variant["name"] for variant in variants}
+        if unknown:
+            sys.exit("Unknown variants: {}".format(", ".join(sorted(unknown))))
+        variants = [variant for variant in variants if variant["name"] in args.only]
+
+    reports = build_variants(variants, args.output_dir, args.jobs, args.force)
+
+    print("{:<30} {:>8} {:>10} {:>10} {:>10}".format("variant", "status", "seconds", "sdist MB", "wheel MB"))
+    for report in reports:
+        print("{:<30} {:>8} {:>10.1f} {:>10} {:>10}".format(
+            report["name"], report["status"], report["seconds"],
+            artifact_megabytes(report, ".tar.gz"), artifact_megabytes(report, ".whl")))
+    failed = [report for report in reports if report["status"] == "failed"]
+    for report in failed:
+        print("{} failed: {}".format(report["name"], report["error"]), file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
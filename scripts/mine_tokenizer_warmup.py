@@ -0,0 +1,50 @@
+"""Mines the most frequent whitespace delimited chunks of a corpus and saves them
+alongside a model, so that preloaded_pool.PreloadedPool, or the packaged model's
+load(warm_up=True), pre-populates the tokenizer cache and vocab with them.
+Reports the estimated tokenizer cache hit rate on held out documents with and
+without the warm up.
+
+    python scripts/mine_tokenizer_warmup.py abstracts.jsonl SciSpaCy/models/combined_rule_tokenizer_and_segmenter
+"""
+import argparse
+import itertools
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from corpus_annotation import read_texts # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import mine_frequent_chunks, cache_hit_rate, save_warmup # pylint: disable-msg=E0611,E0401
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_path", help="the corpus to mine")
+    parser.add_argument("model_path", help="the model directory to save the warm up chunks to")
+    parser.add_argument("--format", choices=["jsonl", "text"], default="jsonl",
+                        help="jsonl for one JSON object per line, text for one document per line")
+    parser.add_argument("--max-chunks", type=int, default=100000, help="the maximum number of chunks to keep")
+    parser.add_argument("--min-count", type=int, default=2, help="the minimum count of a kept chunk")
+    parser.add_argument("--held-out", type=int, default=1000,
+                        help="the number of documents at the end of the corpus to measure the hit rate on")
+    args = parser.parse_args()
+
+    texts = [text for _, text in read_texts(args.input_path, args.format)]
+    mined_texts, held_out_texts = texts[:len(texts) - args.held_out], texts[len(texts) - args.held_out:]
+    if not mined_texts:
+        sys.exit("The corpus has no documents left to mine after holding out {}".format(args.held_out))
+
+    chunks = mine_frequent_chunks(mined_texts, args.max_chunks, args.min_count)
+    save_warmup(args.model_path, chunks)
+    print("saved {} chunks mined from {} documents".format(len(chunks), len(mined_texts)))
+
+    cold = cache_hit_rate(held_out_texts)
+    warm = cache_hit_rate(held_out_texts, chunks)
+    print("estimated tokenizer cache hit rate on {} held out documents: {:.1%} cold, {:.1%} warm".format(
+        len(held_out_texts), cold["hit_rate"], warm["hit_rate"]))
+    # the hit rate of a short lived worker that only tokenizes a few documents
+    first_docs = list(itertools.islice(held_out_texts, 10))
+    print("on the first 10 documents: {:.1%} cold, {:.1%} warm".format(
+        cache_hit_rate(first_docs)["hit_rate"], cache_hit_rate(first_docs, chunks)["hit_rate"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Benchmarks the throughput and startup cost of the SciSpaCy tokenizer, sentence
+segmenter and pipelines on a reproducible synthetic scientific corpus.
+
+    python scripts/run_benchmarks.py --output benchmarks.json
+    python scripts/run_benchmarks.py --compare benchmarks.json
+
+For every stage it reports per document latency percentiles and tokens/sec,
+along with model load times and the peak resident memory of the process. The
+results are saved as JSON so that they can be compared between commits with
+--compare.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+import numpy
+import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from custom_sentence_segmenter import combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import vectorized_combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import combined_rule_tokenizer, remove_new_lines # pylint: disable-msg=E0611,E0401
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_model # pylint: disable-msg=E0611,E0401
+from util import create_combined_rule_segmentation_model # pylint: disable-msg=E0611,E0401
+
+# a stage is reported as a regression by --compare when its median latency grows by more than this
+REGRESSION_THRESHOLD = 0.1
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                       cwd=os.path.dirname(os.path.realpath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def latency_summary(timings, n_tokens):
+    """Summarizes per document timings (in seconds) of a stage."""
+    timings = numpy.asarray(timings)
+    total = float(timings.sum())
+    return OrderedDict([("docs", len(timings)),
+                        ("tokens", n_tokens),
+                        ("total_seconds", total),
+                        ("p50_ms", float(numpy.percentile(timings, 50)) * 1000),
+                        ("p90_ms", float(numpy.percentile(timings, 90)) * 1000),
+                        ("p99_ms", float(numpy.percentile(timings, 99)) * 1000),
+                        ("max_ms", float(timings.max()) * 1000),
+                        ("tokens_per_second", n_tokens / total if total else 0.0)])
+
+def time_per_doc(function, items):
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        function(item)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def time_segmenter(segmenter, tokenizer, texts):
+    # segmenting modifies the docs, so each run gets freshly tokenized ones
+    docs = [tokenizer(text) for text in texts]
+    return time_per_doc(segmenter, docs)
+
+def run_benchmarks(n_docs, seed):
+    texts = generate_corpus(n_docs, seed=seed)
+    results = OrderedDict()
+
+    load = OrderedDict()
+    nlp, load["combined_rule_model_seconds"] = timed(create_combined_rule_model)
+    segmentation_nlp, load["segmentation_model_seconds"] = timed(create_combined_rule_segmentation_model)
+    tokenizer, load["tokenizer_build_seconds"] = timed(lambda: combined_rule_tokenizer(nlp))
+    results["load"] = load
+
+    cleaned_texts = [remove_new_lines(text) for text in texts]
+    n_tokens = sum(len(tokenizer(text)) for text in cleaned_texts)
+    stages = OrderedDict()
+    stages["remove_new_lines"] = time_per_doc(remove_new_lines, texts)
+    stages["tokenizer"] = time_per_doc(tokenizer, cleaned_texts)
+    stages["rule_segmenter"] = time_segmenter(combined_rule_sentence_segmenter, tokenizer, cleaned_texts)
+    stages["vectorized_segmenter"] = time_segmenter(vectorized_combined_rule_sentence_segmenter,
+                                                    tokenizer, cleaned_texts)
+    stages["segmenter_component"] = time_segmenter(CombinedRuleSentenceSegmenter(nlp), tokenizer, cleaned_texts)
+    stages["segmentation_pipeline"] = time_per_doc(segmentation_nlp, cleaned_texts)
+    stages["full_pipeline"] = time_per_doc(nlp, cleaned_texts)
+    results["stages"] = OrderedDict((name, latency_summary(timings, n_tokens))
+                                    for name, timings in stages.items())
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["meta"] = OrderedDict([("commit", git_commit()),
+                                   ("timestamp", datetime.datetime.now().isoformat()),
+                                   ("python", platform.python_version()),
+                                   ("spacy", spacy.__version__),
+                                   ("docs", n_docs),
+                                   ("seed", seed),
+                                   ("characters", sum(len(text) for text in texts))])
+    return results
+
+def print_results(results):
+    for name, seconds in results["load"].items():
+        print("{:<28} {:>8.3f}s".format(name, seconds))
+    print("{:<28} {:>8.1f}MB".format("peak_rss", results["peak_rss_mb"]))
+    print()
+    print("{:<24} {:>9} {:>9} {:>9} {:>9} {:>12}".format("stage", "p50 ms", "p90 ms", "p99 ms",
+                                                        "max ms", "tokens/s"))
+    for name, summary in results["stages"].items():
+        print("{:<24} {p50_ms:>9.3f} {p90_ms:>9.3f} {p99_ms:>9.3f} {max_ms:>9.3f} "
+              "{tokens_per_second:>12.0f}".format(name, **summary))
+
+def print_comparison(results, baseline):
+    """Prints the relative change of every stage against baseline results and
+       returns the names of the stages that regressed.
+    """
+    print()
+    print("compared with commit {}".format(baseline["meta"].get("commit")))
+    regressions = []
+    for name, summary in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        before = baseline["stages"][name]["p50_ms"]
+        change = (summary["p50_ms"] - before) / before if before else 0.0
+        regressed = change > REGRESSION_THRESHOLD
+        if regressed:
+            regressions.append(name)
+        print("{:<24} p50 {:>9.3f}ms -> {:>9.3f}ms ({:+.1%}){}".format(name, before, summary["p50_ms"], change,
+                                                                       "  REGRESSION" if regressed else ""))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="the number of synthetic documents")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the synthetic corpus")
+    parser.add_argument("--output", help="a JSON file to save the results to")
+    parser.add_argument("--compare", help="a JSON file with earlier results to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.docs, args.seed)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file, object_pairs_hook=OrderedDict)
+        if print_comparison(results, baseline):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
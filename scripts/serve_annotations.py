@@ -0,0 +1,48 @@
+"""Serves tokenization and sentence segmentation over HTTP, coalescing
+concurrent requests into micro-batches for the pipeline.
+
+    python scripts/serve_annotations.py --model combined_rule_segmentation --port 8000
+    curl -d '{"text": "This is a sentence. This is another one."}' localhost:8000/annotate
+    curl localhost:8000/stats
+
+Each annotation has the tokens, their character offsets in the posted text and
+the token ranges of the sentences. /stats reports the queue depth, batch sizes
+and the mean milliseconds a text spends waiting, being annotated and being
+written back.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../SciSpaCy/"))
+
+from annotation_server import serve # pylint: disable-msg=E0611,E0401
+from corpus_annotation import load_model # pylint: disable-msg=E0611,E0401
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="combined_rule",
+                        help="combined_rule for util.create_combined_rule_model(), combined_rule_segmentation "
+                             "to only tokenize and segment, or a spaCy model name or path such as the packaged "
+                             "SciSpaCy model")
+    parser.add_argument("--host", default="127.0.0.1", help="the host to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="the port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="the maximum number of texts in a batch")
+    parser.add_argument("--max-latency-ms", type=float, default=5,
+                        help="the maximum milliseconds a text waits for other texts to join its batch")
+    parser.add_argument("--max-queue-size", type=int, default=1024,
+                        help="the maximum number of waiting texts, requests are rejected with 503 beyond it")
+    parser.add_argument("--max-body-bytes", type=int, default=10 * 1024 * 1024,
+                        help="the maximum size of a request body, larger requests are rejected with 413")
+    args = parser.parse_args()
+
+    serve(load_model(args.model),
+          host=args.host,
+          port=args.port,
+          max_batch_size=args.max_batch_size,
+          max_latency=args.max_latency_ms / 1000,
+          max_queue_size=args.max_queue_size,
+          max_body_bytes=args.max_body_bytes)
+
+if __name__ == "__main__":
+    main()
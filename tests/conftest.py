@@ -5,8 +5,11 @@ sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../SciSpaCy/")
 import pytest
 import spacy
 
-from custom_sentence_segmenter import combined_rule_sentence_segmenter
+from custom_sentence_segmenter import combined_rule_sentence_segmenter, vectorized_combined_rule_sentence_segmenter
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter
 from custom_tokenizer import combined_rule_tokenizer, combined_rule_prefixes, remove_new_lines
+from util import create_combined_rule_segmentation_model
+from custom_tokenizer import remove_new_lines_with_offsets, save_tokenizer_artifact, load_tokenizer_artifact
 
 @pytest.fixture()
 def combined_rule_tokenizer_fixture():
@@ -14,6 +17,13 @@ def combined_rule_tokenizer_fixture():
     tokenizer = combined_rule_tokenizer(nlp)
     return tokenizer
 
+@pytest.fixture()
+def combined_rule_tokenizer_from_artifact_fixture(tmpdir):
+    nlp = spacy.load('en_core_web_sm')
+    artifact_path = str(tmpdir.join("tokenizer.pkl"))
+    save_tokenizer_artifact(combined_rule_tokenizer(nlp), artifact_path)
+    return load_tokenizer_artifact(nlp, artifact_path)
+
 @pytest.fixture()
 def en_with_combined_rule_tokenizer_fixture():
     nlp = spacy.load('en_core_web_sm')
@@ -27,6 +37,24 @@ def en_with_combined_rule_tokenizer_and_segmenter_fixture():
     nlp.add_pipe(combined_rule_sentence_segmenter, first=True)
     return nlp
 
+@pytest.fixture()
+def en_with_combined_rule_tokenizer_and_vectorized_segmenter_fixture():
+    nlp = spacy.load('en_core_web_sm')
+    nlp.tokenizer = combined_rule_tokenizer(nlp)
+    nlp.add_pipe(vectorized_combined_rule_sentence_segmenter, first=True)
+    return nlp
+
+@pytest.fixture()
+def en_with_combined_rule_tokenizer_and_segmenter_component_fixture():
+    nlp = spacy.load('en_core_web_sm')
+    nlp.tokenizer = combined_rule_tokenizer(nlp)
+    nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp), first=True)
+    return nlp
+
+@pytest.fixture()
+def combined_rule_segmentation_model_fixture():
+    return create_combined_rule_segmentation_model()
+
 @pytest.fixture()
 def combined_rule_prefixes_fixture():
     return combined_rule_prefixes()
@@ -35,6 +63,10 @@ def combined_rule_prefixes_fixture():
 def remove_new_lines_fixture():
     return remove_new_lines
 
+@pytest.fixture()
+def remove_new_lines_with_offsets_fixture():
+    return remove_new_lines_with_offsets
+
 @pytest.fixture()
 def default_en_tokenizer_fixture():
     nlp = spacy.load('en_core_web_sm')
@@ -0,0 +1,59 @@
+import pytest
+from spacy.lang.en import English
+
+from abbreviations import AbbreviationIndex, read_abbreviations # pylint: disable-msg=E0611,E0401
+from abbreviations import DEFAULT_ABBREVIATIONS # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import combined_rule_tokenizer # pylint: disable-msg=E0611,E0401
+from util import add_abbreviations, create_combined_rule_segmentation_model # pylint: disable-msg=E0611,E0401
+
+def test_abbreviation_index_update():
+    index = AbbreviationIndex(["fig.", "al."])
+    assert "fig." in index
+    assert "cf." not in index
+    assert index.update(["al.", "cf."]) == {"cf."}
+    assert "cf." in index
+    assert index.version == 1
+    assert index.update(["cf."]) == frozenset()
+    assert index.version == 1
+    assert list(index) == ["al.", "cf.", "fig."]
+
+def test_abbreviation_index_orths():
+    nlp = English()
+    index = AbbreviationIndex(["fig."])
+    assert index.orths(nlp.vocab.strings) == {nlp.vocab.strings["fig."]}
+    index.update(["cf."])
+    assert nlp.vocab.strings["cf."] in index.orths(nlp.vocab.strings)
+
+def test_read_abbreviations(tmpdir):
+    path = tmpdir.join("abbreviations.txt")
+    path.write("# domain abbreviations\napprox.\n\nresp.\n  cf.  \n")
+    assert read_abbreviations(str(path)) == ["approx.", "resp.", "cf."]
+
+def test_add_abbreviations(tmpdir):
+    path = tmpdir.join("abbreviations.txt")
+    path.write("approx.\nresp.\n")
+    index = AbbreviationIndex(["Fig."])
+    nlp = English()
+    nlp.tokenizer = combined_rule_tokenizer(nlp, abbreviations=index)
+    nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp, propose_boundaries=True, abbreviations=index))
+    assert add_abbreviations(nlp, str(path), index=index) == {"approx.", "resp."}
+
+    doc = nlp("The yield was approx. 5 and 7 times higher, resp. 2 of them are shown in Fig. 3.")
+    tokens = [t.text for t in doc]
+    assert "approx." in tokens
+    assert "resp." in tokens
+    assert len(list(doc.sents)) == 1
+
+def test_add_abbreviations_changes_only_one_pipeline():
+    nlp = create_combined_rule_segmentation_model()
+    other_nlp = create_combined_rule_segmentation_model()
+    assert add_abbreviations(nlp, ["approx."]) == {"approx."}
+
+    text = "The yield was approx. 5 times higher."
+    assert "approx." in [t.text for t in nlp(text)]
+    assert "approx." not in [t.text for t in other_nlp(text)]
+    assert "approx." not in other_nlp.get_pipe(CombinedRuleSentenceSegmenter.name).abbreviations
+    assert "approx." not in DEFAULT_ABBREVIATIONS
+    with pytest.raises(ValueError):
+        add_abbreviations(other_nlp, ["resp."], index=DEFAULT_ABBREVIATIONS)
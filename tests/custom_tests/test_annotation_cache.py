@@ -0,0 +1,55 @@
+from annotation_cache import AnnotationCache # pylint: disable-msg=E0611,E0401
+from corpus_annotation import annotate_texts # pylint: disable-msg=E0611,E0401
+
+def test_annotation_cache_eviction(tmpdir):
+    cache = AnnotationCache(max_entries=2)
+    for text in ["a", "b", "c"]:
+        assert cache.get(text) is None
+        cache.put(text, {"id": text, "tokens": [text]})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"tokens": ["c"]}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 4
+    assert cache.stats()["evictions"] == 1
+
+    path = str(tmpdir.join("cache.tsv"))
+    cache.save(path)
+    assert AnnotationCache.load(path).get("b") == {"tokens": ["b"]}
+    assert AnnotationCache.load(path, namespace="other").get("b") is None
+
+def test_annotate_texts_with_cache(en_with_combined_rule_tokenizer_and_segmenter_component_fixture):
+    nlp = en_with_combined_rule_tokenizer_and_segmenter_component_fixture
+    documents = [("a", "This is a sen-\ntence. Funded by the NSF."), ("b", "Funded by the NSF."),
+                 ("c", "This is a sen-\ntence. Funded by the NSF.")]
+    cache = AnnotationCache()
+    expected = list(annotate_texts(nlp, documents))
+    annotated = []
+    nlp.add_pipe(lambda doc: annotated.append(doc.text) or doc, name="record_texts", last=True)
+    # the text of "a" and "c" is annotated once
+    assert list(annotate_texts(nlp, documents, cache=cache)) == expected
+    assert len(annotated) == 2
+    assert cache.stats()["hits"] == 0
+    assert list(annotate_texts(nlp, documents, cache=cache)) == list(annotate_texts(nlp, documents))
+    assert cache.stats()["hits"] == 3
+
+def test_annotate_texts_caches_paragraphs(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    acknowledgement = "We thank A. B. for help (see Fig. 2). Funded by the NSF."
+    documents = [("a", "This is a sen-\ntence. (This is an interjected sentence.)\n\n" + acknowledgement),
+                 ("b", "The cGMP-dependent protein is shown. \n\n" + acknowledgement)]
+    cache = AnnotationCache()
+    assert list(annotate_texts(nlp, documents[:1], cache=cache)) == list(annotate_texts(nlp, documents[:1]))
+    assert cache.stats()["hits"] == 0
+    # "b" only shares its last paragraph with "a"
+    assert list(annotate_texts(nlp, documents[1:], cache=cache)) == list(annotate_texts(nlp, documents[1:]))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+def test_annotate_texts_with_brackets_across_paragraphs(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    # the parens are matched across the paragraph break, which makes "(" start a sentence
+    documents = [("a", "It was shown. (See it\n\nin the table.) Next."),
+                 ("b", "An unclosed (bracket.\n\nDone.")]
+    cache = AnnotationCache()
+    assert list(annotate_texts(nlp, documents, cache=cache)) == list(annotate_texts(nlp, documents))
+    assert list(annotate_texts(nlp, documents, cache=cache)) == list(annotate_texts(nlp, documents))
@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import pytest
+
+from annotation_server import AnnotationServer, MicroBatcher # pylint: disable-msg=E0611,E0401
+from annotation_server import ServerOverloaded, RequestTooLarge # pylint: disable-msg=E0611,E0401
+
+TEXT = "This is a sen-\ntence. (This is an interjected sentence.) This is also a sentence."
+
+class FailingPipeline(object):
+    """Fails to annotate a batch with a text that contains "fail"."""
+    def __init__(self, nlp):
+        self.nlp = nlp
+
+    def pipe(self, texts, batch_size):
+        texts = list(texts)
+        if any("fail" in text for text in texts):
+            raise ValueError("Cannot annotate this text")
+        return self.nlp.pipe(texts, batch_size=batch_size)
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write("{} {} HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n".format(
+        method, path, len(body)).encode("latin-1") + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body.decode("utf-8"))
+
+def test_micro_batcher_coalesces_requests(combined_rule_segmentation_model_fixture):
+    batcher = MicroBatcher(combined_rule_segmentation_model_fixture, max_batch_size=8, max_latency=0.05)
+
+    async def annotate_concurrently():
+        await batcher.start()
+        annotations = await asyncio.gather(*[batcher.annotate([TEXT]) for _ in range(10)])
+        await batcher.stop()
+        return annotations
+
+    annotations = run(annotate_concurrently())
+    assert all(annotation == annotations[0] for annotation in annotations)
+    annotation, = annotations[0]
+    assert annotation["sentences"] == [[0, 5], [5, 13], [13, 19]]
+    stats = batcher.stats()
+    assert stats["texts"] == 10
+    assert stats["batches"] == 2
+    assert stats["queue_depth"] == 0
+
+def test_micro_batcher_rejects_when_full(combined_rule_segmentation_model_fixture):
+    batcher = MicroBatcher(combined_rule_segmentation_model_fixture, max_queue_size=2)
+
+    async def annotate_too_many():
+        await batcher.start()
+        # the second request arrives while the texts of the first are queued
+        requests = [asyncio.ensure_future(batcher.annotate([TEXT] * 2)),
+                    asyncio.ensure_future(batcher.annotate([TEXT]))]
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    accepted, rejected = run(annotate_too_many())
+    assert len(accepted) == 2
+    assert isinstance(rejected, ServerOverloaded)
+    assert batcher.stats()["rejected_requests"] == 1
+
+def test_micro_batcher_rejects_too_many_texts(combined_rule_segmentation_model_fixture):
+    batcher = MicroBatcher(combined_rule_segmentation_model_fixture, max_queue_size=2)
+
+    async def annotate_too_many():
+        await batcher.start()
+        try:
+            await batcher.annotate([TEXT] * 3)
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(RequestTooLarge):
+        run(annotate_too_many())
+
+def test_micro_batcher_isolates_failing_texts(combined_rule_segmentation_model_fixture):
+    batcher = MicroBatcher(FailingPipeline(combined_rule_segmentation_model_fixture), max_latency=0.05)
+
+    async def annotate_concurrently():
+        await batcher.start()
+        results = await asyncio.gather(batcher.annotate([TEXT]), batcher.annotate(["This will fail."]),
+                                       batcher.annotate(["One more."]), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    first, failed, last = run(annotate_concurrently())
+    assert batcher.stats()["batches"] == 1
+    assert first[0]["sentences"] == [[0, 5], [5, 13], [13, 19]]
+    assert isinstance(failed, ValueError)
+    assert last[0]["tokens"] == ["One", "more", "."]
+
+def test_annotation_server(combined_rule_segmentation_model_fixture):
+    server = AnnotationServer(MicroBatcher(combined_rule_segmentation_model_fixture))
+
+    async def requests():
+        port = await server.start(port=0)
+        responses = await asyncio.gather(request(port, "POST", "/annotate", {"text": TEXT}),
+                                         request(port, "POST", "/annotate", {"texts": [TEXT, "One more."]}),
+                                         request(port, "POST", "/annotate", {"document": TEXT}),
+                                         request(port, "GET", "/annotate"),
+                                         request(port, "GET", "/health"))
+        stats = await request(port, "GET", "/stats")
+        await server.stop()
+        return responses, stats
+
+    (single, several, bad_request, wrong_method, health), stats = run(requests())
+    assert single[0] == 200
+    assert ([TEXT[start:end] for start, end in single[1]["token_offsets"][:5]] ==
+            ["This", "is", "a", "sen-\ntence", "."])
+    assert several[0] == 200
+    assert several[1][0] == single[1]
+    assert several[1][1]["tokens"] == ["One", "more", "."]
+    assert bad_request[0] == 400
+    assert wrong_method[0] == 405
+    assert health == (200, {"status": "ok"})
+    assert stats[0] == 200
+    assert stats[1]["texts"] == 3
+    assert set(stats[1]["mean_stage_ms"]) == {"queue", "annotate", "respond"}
+
+def test_annotation_server_errors(combined_rule_segmentation_model_fixture):
+    server = AnnotationServer(MicroBatcher(FailingPipeline(combined_rule_segmentation_model_fixture),
+                                           max_queue_size=2))
+
+    async def requests():
+        port = await server.start(port=0)
+        responses = await asyncio.gather(request(port, "POST", "/annotate", {"texts": [TEXT] * 3}),
+                                         request(port, "POST", "/annotate", {"text": "This will fail."}),
+                                         request(port, "POST", "/annotate", {"text": TEXT}))
+        await server.stop()
+        return responses
+
+    too_large, failed, single = run(requests())
+    assert too_large[0] == 413
+    assert failed == (500, {"error": "ValueError: Cannot annotate this text"})
+    assert single[0] == 200
+
+async def request_with_content_length(port, content_length):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("POST /annotate HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(content_length).encode("latin-1"))
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body.decode("utf-8"))
+
+def test_annotation_server_checks_content_length(combined_rule_segmentation_model_fixture):
+    server = AnnotationServer(MicroBatcher(combined_rule_segmentation_model_fixture), max_body_bytes=100)
+
+    async def requests():
+        port = await server.start(port=0)
+        responses = [await request_with_content_length(port, content_length)
+                     for content_length in ["abc", "-1", "101"]]
+        responses.append(await request(port, "POST", "/annotate", {"text": "A sentence."}))
+        responses.append(await request(port, "POST", "/annotate", {"text": TEXT * 2}))
+        await server.stop()
+        return responses
+
+    malformed, negative, too_large, single, too_long = run(requests())
+    assert malformed == (400, {"error": "Malformed Content-Length: abc"})
+    assert negative[0] == 400
+    assert too_large == (413, {"error": "The body has 101 bytes, at most 100 are accepted"})
+    assert single[0] == 200
+    assert too_long[0] == 413
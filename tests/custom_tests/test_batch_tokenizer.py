@@ -0,0 +1,30 @@
+from batch_tokenizer import BatchTokenizer # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["activators of cAMP- and cGMP-dependent protein",
+         "",
+         "  the cGMP-dependent protein for [Ca2+]i protein (Fig. 1D).\n\nA new paragraph  with\ttabs ",
+         " ",
+         "phorbol 12-myristate and [Ca2+]i, e.g. 28×28 images"]
+
+def test_batch_tokenizer(combined_rule_tokenizer_fixture):
+    tokenizer = combined_rule_tokenizer_fixture
+    batch_tokenizer = BatchTokenizer(tokenizer, max_chunks=30)
+    # the 26 chunks of the first pass are found by the second, and forgotten
+    # for the new chunks of the third
+    passes = [(TEXTS, False), (TEXTS[::-1], False), (TEXTS + ["five other unseen chunks here"], True)]
+    for texts, forgets in passes:
+        chunk_ids = batch_tokenizer.chunk_ids
+        starts, ends, orths, text_starts = batch_tokenizer(texts)
+        assert (batch_tokenizer.chunk_ids is not chunk_ids) == forgets
+        assert len(text_starts) == len(texts) + 1
+        for i, text in enumerate(texts):
+            doc = tokenizer(text)
+            tokens = slice(text_starts[i], text_starts[i + 1])
+            assert starts[tokens].tolist() == [token.idx for token in doc]
+            assert ends[tokens].tolist() == [token.idx + len(token) for token in doc]
+            assert orths[tokens].tolist() == [token.orth for token in doc]
+
+def test_empty_batch(combined_rule_tokenizer_fixture):
+    starts, ends, orths, text_starts = BatchTokenizer(combined_rule_tokenizer_fixture)(["", ""])
+    assert len(starts) == len(ends) == len(orths) == 0
+    assert text_starts.tolist() == [0, 0, 0]
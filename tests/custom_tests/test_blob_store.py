@@ -0,0 +1,51 @@
+import os
+
+import numpy
+import pytest
+from spacy.lang.en import English
+
+from blob_store import load_manifest, resolve_blobs, MANIFEST_FILE_NAME # pylint: disable-msg=E0611,E0401
+from util import save_model # pylint: disable-msg=E0611,E0401
+
+def create_nlp(vector=(1, 2, 3)):
+    nlp = English()
+    nlp.vocab.set_vector("protein", numpy.asarray(vector, dtype="f"))
+    return nlp
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_blob_store(tmpdir, compression):
+    store_path = str(tmpdir.join("blobs"))
+    first_path, second_path = str(tmpdir.join("first")), str(tmpdir.join("second"))
+    save_model(create_nlp(), first_path, blob_store=store_path, compression=compression)
+    save_model(create_nlp(), second_path, blob_store=store_path, compression=compression)
+
+    first_manifest, second_manifest = load_manifest(first_path), load_manifest(second_path)
+    assert first_manifest["store"] == "../blobs"
+    assert first_manifest["files"] == second_manifest["files"]
+    # the two models share all their blobs
+    assert len(os.listdir(store_path)) == len(set(entry["blob"] for entry in first_manifest["files"].values()))
+    assert sorted(os.listdir(first_path)) == sorted(["meta.json", MANIFEST_FILE_NAME, "vocab"])
+    assert not tmpdir.join("first", "vocab", "vectors").exists()
+
+    resolved_path = resolve_blobs(first_path, str(tmpdir.join("resolved")))
+    nlp = English().from_disk(resolved_path)
+    assert nlp.vocab.get_vector("protein").tolist() == [1, 2, 3]
+    # a second resolution finds the files in place
+    assert resolve_blobs(first_path, resolved_path) == resolved_path
+    assert English().from_disk(resolve_blobs(second_path)).vocab.get_vector("protein").tolist() == [1, 2, 3]
+
+def test_resolve_replaces_files_of_other_blobs(tmpdir):
+    model_path, resolved_path = str(tmpdir.join("model")), str(tmpdir.join("resolved"))
+    save_model(create_nlp(), model_path, blob_store=str(tmpdir.join("blobs")))
+    resolve_blobs(model_path, resolved_path)
+    # retrained weights of the same size
+    save_model(create_nlp((4, 5, 6)), model_path, blob_store=str(tmpdir.join("blobs")))
+    resolve_blobs(model_path, resolved_path)
+    assert English().from_disk(resolved_path).vocab.get_vector("protein").tolist() == [4, 5, 6]
+
+def test_plain_model(tmpdir):
+    save_model(create_nlp(), str(tmpdir))
+    assert load_manifest(str(tmpdir)) is None
+    assert resolve_blobs(str(tmpdir)) == str(tmpdir)
+    with pytest.raises(ValueError):
+        save_model(create_nlp(), str(tmpdir.join("compressed")), compression="gzip")
@@ -0,0 +1,42 @@
+from columnar_corpus import CorpusShard, ShardWriter # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import remove_new_lines_with_offsets # pylint: disable-msg=E0611,E0401
+from util import save_corpus, load_corpus # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["This is a sen-\ntence. (This is an interjected sentence.) This is also a sentence.",
+         "",
+         "A single sentence about neu- \n\nrons."]
+
+def test_save_and_load_corpus(combined_rule_segmentation_model_fixture, tmpdir):
+    nlp = combined_rule_segmentation_model_fixture
+    documents = [("doc{}".format(i), text) for i, text in enumerate(TEXTS)]
+    assert save_corpus(nlp, documents, str(tmpdir), shard_size=2) == 2
+    first, second = load_corpus(str(tmpdir))
+    assert first.doc_ids == ["doc0", "doc1"]
+    assert second.doc_ids == ["doc2"]
+    assert first.sentences(0) == [(0, 5), (5, 13), (13, 19)]
+    assert first.sentences(1) == []
+
+    sentences = [sentence for shard in (first, second) for sentence in shard.iter_sentences()]
+    assert [sentence["id"] for sentence in sentences] == ["doc0", "doc0", "doc0", "doc2"]
+    assert sentences[0]["tokens"] == ["This", "is", "a", "sentence", "."]
+    token_texts = [TEXTS[0][start:end] for start, end in sentences[0]["token_offsets"]]
+    assert token_texts == ["This", "is", "a", "sen-\ntence", "."]
+    assert [TEXTS[2][start:end] for start, end in sentences[3]["token_offsets"]][-2:] == ["neu- \n\nrons", "."]
+
+def test_shard_writer_round_trip(combined_rule_segmentation_model_fixture, tmpdir):
+    nlp = combined_rule_segmentation_model_fixture
+    writer = ShardWriter()
+    docs = []
+    for i, text in enumerate(TEXTS * 5):
+        cleaned_text, offsets = remove_new_lines_with_offsets(text)
+        docs.append(nlp(cleaned_text))
+        writer.add(i, docs[-1], offsets)
+    writer.write(str(tmpdir))
+
+    for mmap in [True, False]:
+        shard = CorpusShard(str(tmpdir), mmap=mmap)
+        assert len(shard) == len(docs)
+        for i, doc in enumerate(docs):
+            start, end = shard.token_range(i)
+            assert shard.tokens(start, end) == [token.text for token in doc]
+            assert shard.sentences(i) == [(sent.start, sent.end) for sent in doc.sents]
@@ -0,0 +1,31 @@
+import json
+
+from corpus_annotation import read_texts, annotate_texts, annotate_corpus # pylint: disable-msg=E0611,E0401
+
+def test_read_texts(tmpdir):
+    jsonl_path = tmpdir.join("corpus.jsonl")
+    jsonl_path.write('{"id": "a", "text": "First doc."}\n\n{"text": "Second doc."}\n')
+    assert list(read_texts(str(jsonl_path))) == [("a", "First doc."), (2, "Second doc.")]
+
+    text_path = tmpdir.join("corpus.txt")
+    text_path.write("First doc.\nSecond doc.\n")
+    assert list(read_texts(str(text_path), input_format="text")) == [(0, "First doc."), (1, "Second doc.")]
+
+def test_annotate_texts(combined_rule_segmentation_model_fixture):
+    text = "This is a sen-\ntence. (This is an interjected sentence.) This is also a sentence."
+    annotation, = annotate_texts(combined_rule_segmentation_model_fixture, [("doc", text)])
+    assert annotation["id"] == "doc"
+    assert annotation["tokens"][:5] == ["This", "is", "a", "sentence", "."]
+    token_texts = [text[start:end] for start, end in annotation["token_offsets"][:5]]
+    assert token_texts == ["This", "is", "a", "sen-\ntence", "."]
+    assert annotation["sentences"] == [[0, 5], [5, 13], [13, 19]]
+
+def test_annotate_corpus(tmpdir):
+    input_path = tmpdir.join("corpus.txt")
+    input_path.write("This is a sentence. This is another one.\nA single sentence.\n")
+    output_path = tmpdir.join("annotated.jsonl")
+    stats = annotate_corpus(str(input_path), str(output_path), input_format="text")
+    annotations = [json.loads(line) for line in output_path.readlines()]
+    assert [annotation["id"] for annotation in annotations] == [0, 1]
+    assert stats["docs"] == 2
+    assert stats["tokens"] == sum(len(annotation["tokens"]) for annotation in annotations)
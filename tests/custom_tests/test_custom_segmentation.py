@@ -1,4 +1,14 @@
+from pathlib import Path
+
 import pytest
+from spacy.attrs import SENT_START
+from spacy.lang.en import English
+from spacy.language import Language
+from spacy.util import load_model_from_path
+
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import vectorized_combined_rule_sentence_segmenter # pylint: disable-msg=E0611,E0401
 
 TEST_CASES = [("LSTM networks, which we preview in Sec. 2, have been successfully", ["LSTM networks, which we preview in Sec. 2, have been successfully"]),
               ("When the tree is simply a chain, both Eqs. 2–8 and Eqs. 9–14 reduce to the standard LSTM transitions, Eqs. 1.", ["When the tree is simply a chain, both Eqs. 2–8 and Eqs. 9–14 reduce to the standard LSTM transitions, Eqs. 1."]),
@@ -26,4 +36,67 @@ def test_custom_segmentation(en_with_combined_rule_tokenizer_and_segmenter_fixtu
     text = remove_new_lines_fixture(text)
     doc = en_with_combined_rule_tokenizer_and_segmenter_fixture(text)
     sents = [s.text for s in doc.sents]
-    assert sents == expected_sents
\ No newline at end of file
+    assert sents == expected_sents
+
+@pytest.mark.parametrize('text', [text for text, _ in TEST_CASES])
+def test_vectorized_custom_segmentation(en_with_combined_rule_tokenizer_and_vectorized_segmenter_fixture,
+                                        en_with_combined_rule_tokenizer_and_segmenter_fixture,
+                                        remove_new_lines_fixture, text):
+    # the gold sentences of some cases depend on the parser, so the pipeline
+    # is compared with the same pipeline using the rule based segmenter
+    text = remove_new_lines_fixture(text)
+    doc = en_with_combined_rule_tokenizer_and_vectorized_segmenter_fixture(text)
+    rules_doc = en_with_combined_rule_tokenizer_and_segmenter_fixture(text)
+    assert [t.text for t in doc] == [t.text for t in rules_doc]
+    assert doc.to_array([SENT_START]).tolist() == rules_doc.to_array([SENT_START]).tolist()
+
+@pytest.mark.parametrize('text,expected_sents', TEST_CASES)
+def test_vectorized_segmenter_matches_rules(combined_rule_tokenizer_fixture, remove_new_lines_fixture, text,
+                                            expected_sents):
+    text = remove_new_lines_fixture(text)
+    rules_doc = combined_rule_sentence_segmenter(combined_rule_tokenizer_fixture(text))
+    vectorized_doc = vectorized_combined_rule_sentence_segmenter(combined_rule_tokenizer_fixture(text))
+    assert [t.is_sent_start for t in vectorized_doc] == [t.is_sent_start for t in rules_doc]
+
+@pytest.mark.parametrize('batch_size', [1, 4, 1000])
+def test_segmenter_component_pipe(en_with_combined_rule_tokenizer_and_segmenter_component_fixture,
+                                  remove_new_lines_fixture, batch_size):
+    # the gold sentences of some cases depend on the parser, so the batched
+    # component is compared with the segmenter function applied to each doc
+    nlp = en_with_combined_rule_tokenizer_and_segmenter_component_fixture
+    texts = [remove_new_lines_fixture(text) for text, _ in TEST_CASES]
+    docs = list(nlp.pipe(texts, batch_size=batch_size))
+    assert len(docs) == len(texts)
+    for doc, text in zip(docs, texts):
+        expected_doc = combined_rule_sentence_segmenter(nlp.tokenizer(text))
+        assert [t.text for t in doc] == [t.text for t in expected_doc]
+        assert doc.to_array([SENT_START]).tolist() == expected_doc.to_array([SENT_START]).tolist()
+
+# cases the segmenter handles on its own, without a parser proposing boundaries
+SEGMENTATION_ONLY_TEST_CASES = [TEST_CASES[i] for i in [0, 1, 2, 5, 6, 7, 14, 18]]
+
+@pytest.mark.parametrize('text,expected_sents', SEGMENTATION_ONLY_TEST_CASES)
+def test_segmentation_only_model(combined_rule_segmentation_model_fixture, remove_new_lines_fixture, text,
+                                 expected_sents):
+    text = remove_new_lines_fixture(text)
+    doc = combined_rule_segmentation_model_fixture(text)
+    assert combined_rule_segmentation_model_fixture.pipe_names == ['combined_rule_sentence_segmenter']
+    assert [s.text for s in doc.sents] == expected_sents
+
+@pytest.mark.parametrize('text', ["A single sentence", "Results", "See Table 2"])
+def test_segmentation_only_model_without_boundaries(combined_rule_segmentation_model_fixture, text):
+    doc = combined_rule_segmentation_model_fixture(text)
+    assert [s.text for s in doc.sents] == [text]
+
+def test_segmenter_component_saves_its_cfg(tmpdir):
+    rules = [{"name": "no_start_after_we", "prev": {"TEXT": "We"}, "token": {}, "action": "not_start"}]
+    nlp = English()
+    nlp.add_pipe(CombinedRuleSentenceSegmenter(nlp, propose_boundaries=True, rules=rules), first=True)
+    nlp.to_disk(str(tmpdir))
+
+    Language.factories[CombinedRuleSentenceSegmenter.name] = CombinedRuleSentenceSegmenter
+    loaded = load_model_from_path(Path(str(tmpdir)))
+    segmenter = loaded.get_pipe(CombinedRuleSentenceSegmenter.name)
+    assert segmenter.cfg == {"propose_boundaries": True, "rules": rules}
+    doc = loaded("We measured it. The results were clear.")
+    assert [s.text for s in doc.sents] == ["We measured it.", "The results were clear."]
@@ -1,4 +1,9 @@
 import pytest
+import regex
+import spacy
+
+from custom_tokenizer import combined_rule_tokenizer # pylint: disable-msg=E0611,E0401
+from custom_tokenizer import save_tokenizer_artifact, load_tokenizer_artifact # pylint: disable-msg=E0611,E0401
 
 TEST_CASES = [("using a bag-of-words model", ["using", "a", "bag-of-words", "model"]),
               ("activators of cAMP- and cGMP-dependent protein", ["activators", "of", "cAMP-", "and", "cGMP-dependent", "protein"]),
@@ -50,4 +55,60 @@ def test_custom_tokenization(combined_rule_tokenizer_fixture, remove_new_lines_f
     text = remove_new_lines_fixture(text)
     doc = combined_rule_tokenizer_fixture(text)
     tokens = [t.text for t in doc]
-    assert tokens == expected_tokens
\ No newline at end of file
+    assert tokens == expected_tokens
+
+@pytest.mark.parametrize('text,expected_tokens', TEST_CASES)
+def test_custom_tokenization_from_artifact(combined_rule_tokenizer_from_artifact_fixture, remove_new_lines_fixture,
+                                           text, expected_tokens):
+    text = remove_new_lines_fixture(text)
+    doc = combined_rule_tokenizer_from_artifact_fixture(text)
+    tokens = [t.text for t in doc]
+    assert tokens == expected_tokens
+
+def test_tokenizer_artifact_does_not_refer_to_module_path(tmpdir):
+    nlp = spacy.load('en_core_web_sm')
+    artifact_path = str(tmpdir.join("tokenizer.pkl"))
+    save_tokenizer_artifact(combined_rule_tokenizer(nlp), artifact_path)
+    # the artifact has to load whether this module is imported as
+    # custom_tokenizer or as SciSpaCy.custom_tokenizer
+    with open(artifact_path, "rb") as artifact_file:
+        assert b"custom_tokenizer" not in artifact_file.read()
+    text = "for the camera(s) and 5mg of pyrilamine[3H] (TRAP)"
+    tokens = [t.text for t in load_tokenizer_artifact(nlp, artifact_path)(text)]
+    assert tokens == [t.text for t in combined_rule_tokenizer(nlp)(text)]
+
+SUFFIX_TEST_CASES = ["5mg", "h3g", "10km²", "3g)", "(3g)", "camera(s)", "(TRAP)", "cI-yfp)", "C(j)).", "a[3H]",
+                     "[9]", "]", "x{y}", "1D.", "83.40%", "37°C.", "’s", "$5", "word", "no. 4", "(a b)", ""]
+
+@pytest.mark.parametrize('string', SUFFIX_TEST_CASES)
+def test_suffix_matcher_matches_suffix_regex(combined_rule_tokenizer_fixture, string):
+    suffix_search = combined_rule_tokenizer_fixture.suffix_search
+    expected = regex.compile(suffix_search.__self__.pattern).search(string)
+    match = suffix_search(string)
+    if expected is None:
+        assert match is None
+    else:
+        assert (match.start(), match.end()) == (expected.start(), expected.end())
+
+NEW_LINE_TEST_CASES = [("in the lan-\nguage of the", "in the language of the"),
+                       ("in the lan-\n\nguage of the lan- \nguage", "in the language of the language"),
+                       ("no hyphenated new lines - here\n", "no hyphenated new lines - here\n"),
+                       ("ends with a hyphen-\n", "ends with a hyphen"),
+                       ("", ""),
+                      ]
+
+@pytest.mark.parametrize('text,expected_text', NEW_LINE_TEST_CASES)
+def test_remove_new_lines_offsets(remove_new_lines_with_offsets_fixture, text, expected_text):
+    cleaned_text, offsets = remove_new_lines_with_offsets_fixture(text)
+    assert cleaned_text == expected_text
+    for i, char in enumerate(cleaned_text):
+        assert text[offsets.to_original(i)] == char
+    assert offsets.to_original(len(cleaned_text)) == len(text)
+
+def test_remove_new_lines_offsets_map_tokens(combined_rule_tokenizer_fixture,
+                                             remove_new_lines_with_offsets_fixture):
+    text = "all neu-\nrons fire at the lan- \n\nguage"
+    cleaned_text, offsets = remove_new_lines_with_offsets_fixture(text)
+    doc = combined_rule_tokenizer_fixture(cleaned_text)
+    original_starts = [offsets.to_original(token.idx) for token in doc]
+    assert original_starts == [0, 4, 14, 19, 22, 26]
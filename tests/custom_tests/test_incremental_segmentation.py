@@ -0,0 +1,80 @@
+import importlib
+import os
+import random
+import shutil
+
+import pytest
+from spacy.attrs import ORTH, SPACY, LEMMA, SENT_START # pylint: disable-msg=E0611,E0401
+
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from incremental_segmentation import edit_doc, is_clean_cut # pylint: disable-msg=E0611,E0401
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../..")
+
+TEXT = ("Recurrent neural networks (RNNs) have been applied to many tasks, e.g. parsing [3]. "
+        "They are trained with backpropagation (see Fig. 2). We don't tune them.\n\n"
+        "2 Long Short-Term Memory Networks\n\n"
+        "LSTMs (Hochreiter et al., 1997) add gates. (The gates are learned.) They work well.")
+
+EDITS = [(0, 9, "Deep"), (27, 31, "RNN"), (83, 83, " (unclosed"), (130, 131, ""),
+         (156, 156, "Sec. 4 shows why. "), (len(TEXT), len(TEXT), " A new sentence."),
+         (180, 200, "\n\n"), (0, len(TEXT), "Everything is replaced.")]
+
+def assert_docs_equal(doc, expected):
+    assert doc.text == expected.text
+    attributes = [ORTH, SPACY, LEMMA, SENT_START]
+    assert doc.to_array(attributes).tolist() == expected.to_array(attributes).tolist()
+
+def test_is_clean_cut():
+    assert is_clean_cut("a b", 0)
+    assert is_clean_cut("a b", 2)
+    assert is_clean_cut("a b", 3)
+    assert not is_clean_cut("a b", 1)
+    assert not is_clean_cut("ab", 1)
+
+@pytest.mark.parametrize("start,end,replacement", EDITS)
+def test_edit_doc_equals_full_run(combined_rule_segmentation_model_fixture, start, end, replacement):
+    nlp = combined_rule_segmentation_model_fixture
+    doc = nlp(TEXT)
+    edited = edit_doc(nlp, doc, start, end, replacement)
+    assert_docs_equal(edited, nlp(TEXT[:start] + replacement + TEXT[end:]))
+    # the edited doc is a new one
+    assert doc.text == TEXT
+
+def test_random_edits_equal_full_run(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    rng = random.Random(0)
+    pieces = [" ", ".", "(", ")", "[", "]", "Fig. 3", "A", "the", "\n\n", "don't", "”"]
+    doc = nlp(TEXT)
+    for _ in range(50):
+        start = rng.randint(0, len(doc.text))
+        end = rng.randint(start, min(start + 10, len(doc.text)))
+        replacement = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+        expected = nlp(doc.text[:start] + replacement + doc.text[end:])
+        doc = edit_doc(nlp, doc, start, end, replacement)
+        assert_docs_equal(doc, expected)
+
+def test_edit_doc_requires_a_segmentation_pipeline(en_with_combined_rule_tokenizer_and_segmenter_fixture):
+    nlp = en_with_combined_rule_tokenizer_and_segmenter_fixture
+    # a component that is not a combined rule segmenter, whatever the
+    # installed en_core_web_sm has in its pipeline
+    nlp.add_pipe(nlp.create_pipe("sentencizer"))
+    doc = nlp("This is a sentence.")
+    with pytest.raises(ValueError):
+        edit_doc(nlp, doc, 0, 4, "That")
+
+def test_edit_doc_with_a_packaged_model(combined_rule_segmentation_model_fixture, tmpdir, monkeypatch):
+    nlp = combined_rule_segmentation_model_fixture
+    nlp.meta.update({"lang": "en", "name": "incremental_test", "version": "1.0.0"})
+    package_path = tmpdir.mkdir("en_incremental_test")
+    nlp.to_disk(str(package_path.join("en_incremental_test-1.0.0")))
+    shutil.copy(str(package_path.join("en_incremental_test-1.0.0", "meta.json")), str(package_path))
+    shutil.copy(os.path.join(REPO_ROOT, "proto_model", "__init__.py"), str(package_path))
+    monkeypatch.syspath_prepend(REPO_ROOT)
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    packaged = importlib.import_module("en_incremental_test").load()
+    # the packaged model imports the segmenter as SciSpaCy.custom_sentence_segmenter
+    assert not isinstance(packaged.get_pipe(CombinedRuleSentenceSegmenter.name), CombinedRuleSentenceSegmenter)
+    edited = edit_doc(packaged, packaged(TEXT), 0, 9, "Deep")
+    assert_docs_equal(edited, packaged("Deep" + TEXT[9:]))
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from spacy.lang.en import English
+
+from lazy_components import LazyComponent, make_components_lazy # pylint: disable-msg=E0611,E0401
+
+def saved_model_with_tagger(path):
+    nlp = English()
+    nlp.add_pipe(nlp.create_pipe("tagger"))
+    nlp.begin_training()
+    nlp.to_disk(path)
+    return nlp
+
+def test_lazy_component_loads_on_first_use(tmpdir):
+    saved = saved_model_with_tagger(str(tmpdir))
+    nlp = make_components_lazy(English(), Path(str(tmpdir)), saved.meta, ["tagger"])
+    assert nlp.pipe_names == ["tagger"]
+    tagger = nlp.get_pipe("tagger")
+    assert isinstance(tagger, LazyComponent)
+    assert not tagger.is_loaded
+
+    with nlp.disable_pipes("tagger"):
+        nlp("This is not tagged.")
+    assert not tagger.is_loaded
+
+    doc = nlp("This is tagged.")
+    assert tagger.is_loaded
+    assert [token.tag_ for token in doc] == [token.tag_ for token in saved("This is tagged.")]
@@ -0,0 +1,45 @@
+import json
+
+from model_build import variant_input_hash, read_stamp, stamp_path # pylint: disable-msg=E0611,E0401
+from model_build import build_variants # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import save_warmup # pylint: disable-msg=E0611,E0401
+
+VARIANT = {"name": "scispacy_segmentation", "pipeline": "segmentation"}
+
+def test_variant_input_hash(tmpdir):
+    assert variant_input_hash(VARIANT) == variant_input_hash(dict(VARIANT))
+    assert variant_input_hash(VARIANT) != variant_input_hash(dict(VARIANT, version="1.0.1"))
+
+    warmup_path = str(tmpdir)
+    save_warmup(warmup_path, [("cGMP-dependent", 2)])
+    warm_variant = dict(VARIANT, warmup_from=warmup_path)
+    input_hash = variant_input_hash(warm_variant)
+    save_warmup(warmup_path, [("cGMP-dependent", 2), ("[Ca2+]i", 2)])
+    assert variant_input_hash(warm_variant) != input_hash
+
+def test_read_stamp(tmpdir):
+    output_dir = str(tmpdir)
+    assert read_stamp(output_dir, VARIANT, "abc") is None
+
+    artifact = "en_scispacy_segmentation-1.0.0.tar.gz"
+    stamp = {"name": VARIANT["name"], "input_hash": "abc", "seconds": 1.0,
+             "artifacts": [{"file": artifact, "bytes": 3}]}
+    with open(stamp_path(output_dir, VARIANT), "w", encoding="utf-8") as stamp_file:
+        json.dump(stamp, stamp_file)
+    # the artifact is missing
+    assert read_stamp(output_dir, VARIANT, "abc") is None
+
+    tmpdir.join(artifact).write("abc")
+    assert read_stamp(output_dir, VARIANT, "abc") == stamp
+    assert read_stamp(output_dir, VARIANT, "def") is None
+
+def test_missing_base_model_only_fails_its_variant(tmpdir):
+    output_dir = str(tmpdir)
+    stamp = {"name": VARIANT["name"], "input_hash": variant_input_hash(VARIANT), "seconds": 1.0, "artifacts": []}
+    with open(stamp_path(output_dir, VARIANT), "w", encoding="utf-8") as stamp_file:
+        json.dump(stamp, stamp_file)
+    missing = {"name": "scispacy_missing", "base_model": "en_scispacy_not_installed"}
+    skipped, failed = build_variants([VARIANT, missing], output_dir)
+    assert skipped["status"] == "skipped"
+    assert failed["name"] == "scispacy_missing"
+    assert failed["status"] == "failed"
@@ -0,0 +1,22 @@
+from paragraph_parallel import ParagraphParallelPipeline, paragraph_breaks # pylint: disable-msg=E0611,E0401
+
+TEXT = ("2 Long Short-Term Memory Networks\n\n\n\n2.1 Overview\n\nThis is a sentence (see Fig. 2). "
+        "This is another one (which is continued\n\nin the next paragraph). A third sentence.\n\n"
+        "The end. \n\nReally [1].\n\n\nNot a break.")
+
+def sentences(doc):
+    return [(sent.start_char, sent.end_char) for sent in doc.sents]
+
+def test_paragraph_breaks():
+    assert paragraph_breaks("A.\n\nB. \n\n\n\nC.\n\n\nD.  \n\nE.") == [(2, 4), (7, 11)]
+
+def test_paragraph_parallel_pipeline(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    expected = nlp(TEXT)
+    for n_workers in (1, 2):
+        with ParagraphParallelPipeline(nlp, n_workers=n_workers, units_per_worker=3) as parallel_nlp:
+            doc = parallel_nlp(TEXT)
+            assert doc.text == TEXT
+            assert [(token.text, token.idx) for token in doc] == [(token.text, token.idx) for token in expected]
+            assert sentences(doc) == sentences(expected)
+            assert len(parallel_nlp("")) == 0
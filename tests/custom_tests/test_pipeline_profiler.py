@@ -0,0 +1,54 @@
+from pipeline_profiler import PipelineProfiler, ProfiledComponent # pylint: disable-msg=E0611,E0401
+from pipeline_profiler import tokenizer_chunks # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["The (IL-2) receptor binds 5mg of p53.", "Cells were grown at 37C.  They grew.",
+         "The (IL-2) receptor binds 5mg of p53."]
+
+def test_tokenizer_chunks():
+    assert tokenizer_chunks("a  b\n c ") == ["a", " ", "b", "\n ", "c"]
+
+def test_profiler_counts_every_component(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    expected = [[token.text for token in doc] for doc in nlp.pipe(TEXTS)]
+    profiler = PipelineProfiler(nlp)
+    assert all(isinstance(component, ProfiledComponent) for _, component in nlp.pipeline)
+
+    docs = list(nlp.pipe(TEXTS)) + [nlp(TEXTS[1])]
+    assert [[token.text for token in doc] for doc in docs[:3]] == expected
+    stats = profiler.stats()
+    n_tokens = sum(len(doc) for doc in docs)
+    assert list(stats["components"]) == ["tokenizer"] + nlp.pipe_names
+    for component_stats in stats["components"].values():
+        assert component_stats["docs"] == 4
+        assert component_stats["tokens"] == n_tokens
+        assert component_stats["seconds"] > 0
+    assert stats["components"]["tokenizer"]["calls"] == 4
+    for name in nlp.pipe_names:
+        assert stats["components"][name]["calls"] == 2
+
+    tokenizer_stats = stats["tokenizer"]
+    assert tokenizer_stats["chunks"] == sum(len(tokenizer_chunks(text)) for text in TEXTS + [TEXTS[1]])
+    assert tokenizer_stats["cache_hits"] + tokenizer_stats["cache_misses"] == tokenizer_stats["chunks"]
+    # the texts were tokenized before, so most of their chunks are in the cache
+    assert tokenizer_stats["cache_hits"] > tokenizer_stats["cache_misses"]
+
+    cache_misses = tokenizer_stats["cache_misses"]
+    nlp("Unseen words like haemoglobin(s) miss the cache.")
+    tokenizer_stats = profiler.stats()["tokenizer"]
+    assert tokenizer_stats["cache_misses"] > cache_misses
+    assert tokenizer_stats["calls"]["suffix_search"] > 0
+
+    profiler.remove()
+    assert not any(isinstance(component, ProfiledComponent) for _, component in nlp.pipeline)
+    assert nlp.tokenizer is profiler.tokenizer.tokenizer
+    assert [[token.text for token in doc] for doc in nlp.pipe(TEXTS)] == expected
+
+def test_to_prometheus(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    profiler = PipelineProfiler(nlp)
+    nlp(TEXTS[0])
+    text = profiler.to_prometheus()
+    assert "# TYPE scispacy_component_seconds_total counter" in text
+    assert 'scispacy_component_docs_total{component="tokenizer"} 1' in text
+    assert 'scispacy_tokenizer_phase_calls_total{phase="prefix_search"}' in text
+    assert text.endswith("\n")
@@ -0,0 +1,47 @@
+import gc
+from pathlib import Path
+
+import pytest
+from spacy.language import Language
+from spacy.util import load_model_from_path
+
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from preloaded_pool import PreloadedPool, annotate # pylint: disable-msg=E0611,E0401
+from util import save_model # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["This is a sentence. This is another one.",
+         "A single sentence.",
+         "The cGMP-dependent protein for [Ca2+]i protein (Fig. 1D). It is done."] * 5
+
+def count_tokens(nlp, texts):
+    return [len(doc) for doc in nlp.pipe(texts)]
+
+def test_preloaded_pool(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    with PreloadedPool(nlp=nlp, n_workers=2, warmup_texts=TEXTS[:3], batch_size=4,
+                       max_batches_per_worker=1) as pool:
+        assert pool.map(TEXTS) == annotate(nlp, TEXTS)
+        assert list(pool.imap(iter(TEXTS), count_tokens)) == count_tokens(nlp, TEXTS)
+        stats = pool.stats()
+    assert stats["workers"] == 2
+    assert stats["warmup_chunks"] == 0
+    assert 1 <= len(stats["worker_startup_seconds"]) <= 2
+
+@pytest.mark.skipif(not hasattr(gc, "freeze"), reason="gc.freeze is new in Python 3.7")
+def test_objects_stay_frozen_while_a_pool_is_open(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    first = PreloadedPool(nlp=nlp, n_workers=1)
+    with PreloadedPool(nlp=nlp, n_workers=1) as second:
+        first.close()
+        assert gc.get_freeze_count() > 0
+        assert second.map(TEXTS[:1]) == annotate(nlp, TEXTS[:1])
+    assert gc.get_freeze_count() == 0
+
+def test_preloaded_pool_warms_up_with_the_saved_chunks(combined_rule_segmentation_model_fixture, tmpdir):
+    save_model(combined_rule_segmentation_model_fixture, str(tmpdir),
+               warmup_chunks=[("cGMP-dependent", 2), ("[Ca2+]i", 2)])
+    Language.factories[CombinedRuleSentenceSegmenter.name] = CombinedRuleSentenceSegmenter
+    nlp = load_model_from_path(Path(str(tmpdir)))
+    with PreloadedPool(nlp=nlp, n_workers=1) as pool:
+        assert pool.stats()["warmup_chunks"] == 2
+        assert pool.map(TEXTS[:3]) == annotate(nlp, TEXTS[:3])
@@ -0,0 +1,95 @@
+import numpy
+import pytest
+from spacy.attrs import ORTH # pylint: disable-msg=E0611,E0401
+
+import segmentation_rules # pylint: disable-msg=E0611,E0401
+from consts import SEGMENTATION_RULES # pylint: disable-msg=E0611,E0401
+from custom_sentence_segmenter import CombinedRuleSentenceSegmenter # pylint: disable-msg=E0611,E0401
+from segmentation_rules import SegmentationRules, DEFAULT_SEGMENTATION_RULES # pylint: disable-msg=E0611,E0401
+
+FIGURE_PANEL = {"name": "figure_panel", "prev2": {"TEXT": ["Fig.", "Figs."]}, "prev": {"STARTS_WITH_DIGIT": True},
+                "token": {"REGEX": "[A-H]"}, "action": "not_start"}
+
+def sent_starts(rules, doc):
+    values = numpy.zeros(len(doc), dtype=numpy.int64)
+    return rules.apply(doc.vocab.strings, doc.to_array([ORTH]), values).tolist()
+
+def test_window_rules(combined_rule_tokenizer_fixture):
+    doc = combined_rule_tokenizer_fixture("See Sec. 2 and [3] (DARPA) Deep.\n\nNext")
+    values = dict(zip([token.text for token in doc], sent_starts(DEFAULT_SEGMENTATION_RULES, doc)))
+    assert values["2"] == -1
+    assert values["3"] == -1
+    assert values["Deep"] == -1
+    assert values["."] == -1
+    assert values["\n\n"] == 1
+    assert values["Next"] == 1
+
+def test_bracket_rules(combined_rule_tokenizer_fixture):
+    doc = combined_rule_tokenizer_fixture("a (b c) d (A) e (ff gg.) h (i")
+    values = sent_starts(DEFAULT_SEGMENTATION_RULES, doc)
+    opens = [token.i for token in doc if token.text == "("]
+    # matched without a sentence inside, around a single letter, with a sentence inside, and unmatched
+    assert [values[i] for i in opens] == [-1, 0, 0, -1]
+
+def test_custom_rules_extend_the_defaults(combined_rule_tokenizer_fixture):
+    # "C." at the end of a sentence would be a single token
+    doc = combined_rule_tokenizer_fixture("As shown in Fig. 2 B and Sec. 3 C below.")
+    texts = [token.text for token in doc]
+    default_values = dict(zip(texts, sent_starts(DEFAULT_SEGMENTATION_RULES, doc)))
+    values = dict(zip(texts, sent_starts(SegmentationRules(SEGMENTATION_RULES + [FIGURE_PANEL]), doc)))
+    assert default_values["B"] == 0
+    assert values["B"] == -1
+    assert values["C"] == 0
+    # the default rules still apply
+    assert values["2"] == values["3"] == -1
+
+def test_negated_and_boolean_predicates(combined_rule_tokenizer_fixture):
+    rules = SegmentationRules([{"name": "lower_after_i_e", "prev": {"TEXT": "i.e."},
+                                "token": {"NOT": {"STARTS_WITH_UPPER": True}}, "action": "not_start"},
+                               {"name": "single_capital", "token": {"STARTS_WITH_UPPER": True, "LENGTH": 1},
+                                "action": "start"}])
+    doc = combined_rule_tokenizer_fixture("x i.e. y i.e. Z A")
+    assert sent_starts(rules, doc) == [0, 0, -1, 0, 1, 1]
+
+def test_component_with_custom_rules(en_with_combined_rule_tokenizer_fixture):
+    nlp = en_with_combined_rule_tokenizer_fixture
+    segmenter = CombinedRuleSentenceSegmenter(nlp, rules=SEGMENTATION_RULES + [FIGURE_PANEL])
+    assert segmenter.cfg["rules"][-1] == FIGURE_PANEL
+    nlp.add_pipe(segmenter, first=True)
+    doc = nlp("The results are shown in Fig. 2 B and discussed below.")
+    assert [token.is_sent_start for token in doc if token.text == "B"] == [False]
+
+@pytest.mark.parametrize("rule", [{"token": {"TEXT": "."}},
+                                  {"token": {"TEXT": "."}, "action": "split"},
+                                  {"token": {"COLOR": "red"}, "action": "start"},
+                                  {"token": {"IS_RED": True}, "action": "start"},
+                                  {"after": {}, "action": "start"},
+                                  {"open": {"TEXT": "("}, "action": "not_start"}])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        SegmentationRules([rule])
+
+def test_table_does_not_grow_with_the_rules(combined_rule_tokenizer_fixture):
+    doc = combined_rule_tokenizer_fixture("As shown in Fig. 2 B and Sec. 3 C (A).")
+    one = SegmentationRules(SEGMENTATION_RULES + [FIGURE_PANEL])
+    many = SegmentationRules(SEGMENTATION_RULES + [dict(FIGURE_PANEL, name="copy{}".format(i)) for i in range(50)])
+    assert sent_starts(one, doc) == sent_starts(many, doc)
+    assert len(one.table) == len(many.table)
+
+def test_lexeme_masks_are_bounded(combined_rule_tokenizer_fixture, monkeypatch):
+    doc = combined_rule_tokenizer_fixture("See Sec. 2 and [3] (DARPA) Deep.\n\nNext")
+    expected = sent_starts(SegmentationRules(), doc)
+    monkeypatch.setattr(segmentation_rules, "MAX_CACHED_LEXEMES", 2)
+    rules = SegmentationRules()
+    assert sent_starts(rules, doc) == expected
+    assert len(rules.lexeme_masks) == 2
+
+def test_table_classes_are_capped(combined_rule_tokenizer_fixture):
+    # letters that each satisfy a predicate of their own, in every combination
+    letters = "abcdefg"
+    rules = SegmentationRules([{"token": {"REGEX": ".*{}.*".format(letter)}, "action": "start"}
+                               for letter in letters])
+    words = ["".join(letter for i, letter in enumerate(letters) if subset & 1 << i)
+             for subset in range(1, 1 << len(letters))]
+    with pytest.raises(ValueError):
+        sent_starts(rules, combined_rule_tokenizer_fixture(" ".join(words)))
@@ -0,0 +1,33 @@
+import numpy
+import pytest
+from spacy.tokens import Doc
+
+from sentence_offsets import sentence_token_offsets, sentence_char_offsets # pylint: disable-msg=E0611,E0401
+from sentence_offsets import docs_sentence_offsets # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["This is a sentence. (This is an interjected sentence.) This is also a sentence.",
+         "How about the following example? Fig. 1 shows it. ",
+         "A single sentence"]
+
+def test_sentence_offsets(combined_rule_segmentation_model_fixture):
+    for doc in combined_rule_segmentation_model_fixture.pipe(TEXTS):
+        token_offsets = sentence_token_offsets(doc)
+        char_offsets = sentence_char_offsets(doc)
+        assert token_offsets.dtype == char_offsets.dtype == numpy.int32
+        assert token_offsets.tolist() == [[sent.start, sent.end] for sent in doc.sents]
+        assert char_offsets.tolist() == [[sent.start_char, sent.end_char] for sent in doc.sents]
+        assert [doc.text[start:end] for start, end in char_offsets] == [sent.text for sent in doc.sents]
+
+def test_docs_sentence_offsets(combined_rule_segmentation_model_fixture):
+    docs = list(combined_rule_segmentation_model_fixture.pipe(TEXTS))
+    offsets, doc_starts = docs_sentence_offsets(docs, unit="char")
+    assert doc_starts.tolist() == [0, 3, 5, 6]
+    for i, doc in enumerate(docs):
+        assert offsets[doc_starts[i]:doc_starts[i + 1]].tolist() == sentence_char_offsets(doc).tolist()
+    offsets, doc_starts = docs_sentence_offsets([])
+    assert offsets.shape == (0, 2) and doc_starts.tolist() == [0]
+
+def test_unset_boundaries(combined_rule_segmentation_model_fixture):
+    doc = Doc(combined_rule_segmentation_model_fixture.vocab, words=["Not", "segmented"])
+    with pytest.raises(ValueError):
+        sentence_token_offsets(doc)
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import numpy
+from spacy.lang.en import English
+from spacy.util import load_model_from_path, get_model_meta
+
+from shared_vectors import load_shared_vocab, VECTORS_FILE_NAME # pylint: disable-msg=E0611,E0401
+from util import save_model # pylint: disable-msg=E0611,E0401
+
+def test_shared_vectors(tmpdir):
+    nlp = English()
+    nlp.vocab.set_vector("protein", numpy.asarray([1, 2, 3], dtype="f"))
+    tagger = nlp.create_pipe("tagger")
+    tagger.add_label("NN")
+    nlp.add_pipe(tagger)
+    # the tagger is built with the vectors as input features
+    nlp.begin_training()
+    tags = [token.tag_ for token in nlp("protein")]
+    save_model(nlp, str(tmpdir), shared_vectors=True)
+    assert tmpdir.join(VECTORS_FILE_NAME).exists()
+    assert not tmpdir.join("vocab", "vectors").exists()
+
+    meta = get_model_meta(Path(str(tmpdir)))
+    for mmap in [True, False]:
+        vocab = load_shared_vocab(str(tmpdir), meta, mmap=mmap)
+        loaded = load_model_from_path(Path(str(tmpdir)), meta, vocab=vocab)
+        assert loaded.vocab is vocab
+        assert isinstance(loaded.vocab.vectors.data, numpy.memmap) == mmap
+        assert loaded.vocab.get_vector("protein").tolist() == [1, 2, 3]
+        assert [token.tag_ for token in loaded("protein")] == tags
+
+def test_no_shared_vectors(tmpdir):
+    nlp = English()
+    save_model(nlp, str(tmpdir))
+    assert load_shared_vocab(str(tmpdir), get_model_meta(Path(str(tmpdir)))) is None
@@ -0,0 +1,47 @@
+from streaming import safe_cut, stream_sentences # pylint: disable-msg=E0611,E0401
+from corpus_annotation import annotate_texts # pylint: disable-msg=E0611,E0401
+
+TEXT = ("This is a sen-\ntence. (This is an interjected sentence.) This is also a sentence. "
+        "The cGMP-dependent protein is shown in Fig. 1D. It depends on phorbol 12-myristate. "
+        "Each neuron fits the bag-of-words model.")
+
+def test_safe_cut():
+    text = "a sen-\ntence and more"
+    assert safe_cut(text, 0, 8) == 2
+    assert safe_cut(text, 0, 16) == 13
+    assert safe_cut("a b\n\nc", 0, 5) == 5
+    assert safe_cut("abcdefgh", 0, 5) == 5
+
+def test_stream_sentences(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    whole = list(stream_sentences(nlp, TEXT, window_size=len(TEXT)))
+    assert [sentence["tokens"][0] for sentence in whole] == ["This", "(", "This", "The", "It", "Each"]
+    for window_size in [60, 100, 150]:
+        assert list(stream_sentences(nlp, TEXT, window_size=window_size, overlap=10)) == whole
+    pieces = [TEXT[i:i + 7] for i in range(0, len(TEXT), 7)]
+    assert list(stream_sentences(nlp, pieces, window_size=60, overlap=10)) == whole
+
+    first = whole[0]
+    assert TEXT[first["start"]:first["end"]] == "This is a sen-\ntence."
+    assert [TEXT[start:end] for start, end in first["token_offsets"]] == ["This", "is", "a", "sen-\ntence", "."]
+
+PARAGRAPHS = ("  This is a sentence. (This is an interjected sentence.)  This is also a sentence.\n\n"
+              "The cGMP-dependent protein is shown in Fig. 1D.\n\n\nIt depends on phorbol 12-myristate. \n"
+              "Each neuron fits the bag-of-words model.\n\nResults\n\nWe found it.  ")
+
+def test_stream_sentences_keeps_whitespace_at_cuts(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    whole = list(stream_sentences(nlp, PARAGRAPHS, window_size=len(PARAGRAPHS)))
+    assert [sentence["tokens"][0] for sentence in whole] == ["  ", "(", " ", "\n\n", "The", "\n\n\n", "\n", "\n\n",
+                                                             "Results", "\n\n", "We", " "]
+    # every window size that fits the longest sentence, so paragraph breaks fall at cuts
+    for window_size in range(70, len(PARAGRAPHS)):
+        assert list(stream_sentences(nlp, PARAGRAPHS, window_size=window_size, overlap=10)) == whole
+
+def test_annotate_long_texts(combined_rule_segmentation_model_fixture):
+    nlp = combined_rule_segmentation_model_fixture
+    documents = [("short", "A short document."), ("long", TEXT), ("last", "Another one.")]
+    windowed = list(annotate_texts(nlp, documents, window_size=100))
+    whole = list(annotate_texts(nlp, documents))
+    assert [annotation["id"] for annotation in windowed] == ["short", "long", "last"]
+    assert windowed == whole
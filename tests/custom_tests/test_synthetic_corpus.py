@@ -0,0 +1,16 @@
+from synthetic_corpus import generate_corpus # pylint: disable-msg=E0611,E0401
+
+def test_generate_corpus_is_reproducible():
+    assert generate_corpus(5, seed=3) == generate_corpus(5, seed=3)
+    assert generate_corpus(5, seed=3) != generate_corpus(5, seed=4)
+
+def test_generate_corpus_has_paragraphs_and_line_breaks():
+    corpus = generate_corpus(20)
+    assert len(corpus) == 20
+    assert all("\n\n" in document for document in corpus)
+    assert any("-\n" in document or "- \n" in document for document in corpus)
+
+def test_synthetic_corpus_segments(combined_rule_segmentation_model_fixture, remove_new_lines_fixture):
+    for document in generate_corpus(5):
+        doc = combined_rule_segmentation_model_fixture(remove_new_lines_fixture(document))
+        assert len(list(doc.sents)) > 1
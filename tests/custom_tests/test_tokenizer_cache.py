@@ -0,0 +1,36 @@
+from tokenizer_cache import mine_frequent_chunks, warm_up_tokenizer # pylint: disable-msg=E0611,E0401
+from tokenizer_cache import cache_hit_rate, save_warmup, load_warmup # pylint: disable-msg=E0611,E0401
+
+TEXTS = ["activators of cAMP- and cGMP-dependent protein",
+         "the cGMP-dependent protein for [Ca2+]i protein",
+         "phorbol 12-myristate and [Ca2+]i"]
+
+def test_mine_frequent_chunks():
+    chunks = mine_frequent_chunks(TEXTS)
+    assert chunks[0] == ("protein", 3)
+    assert ("cGMP-dependent", 2) in chunks
+    assert ("[Ca2+]i", 2) in chunks
+    assert all(count >= 2 for _, count in chunks)
+    assert mine_frequent_chunks(TEXTS, max_chunks=1) == [("protein", 3)]
+
+def test_warm_up_tokenizer(combined_rule_tokenizer_fixture):
+    vocab = combined_rule_tokenizer_fixture.vocab
+    assert "12-myristate" not in vocab.strings
+    assert warm_up_tokenizer(combined_rule_tokenizer_fixture, [("12-myristate", 3), "[Ca2+]i"]) == 2
+    assert "12-myristate" in vocab.strings
+    assert "[Ca2+]i" in vocab.strings
+    tokens = combined_rule_tokenizer_fixture("for [Ca2+]i protein")
+    assert [t.text for t in tokens] == ["for", "[Ca2+]i", "protein"]
+
+def test_cache_hit_rate():
+    cold = cache_hit_rate(TEXTS)
+    warm = cache_hit_rate(TEXTS, mine_frequent_chunks(TEXTS))
+    assert cold["chunks"] == warm["chunks"] == 16
+    assert cold["warm_hits"] == 0
+    assert warm["hit_rate"] > cold["hit_rate"]
+    assert warm["hits"] - warm["warm_hits"] == cold["hits"]
+
+def test_save_and_load_warmup(tmpdir):
+    assert load_warmup(str(tmpdir)) == []
+    save_warmup(str(tmpdir), [("protein", 3), ("[Ca2+]i", 2)])
+    assert load_warmup(str(tmpdir)) == [("protein", 3), ("[Ca2+]i", 2)]